@@ -12,7 +12,8 @@ from src.utils.checkpointing import (
     load_processed_qids,
 )
 from src.utils.common import sort_qids
-from src.utils.llm import get_large_model, get_small_model
+from src.utils.http import aclose_clients
+from src.utils.llm import warmup_models
 from src.utils.logging import log_main, log_pipeline
 
 
@@ -33,8 +34,7 @@ def _find_test_file() -> Path | None:
 
 async def async_main(batch_size: int = BATCH_SIZE) -> None:
     """Async main entry point with resume capability."""
-    get_small_model()
-    get_large_model()
+    await warmup_models()
     log_main("Models warmed up ready.")
 
     input_file = _find_test_file()
@@ -96,9 +96,17 @@ async def async_main(batch_size: int = BATCH_SIZE) -> None:
         log_main(f"All {len(all_qids)} questions have been processed!")
 
 
+async def _run(batch_size: int) -> None:
+    """Run async_main and close pooled HTTP clients on the same event loop."""
+    try:
+        await async_main(batch_size=batch_size)
+    finally:
+        await aclose_clients()
+
+
 def main(batch_size: int = BATCH_SIZE) -> None:
     """Main entry point that runs the async pipeline."""
-    asyncio.run(async_main(batch_size=batch_size))
+    asyncio.run(_run(batch_size))
 
 
 if __name__ == "__main__":
@@ -4,7 +4,8 @@ from pathlib import Path
 from src.config import BATCH_SIZE, DATA_INPUT_DIR, DATA_OUTPUT_DIR
 from src.pipeline import run_pipeline_async, save_predictions
 from src.data_processing.loaders import load_test_data_from_csv
-from src.utils.llm import get_large_model, get_small_model
+from src.utils.http import aclose_clients
+from src.utils.llm import warmup_models
 from src.utils.logging import log_main
 
 
@@ -23,8 +24,7 @@ def _find_test_file() -> Path | None:
 
 async def async_main(batch_size: int = BATCH_SIZE) -> None:
     """Async main entry point for deployment."""
-    get_small_model()
-    get_large_model()
+    await warmup_models()
     log_main("Models warmed up ready.")
 
     input_file = _find_test_file()
@@ -39,16 +39,25 @@ async def async_main(batch_size: int = BATCH_SIZE) -> None:
     questions = load_test_data_from_csv(input_file)
     log_main(f"Loaded {len(questions)} questions (batch_size={batch_size})")
 
-    predictions = await run_pipeline_async(questions, batch_size=batch_size, force_reingest=True)
+    # The knowledge base is restored from the image's index snapshot (or synced incrementally)
+    predictions = await run_pipeline_async(questions, batch_size=batch_size)
 
     output_file = DATA_OUTPUT_DIR / "pred.csv"
     save_predictions(predictions, output_file, ensure_dir=True)
     log_main(f"Predictions saved to: {output_file}")
 
 
+async def _run(batch_size: int) -> None:
+    """Run async_main and close pooled HTTP clients on the same event loop."""
+    try:
+        await async_main(batch_size=batch_size)
+    finally:
+        await aclose_clients()
+
+
 def main(batch_size: int = BATCH_SIZE) -> None:
     """Main entry point that runs the async pipeline."""
-    asyncio.run(async_main(batch_size=batch_size))
+    asyncio.run(_run(batch_size))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+"""Compare local embedding backends against the float model on knowledge-base chunks.
+
+Embeds a sample of chunks from the data directory with the float `torch` backend and
+with each candidate (torch-int8, onnx, onnx-int8), then reports per-text cosine
+agreement, nearest-neighbour agreement and throughput. Fails (exit code 1) when a
+backend's mean cosine falls below --min-cosine, so a quantized backend can be
+validated before LOCAL_EMBEDDING_BACKEND is switched over.
+"""
+
+import argparse
+import random
+import sys
+from pathlib import Path
+
+# Add project root to path for imports
+_project_root = Path(__file__).resolve().parent.parent
+if str(_project_root) not in sys.path:
+    sys.path.insert(0, str(_project_root))
+
+from src.config import DATA_DIR, settings
+from src.utils.ingestion import _extract_chunks_from_file, _get_text_splitter, _scan_data_files
+from src.utils.local_embeddings import BACKENDS, cosine_agreement, load_local_embeddings
+
+EPILOG = """
+Examples:
+  python scripts/benchmark_embeddings.py
+  python scripts/benchmark_embeddings.py --backends torch-int8 --threads 4 --samples 1000
+  python scripts/benchmark_embeddings.py --model path/to/bi-encoder --min-cosine 0.99
+"""
+
+
+def sample_chunks(data_dir: Path, samples: int, seed: int) -> list[str]:
+    splitter = _get_text_splitter()
+    chunks = []
+    for file_path in _scan_data_files(data_dir):
+        chunks.extend(_extract_chunks_from_file(file_path, splitter)[0])
+    random.Random(seed).shuffle(chunks)
+    return chunks[:samples]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Check quantized/ONNX embedding backends against the float model",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=EPILOG,
+    )
+    parser.add_argument(
+        "--model", default=settings.embedding_model, help="Local path or HF id of the bi-encoder"
+    )
+    parser.add_argument(
+        "--backends", default="torch-int8,onnx-int8", help="Comma-separated candidate backends"
+    )
+    parser.add_argument(
+        "--data-dir", type=Path, default=DATA_DIR, help="Directory to sample chunks from"
+    )
+    parser.add_argument("--samples", type=int, default=512, help="Number of chunks to embed")
+    parser.add_argument(
+        "--threads", type=int, default=settings.embedding_threads, help="CPU threads (0 = default)"
+    )
+    parser.add_argument(
+        "--min-cosine", type=float, default=0.98, help="Fail below this mean cosine"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    texts = sample_chunks(args.data_dir, args.samples, args.seed)
+    if not texts:
+        print(f"[Error] No chunks found under {args.data_dir}")
+        sys.exit(1)
+    print(f"[Embed] {len(texts)} chunks from {args.data_dir}, model {args.model}")
+
+    reference = load_local_embeddings(args.model, backend="torch", threads=args.threads)
+    ok = True
+    print(
+        f"{'backend':<11}  {'mean cos':>8}  {'min cos':>8}  {'p1 cos':>8}  "
+        f"{'top-1 NN':>8}  {'float/s':>8}  {'texts/s':>8}"
+    )
+    for backend in (b.strip() for b in args.backends.split(",") if b.strip()):
+        if backend not in BACKENDS or backend == "torch":
+            parser.error(f"candidate backends must be among {', '.join(BACKENDS[1:])}")
+        try:
+            candidate = load_local_embeddings(args.model, backend=backend, threads=args.threads)
+        except RuntimeError as e:
+            print(f"{backend:<11}  skipped: {e}")
+            continue
+        report = cosine_agreement(reference, candidate, texts)
+        print(
+            f"{backend:<11}  {report['mean_cosine']:>8.4f}  {report['min_cosine']:>8.4f}  "
+            f"{report['p01_cosine']:>8.4f}  {report['neighbour_agreement']:>8.1%}  "
+            f"{report['reference_texts_per_s']:>8.1f}  {report['candidate_texts_per_s']:>8.1f}"
+        )
+        if report["mean_cosine"] < args.min_cosine:
+            ok = False
+            mean_cosine = report["mean_cosine"]
+            print(f"        [Error] {backend} mean cosine {mean_cosine:.4f} < {args.min_cosine}")
+
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
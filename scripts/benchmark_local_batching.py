@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+"""Benchmark dynamic batching and prefix KV reuse of a local HuggingFace model (runs on CPU).
+
+1. Submits the same set of concurrent chat requests with different batch sizes and
+   reports wall time and generated tokens/sec for each.
+2. Sends sequential requests that share the router system prompt, with and without
+   the prefix KV cache, and reports median time-to-first-token.
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add project root to path for imports
+_project_root = Path(__file__).resolve().parent.parent
+if str(_project_root) not in sys.path:
+    sys.path.insert(0, str(_project_root))
+
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from src.config import settings
+from src.utils.llm import _load_huggingface_model
+from src.utils.local_batching import LocalBatchingEngine
+from src.utils.prefix_cache import PrefixKVCache
+from src.utils.prompts import load_prompt
+
+EPILOG = """
+Examples:
+  python scripts/benchmark_local_batching.py
+  python scripts/benchmark_local_batching.py --model path/to/tiny-model --batch-sizes 1,4,16
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark local model throughput with dynamic batching",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=EPILOG,
+    )
+    parser.add_argument(
+        "--model", default=settings.llm_model_small, help="Local model path or HF id"
+    )
+    parser.add_argument("--requests", type=int, default=32, help="Concurrent requests per run")
+    parser.add_argument("--batch-sizes", default="1,4,8", help="Comma-separated max batch sizes")
+    parser.add_argument("--max-new-tokens", type=int, default=64)
+    parser.add_argument("--window-ms", type=float, default=settings.local_batch_window_ms)
+    args = parser.parse_args()
+
+    llm = _load_huggingface_model(args.model, "Benchmark")
+    pipeline = llm.llm.pipeline
+    prompts = [
+        llm._to_chat_prompt([
+            SystemMessage(content="Bạn là trợ lý trả lời câu hỏi trắc nghiệm."),
+            HumanMessage(content=f"Câu hỏi số {i}: 1 + {i} bằng bao nhiêu?"),
+        ])
+        for i in range(args.requests)
+    ]
+
+    print(f"{'batch':>5}  {'wall (s)':>8}  {'tokens':>6}  {'tok/s':>7}")
+    for batch_size in (int(b) for b in args.batch_sizes.split(",")):
+        engine = LocalBatchingEngine(
+            model=pipeline.model,
+            tokenizer=pipeline.tokenizer,
+            generation_kwargs={"do_sample": False},
+            max_new_tokens=args.max_new_tokens,
+            max_batch_size=batch_size,
+            window_seconds=args.window_ms / 1000,
+            name=f"bench-{batch_size}",
+        )
+        start = time.perf_counter()
+        requests = [engine.submit(prompt) for prompt in prompts]
+        for request in requests:
+            request.future.result()
+        wall = time.perf_counter() - start
+
+        tokens = sum(len(r.token_ids) for r in requests)
+        print(f"{batch_size:>5}  {wall:>8.2f}  {tokens:>6}  {tokens / wall:>7.1f}")
+
+    system_prompt = load_prompt("router.j2", "system")
+    prefix = llm.tokenizer.apply_chat_template(
+        [{"role": "system", "content": system_prompt}], tokenize=False, add_generation_prompt=False
+    )
+    prefix_tokens = len(llm.tokenizer(prefix, add_special_tokens=False).input_ids)
+    print(f"\nTime to first token, shared system prompt of {prefix_tokens} tokens")
+    for label, prefix_cache in (
+        ("no prefix cache", None),
+        ("prefix cache", PrefixKVCache(pipeline.model, max_entries=8, min_tokens=1)),
+    ):
+        engine = LocalBatchingEngine(
+            model=pipeline.model,
+            tokenizer=pipeline.tokenizer,
+            generation_kwargs={"do_sample": False},
+            max_new_tokens=1,
+            max_batch_size=1,
+            window_seconds=0,
+            prefix_cache=prefix_cache,
+            name=label,
+        )
+        latencies = []
+        for i in range(args.requests):
+            prompt = llm._to_chat_prompt([
+                SystemMessage(content=system_prompt),
+                HumanMessage(content=f"Câu hỏi: 1 + {i} bằng bao nhiêu?"),
+            ])
+            start = time.perf_counter()
+            request = engine.submit(prompt, stream=True, prefix=prefix)
+            request.chunks.get()
+            latencies.append(time.perf_counter() - start)
+            request.future.result()
+        print(f"  {label:<16} median {statistics.median(latencies[2:]) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
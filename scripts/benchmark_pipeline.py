@@ -0,0 +1,224 @@
+#!/usr/bin/env python
+"""Benchmark `run_pipeline_async` throughput and resilience against the fake provider.
+
+Starts `scripts/fake_provider.py` in-process (or uses a running one via --url), points
+the VNPT/OpenRouter endpoints at it, indexes the knowledge base into a temporary
+Qdrant store, then answers a synthetic mix of reading, math, knowledge and refusal
+questions. Reports throughput, agreement with the provider's scripted answers and the
+server-side status counts, alongside the pipeline's own [Stats] lines, and flags any
+answering node whose model calls are missing from the token usage stats.
+
+Passing several batch sizes (`--batch-size 1,4,16,64`) repeats the run for each and
+prints how throughput scales with concurrency; with injected latency, async nodes
+should scale close to linearly until a rate or concurrency limit is reached.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import urllib.request
+from pathlib import Path
+
+# Add project root to path for imports
+_project_root = Path(__file__).resolve().parent.parent
+if str(_project_root) not in sys.path:
+    sys.path.insert(0, str(_project_root))
+
+from scripts.fake_provider import (
+    FakeProviderServer,
+    add_config_arguments,
+    config_from_args,
+    provider_env,
+    scripted_answer,
+)
+
+EPILOG = """
+Examples:
+  python scripts/benchmark_pipeline.py --questions 2000 --batch-size 32
+  python scripts/benchmark_pipeline.py --questions 400 --batch-size 1,4,16,64 --latency-ms 300
+  python scripts/benchmark_pipeline.py --questions 1000 --error-429 0.05 --error-5xx 0.02 --rpm 3000
+  python scripts/benchmark_pipeline.py --url http://127.0.0.1:8765 --providers vnpt,openrouter
+"""
+
+_TOPICS = ["lịch sử", "địa lý", "văn hóa", "pháp luật", "văn học", "kinh tế", "y học", "xã hội"]
+_REFUSAL = "Tôi không thể trả lời câu hỏi này."
+
+
+def build_questions(count: int, seed: int) -> list[dict]:
+    """Synthetic questions covering the router's fast tracks and its LLM slow track."""
+    rng = random.Random(seed)
+    questions = []
+    for i in range(count):
+        kind = rng.choice(["reading", "math", "knowledge", "knowledge", "refusal"])
+        topic = rng.choice(_TOPICS)
+        num_choices = rng.choice([4, 4, 4, 5, 6])
+        choices = [f"Phương án {j + 1} về {topic} (câu {i})" for j in range(num_choices)]
+        if kind == "reading":
+            passage = " ".join(
+                f"Câu thứ {k} của đoạn văn nói về {topic} ở Việt Nam." for k in range(8)
+            )
+            question = f"Đoạn văn: {passage}\nTheo đoạn văn, ý nào đúng nhất về {topic}?"
+        elif kind == "math":
+            question = (
+                f"Tính giá trị biểu thức {i} * 3 + {rng.randint(1, 99)} trong bài toán {topic}."
+            )
+        else:
+            question = f"Câu hỏi {i}: Nhận định nào đúng về {topic} Việt Nam?"
+            if kind == "refusal":
+                choices[-1] = _REFUSAL
+        questions.append({"qid": f"bench_{i:05d}", "question": question, "choices": choices})
+    return questions
+
+
+def _fetch_stats(url: str) -> dict[str, int]:
+    with urllib.request.urlopen(f"{url}/stats", timeout=10) as response:
+        return json.loads(response.read())
+
+
+def _nodes_without_usage() -> list[str]:
+    """Answering nodes that handled questions in the last run but have no token usage recorded."""
+    from src.nodes.router import route_question
+    from src.utils.token_usage import get_run_token_usage
+
+    usage = get_run_token_usage()
+    nodes = {route_question({"route": route}) for route in usage.questions_by_route} - {"__end__"}
+    missing = []
+    for node in sorted(nodes):
+        counts = usage.by_node.get(node)
+        if counts is None or not counts.input_tokens + counts.output_tokens:
+            missing.append(node)
+    return missing
+
+
+def _parse_batch_sizes(value: str) -> list[int]:
+    sizes = [int(part) for part in value.split(",") if part.strip()]
+    if not sizes or min(sizes) < 1:
+        raise argparse.ArgumentTypeError("batch sizes must be positive integers")
+    return sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark pipeline throughput against the fake VNPT/OpenRouter server",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=EPILOG,
+    )
+    parser.add_argument("--questions", type=int, default=500, help="Number of synthetic questions")
+    parser.add_argument(
+        "--batch-size",
+        type=_parse_batch_sizes,
+        default=os.getenv("BATCH_SIZE", "64"),
+        help="Concurrent questions; a comma-separated list runs once per size",
+    )
+    parser.add_argument(
+        "--providers",
+        default="vnpt",
+        help="LLM_PROVIDERS for chat: vnpt, openrouter or both (embeddings use the VNPT shape)",
+    )
+    parser.add_argument(
+        "--url", help="Use an already running fake provider instead of starting one"
+    )
+    parser.add_argument("--verbose", action="store_true", help="Show per-question pipeline logs")
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    server = None
+    if args.url:
+        url = args.url.rstrip("/")
+        endpoints = provider_env(url)
+    else:
+        server = FakeProviderServer(config_from_args(args)).start()
+        url = server.url
+        endpoints = server.env()
+
+    workdir = tempfile.mkdtemp(prefix="vnpt_bench_")
+    os.environ.update(endpoints)
+    os.environ.update({
+        "USE_VNPT_API": "True",
+        "LLM_PROVIDERS": args.providers,
+        "LLM_CACHE_ENABLED": "False",
+        "VECTOR_DB_PATH": str(Path(workdir) / "qdrant"),
+    })
+
+    # Settings are read at import time, so the pipeline is imported after the env is set
+    from src.data_processing.models import QuestionInput
+    from src.pipeline import run_pipeline_async
+    from src.state import format_choices
+    from src.utils.http import aclose_clients
+    from src.utils.ingestion import get_qdrant_client, ingest_all_data
+
+    questions = [QuestionInput(**q) for q in build_questions(args.questions, args.seed)]
+    expected = {
+        q.qid: scripted_answer(format_choices(q.choices), args.seed)
+        for q in questions
+        if _REFUSAL not in q.choices
+    }
+    print(f"[Bench] {len(questions)} questions, providers {args.providers} at {url}")
+
+    # Index once up front so every timed run only loads the existing collection
+    with (
+        contextlib.redirect_stdout(sys.stdout if args.verbose else io.StringIO()),
+        contextlib.redirect_stderr(sys.stderr if args.verbose else io.StringIO()),
+    ):
+        ingest_all_data()
+
+    async def run(batch_size: int):
+        try:
+            return await run_pipeline_async(questions, batch_size=batch_size)
+        finally:
+            await aclose_clients()
+
+    throughputs = {}
+    for batch_size in args.batch_size:
+        output = io.StringIO()
+        start = time.perf_counter()
+        with (
+            contextlib.redirect_stdout(sys.stdout if args.verbose else output),
+            contextlib.redirect_stderr(sys.stderr if args.verbose else io.StringIO()),
+        ):
+            predictions = asyncio.run(run(batch_size))
+        elapsed = time.perf_counter() - start
+        throughputs[batch_size] = len(questions) / elapsed
+
+        print(f"[Bench] Batch size {batch_size}:")
+        if not args.verbose:
+            for line in output.getvalue().splitlines():
+                if "[Stats]" in line or "[Error]" in line:
+                    print(line)
+
+        # Early-stopped streams must still report usage before their node returns
+        missing_usage = _nodes_without_usage()
+        if missing_usage:
+            print(f"[Error] No token usage recorded for nodes: {', '.join(missing_usage)}")
+
+        answers = {p.qid: p.answer for p in predictions}
+        agree = sum(answers.get(qid) == answer for qid, answer in expected.items())
+        print(f"[Bench] Wall time {elapsed:.1f}s, {throughputs[batch_size]:.1f} questions/s")
+        agreement = agree / max(len(expected), 1)
+        print(f"[Bench] Scripted-answer agreement: {agree}/{len(expected)} ({agreement:.1%})")
+
+    if len(throughputs) > 1:
+        baseline_size = min(throughputs)
+        print("[Bench] Throughput scaling:")
+        for batch_size, throughput in throughputs.items():
+            speedup = throughput / throughputs[baseline_size]
+            print(
+                f"        batch {batch_size:>4}: {throughput:8.1f} questions/s "
+                f"({speedup:.1f}x batch {baseline_size})"
+            )
+    print(f"[Bench] Server responses: {json.dumps(_fetch_stats(url), ensure_ascii=False)}")
+
+    get_qdrant_client().close()
+    if server is not None:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
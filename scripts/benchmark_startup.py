@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+"""Measure import-time startup cost of the pipeline entry points.
+
+Runs `python -X importtime -c "import <module>"` in fresh interpreters with
+USE_VNPT_API=True and reports the total import time and the most expensive
+top-level packages. Fails (exit code 1) when a module that should only load on
+demand (torch, transformers, Qdrant, firecrawl, ...) is imported at startup, or
+when the total exceeds --max-ms, so regressions show up in CI or before a release.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+
+_project_root = Path(__file__).resolve().parent.parent
+
+DEFAULT_MODULES = ["src.pipeline", "predict", "main"]
+
+# Heavy stacks that API-mode startup must not import; they load on first use instead
+DEFAULT_FORBIDDEN = [
+    "torch",
+    "transformers",
+    "sentence_transformers",
+    "langchain_huggingface",
+    "qdrant_client",
+    "langchain_qdrant",
+    "firecrawl",
+]
+
+EPILOG = """
+Examples:
+  python scripts/benchmark_startup.py
+  python scripts/benchmark_startup.py --module src.pipeline --runs 5 --max-ms 2500
+  python scripts/benchmark_startup.py --forbid langgraph --top 25
+"""
+
+
+@dataclass
+class ImportRecord:
+    name: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def parse_importtime(stderr: str) -> list[ImportRecord]:
+    """Parse `-X importtime` output (children are printed before their parent)."""
+    records = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        stripped = name.lstrip()
+        records.append(ImportRecord(
+            name=stripped,
+            self_us=int(self_us),
+            cumulative_us=int(cumulative_us),
+            depth=(len(name) - len(stripped)) // 2,
+        ))
+    return records
+
+
+def import_chain(records: list[ImportRecord], index: int) -> list[str]:
+    """Names from the top-level import down to records[index]."""
+    chain = [records[index].name]
+    depth = records[index].depth
+    for record in records[index + 1:]:
+        if record.depth < depth:
+            chain.append(record.name)
+            depth = record.depth
+    return list(reversed(chain))
+
+
+def _is_forbidden(name: str, forbidden: list[str]) -> str | None:
+    for prefix in forbidden:
+        if name == prefix or name.startswith(prefix + "."):
+            return prefix
+    return None
+
+
+def measure(module: str, env: dict[str, str]) -> list[ImportRecord]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=_project_root,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    return parse_importtime(result.stderr)
+
+
+def report(module: str, runs: list[list[ImportRecord]], args: argparse.Namespace) -> bool:
+    """Print the summary for one module; return False if it breaks a budget."""
+    # The fastest run is the least disturbed by disk cache and scheduler noise
+    records = min(runs, key=lambda recs: sum(r.self_us for r in recs))
+    total_ms = sum(r.self_us for r in records) / 1000
+    print(f"[Startup] import {module}: {total_ms:.0f} ms (best of {len(runs)})")
+
+    by_package: dict[str, int] = {}
+    for record in records:
+        package = record.name.split(".", 1)[0]
+        by_package[package] = by_package.get(package, 0) + record.self_us
+    for package, self_us in sorted(by_package.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"        {package:<32} {self_us / 1000:8.1f} ms")
+
+    ok = True
+    reported: set[str] = set()
+    for index, record in enumerate(records):
+        prefix = _is_forbidden(record.name, args.forbid)
+        if prefix is None or prefix in reported:
+            continue
+        reported.add(prefix)
+        ok = False
+        chain = import_chain(records, index)
+        chain = chain[:next(i for i, name in enumerate(chain) if _is_forbidden(name, [prefix])) + 1]
+        print(f"        [Error] {prefix} imported at startup via {' -> '.join(chain)}")
+
+    if args.max_ms and total_ms > args.max_ms:
+        ok = False
+        print(f"        [Error] {total_ms:.0f} ms exceeds the {args.max_ms:.0f} ms budget")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark import-time startup of the pipeline in API mode",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=EPILOG,
+    )
+    parser.add_argument(
+        "--module",
+        action="append",
+        help=f"Module to import (repeatable, default: {', '.join(DEFAULT_MODULES)})",
+    )
+    parser.add_argument("--runs", type=int, default=3, help="Fresh interpreters per module")
+    parser.add_argument("--top", type=int, default=10, help="Number of packages to list")
+    parser.add_argument(
+        "--max-ms", type=float, default=0, help="Fail above this import time (0 = off)"
+    )
+    parser.add_argument(
+        "--forbid",
+        action="append",
+        default=list(DEFAULT_FORBIDDEN),
+        help="Additional module that must not be imported at startup (repeatable)",
+    )
+    args = parser.parse_args()
+
+    env = {**os.environ, "USE_VNPT_API": "True"}
+    ok = True
+    for module in args.module or DEFAULT_MODULES:
+        runs = [measure(module, env) for _ in range(max(args.runs, 1))]
+        ok = report(module, runs, args) and ok
+
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
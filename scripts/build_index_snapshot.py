@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+"""Build (or verify) a prebuilt snapshot of the knowledge-base vector index.
+
+Ingests DATA_DIR into the local vector store (incrementally, or from scratch with
+--force) and copies the store and its ingestion manifest into a versioned, checksummed
+snapshot directory. `ingest_all_data` restores the snapshot at startup instead of
+re-embedding the knowledge base, as long as it was built with the same embedding model,
+chunking and near-duplicate settings. The Docker image builds one at build time.
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# Add project root to path for imports
+_project_root = Path(__file__).resolve().parent.parent
+if str(_project_root) not in sys.path:
+    sys.path.insert(0, str(_project_root))
+
+from src.config import DATA_DIR, settings
+from src.utils.embeddings import get_embedding_model_id
+from src.utils.index_snapshot import (
+    create_snapshot,
+    read_snapshot,
+    snapshot_mismatch,
+    verify_snapshot,
+)
+from src.utils.ingest_manifest import index_signature, manifest_path
+from src.utils.ingestion import close_qdrant_client, get_qdrant_client, ingest_all_data
+
+EPILOG = """
+Examples:
+  python scripts/build_index_snapshot.py
+  python scripts/build_index_snapshot.py --output /code/index_snapshot --force
+  python scripts/build_index_snapshot.py --verify
+"""
+
+
+def verify(snapshot_dir: Path, collection_name: str) -> bool:
+    meta = read_snapshot(snapshot_dir)
+    if meta is None:
+        print(f"[Error] No snapshot at {snapshot_dir}")
+        return False
+    reason = snapshot_mismatch(meta, collection_name, index_signature(get_embedding_model_id()))
+    if reason:
+        print(f"[Error] Snapshot does not match the current settings: {reason}")
+        return False
+    try:
+        verify_snapshot(snapshot_dir, meta)
+    except ValueError as e:
+        print(f"[Error] Snapshot is corrupt: {e}")
+        return False
+    print(f"[Snapshot] OK: {meta['points']} points, built {meta['created_at']}")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Build a prebuilt vector index snapshot for fast startup",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=EPILOG,
+    )
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=settings.index_snapshot_path_resolved,
+        help="Snapshot directory (default: INDEX_SNAPSHOT_PATH)",
+    )
+    parser.add_argument(
+        "--dir", type=Path, default=DATA_DIR, help="Knowledge base directory to ingest"
+    )
+    parser.add_argument(
+        "--force", action="store_true", help="Re-ingest everything before snapshotting"
+    )
+    parser.add_argument("--verify", action="store_true", help="Only check an existing snapshot")
+    args = parser.parse_args()
+
+    collection_name = settings.qdrant_collection
+    if args.verify:
+        sys.exit(0 if verify(args.output, collection_name) else 1)
+
+    # Without --force an existing snapshot may seed the index, so only changed files are embedded
+    ingest_all_data(base_dir=args.dir, force=args.force)
+    points = get_qdrant_client().count(collection_name).count
+    signature = index_signature(get_embedding_model_id())
+    close_qdrant_client()
+
+    meta = create_snapshot(
+        args.output,
+        settings.vector_db_path_resolved,
+        manifest_path(collection_name),
+        collection_name,
+        signature,
+        points,
+    )
+    print(
+        f"[Done] Snapshot: {args.output} ({meta['points']} points, {len(meta['checksums'])} files)"
+    )
+
+
+if __name__ == "__main__":
+    main()
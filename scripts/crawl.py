@@ -27,6 +27,7 @@ Examples:
   python scripts/crawl.py --url https://example.com --mode links --topic "keyword1,keyword2" --max-pages 20
   python scripts/crawl.py --url https://example.com --mode search --topic "history"
   python scripts/crawl.py --url https://example.com --mode domain --max-pages 50
+  python scripts/crawl.py --url https://example.com --mode domain --max-pages 500 --format jsonl
 """
 
 
@@ -43,6 +44,13 @@ def main():
     parser.add_argument("--max-pages", type=int, default=10, help="Max pages (default: 10)")
     parser.add_argument("--output-dir", default=str(DATA_CRAWLED_DIR), help="Output directory")
     parser.add_argument("--output-file", help="Output filename (auto if not set)")
+    parser.add_argument(
+        "--format",
+        choices=["json", "jsonl"],
+        default="json",
+        help="Output format when --output-file is not set; jsonl stores one document "
+        "per line (default: json)",
+    )
     parser.add_argument("--api-key", help="Firecrawl API key")
 
     args = parser.parse_args()
@@ -69,7 +77,7 @@ def main():
             api_key=api_key,
         )
         
-        output_path = save_crawled_data(data, args.output_dir, args.output_file)
+        output_path = save_crawled_data(data, args.output_dir, args.output_file, args.format)
         print(f"\n[Done] Output: {output_path}")
         print(f"[Done] Documents: {data['total_pages']}")
         
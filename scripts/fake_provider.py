@@ -0,0 +1,546 @@
+#!/usr/bin/env python
+"""Local stand-in for the VNPT and OpenRouter APIs, for load and chaos testing.
+
+Serves the request/response shapes the pipeline parses:
+- VNPT chat:       POST /data-service/v1/chat/completions/<model>
+- VNPT embedding:  POST /data-service/vnptai-hackathon-embedding
+- OpenRouter chat: POST /api/v1/chat/completions
+Chat endpoints also stream (SSE) when the payload sets "stream": true.
+
+Answers are scripted and deterministic: the router gets a route and the solvers get
+"Đáp án: X" (a printing code block for the logic solver), both derived from a hash
+of the answer choices, so every run of the same questions gives the same answers.
+A script file can pin routes, answers or errors for questions containing a phrase.
+Latency follows a configurable distribution, and 429 (with Retry-After), VNPT's 401
+"rate limit" variant, 5xx and the VNPT safety-filter refusal can be injected at
+given rates. GET /stats returns request counts per endpoint and status.
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import random
+import re
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+VNPT_CHAT_PREFIX = "/data-service/v1/chat/completions/"
+VNPT_EMBEDDING_PATH = "/data-service/vnptai-hackathon-embedding"
+OPENROUTER_CHAT_PATH = "/api/v1/chat/completions"
+
+SAFETY_REFUSAL = (
+    "Nội dung yêu cầu vi phạm chính sách an toàn và thuần phong mỹ tục, "
+    "tôi không thể trả lời câu hỏi này."
+)
+_ROUTES = ("rag", "rag", "direct", "math")
+_CHOICE_LINE = re.compile(r"^[A-Z]\. .*$", re.MULTILINE)
+
+EPILOG = """
+Examples:
+  python scripts/fake_provider.py --port 8765
+  python scripts/fake_provider.py --latency-ms 800 --latency-dist lognormal --error-429 0.05
+  python scripts/fake_provider.py --rpm 600 --error-5xx 0.02 --toxic-rate 0.01 --script chaos.json
+
+Script file (JSON list, first match wins):
+  [{"contains": "bom", "error": "toxic"},
+   {"contains": "đạo hàm", "route": "math", "answer": "C"},
+   {"contains": "Hà Nội", "reply": "Đáp án: B"}]
+"""
+
+
+@dataclass
+class FakeProviderConfig:
+    """Latency, fault injection and scripting options of the fake provider."""
+
+    latency_ms: float = 300.0
+    latency_dist: str = "lognormal"
+    latency_sigma: float = 0.5
+    embedding_latency_ms: float = 50.0
+    token_ms: float = 2.0
+    rate_429: float = 0.0
+    rate_401: float = 0.0
+    rate_5xx: float = 0.0
+    toxic_rate: float = 0.0
+    retry_after: float = 1.0
+    rpm: float = 0.0
+    embedding_dim: int = 256
+    embedding_max_batch: int = 0
+    seed: int = 0
+    script: list[dict[str, Any]] = field(default_factory=list)
+
+
+def _digest(seed: int, text: str) -> int:
+    return int.from_bytes(hashlib.sha256(f"{seed}:{text}".encode()).digest()[:8], "big")
+
+
+def _answer_key(text: str) -> str:
+    """The answer-choice block of a prompt (identical across the router and solver prompts)."""
+    choices = _CHOICE_LINE.findall(text)
+    return "\n".join(choices) if choices else text
+
+
+def scripted_answer(choices_text: str, seed: int = 0) -> str:
+    """Answer letter the fake provider gives for a formatted choice block ("A. ...\\nB. ...")."""
+    count = max(len(_CHOICE_LINE.findall(choices_text)), 1)
+    return "ABCDEFGHIJKLMNOPQRSTUVWXYZ"[_digest(seed, _answer_key(choices_text)) % min(count, 26)]
+
+
+def scripted_route(choices_text: str, seed: int = 0) -> str:
+    """Route the fake provider's router answer gives for a formatted choice block."""
+    return _ROUTES[_digest(seed + 1, _answer_key(choices_text)) % len(_ROUTES)]
+
+
+@lru_cache(maxsize=65536)
+def _word_vector(word: str, dim: int) -> np.ndarray:
+    rng = np.random.default_rng(_digest(0, word))
+    return rng.standard_normal(dim).astype(np.float32)
+
+
+def fake_embedding(text: str, dim: int) -> list[float]:
+    """Deterministic bag-of-words embedding, so texts sharing words land close together."""
+    vector = np.zeros(dim, dtype=np.float32)
+    for word in text.lower().split():
+        vector += _word_vector(word, dim)
+    norm = float(np.linalg.norm(vector))
+    if norm == 0:
+        vector = _word_vector("", dim)
+        norm = float(np.linalg.norm(vector))
+    return (vector / norm).tolist()
+
+
+class FakeProvider:
+    """Shared state of the fake server: configuration, quota bucket, RNG and counters."""
+
+    def __init__(self, config: FakeProviderConfig):
+        self.config = config
+        self.counts: dict[str, int] = {}
+        self._rng = random.Random(config.seed)
+        self._tokens = config.rpm / 60 if config.rpm else 0.0
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def count(self, kind: str, status: int) -> None:
+        key = f"{kind} {status}"
+        with self._lock:
+            self.counts[key] = self.counts.get(key, 0) + 1
+
+    def random(self) -> float:
+        with self._lock:
+            return self._rng.random()
+
+    def sample_latency(self, median_ms: float) -> float:
+        """Seconds of latency drawn from the configured distribution around `median_ms`."""
+        with self._lock:
+            rng = self._rng
+            dist = self.config.latency_dist
+            if dist == "fixed":
+                ms = median_ms
+            elif dist == "uniform":
+                ms = rng.uniform(0, 2 * median_ms)
+            elif dist == "exponential":
+                ms = rng.expovariate(math.log(2) / median_ms) if median_ms > 0 else 0.0
+            else:
+                ms = rng.lognormvariate(math.log(max(median_ms, 1e-3)), self.config.latency_sigma)
+        return ms / 1000
+
+    def take_quota(self) -> bool:
+        """Consume one request from the per-minute quota (always True without --rpm)."""
+        if not self.config.rpm:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            burst = max(self.config.rpm / 60, 1.0)
+            self._tokens = min(burst, self._tokens + (now - self._updated) * self.config.rpm / 60)
+            self._updated = now
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+    def match_rule(self, text: str) -> dict[str, Any]:
+        for rule in self.config.script:
+            if rule.get("contains", "") in text:
+                return rule
+        return {}
+
+    def chat_reply(self, messages: list[dict[str, Any]]) -> str | None:
+        """Scripted reply for a chat request, or None for a safety refusal."""
+        system = "\n".join(str(m.get("content", "")) for m in messages if m.get("role") == "system")
+        users = [str(m.get("content", "")) for m in messages if m.get("role") == "user"]
+        question = users[0] if users else ""
+        rule = self.match_rule(question)
+        if rule.get("error") == "toxic":
+            return None
+
+        seed = self.config.seed
+        if "Chỉ trả về đúng 1 từ" in system:
+            if self.random() < self.config.toxic_rate:
+                return "toxic"
+            return rule.get("route") or scripted_route(question, seed)
+
+        answer = rule.get("answer") or scripted_answer(question, seed)
+        if "reply" in rule:
+            return rule["reply"]
+        if "Python" in system:
+            return (
+                f'Lời giải bằng code:\n```python\nprint("Đáp án: {answer}")\n```\n'
+                "Kết quả in ra đáp án."
+            )
+        return (
+            "Phân tích: đối chiếu câu hỏi với từng lựa chọn.\n"
+            f"Đáp án: {answer}\n"
+            "Giải thích: các lựa chọn còn lại không phù hợp với nội dung câu hỏi."
+        )
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return dict(sorted(self.counts.items()))
+
+
+def provider_env(url: str) -> dict[str, str]:
+    """Settings environment variables that point the pipeline at a fake provider URL."""
+    credentials = {}
+    for model in ("SMALL", "LARGE", "EMBEDDING"):
+        credentials[f"VNPT_{model}_AUTHORIZATION"] = "Bearer fake"
+        credentials[f"VNPT_{model}_TOKEN_ID"] = "fake"
+        credentials[f"VNPT_{model}_TOKEN_KEY"] = "fake"
+    return {
+        "VNPT_SMALL_ENDPOINT": f"{url}{VNPT_CHAT_PREFIX}vnptai-hackathon-small",
+        "VNPT_LARGE_ENDPOINT": f"{url}{VNPT_CHAT_PREFIX}vnptai-hackathon-large",
+        "VNPT_EMBEDDING_ENDPOINT": f"{url}{VNPT_EMBEDDING_PATH}",
+        "OPENROUTER_ENDPOINT": f"{url}{OPENROUTER_CHAT_PATH}",
+        "OPENROUTER_API_KEY": "fake",
+        **credentials,
+    }
+
+
+class FakeProviderHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "FakeProviderServer"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def _send_json(
+        self, status: int, body: dict[str, Any], headers: dict[str, str] | None = None
+    ) -> None:
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self) -> None:
+        if self.path == "/stats":
+            self._send_json(200, self.server.provider.stats())
+        else:
+            self._send_json(404, {"error": {"message": "Not found"}})
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError:
+            self._send_json(400, {"error": {"message": "Invalid JSON"}})
+            return
+
+        if self.path.startswith(VNPT_CHAT_PREFIX):
+            kind = "vnpt-chat"
+        elif self.path == VNPT_EMBEDDING_PATH:
+            kind = "vnpt-embedding"
+        elif self.path == OPENROUTER_CHAT_PATH:
+            kind = "openrouter-chat"
+        else:
+            self._send_json(404, {"error": {"message": f"Unknown endpoint {self.path}"}})
+            return
+
+        status = self._inject_fault(kind)
+        if status is None:
+            status = (
+                self._handle_embedding(payload)
+                if kind == "vnpt-embedding"
+                else self._handle_chat(payload)
+            )
+        self.server.provider.count(kind, status)
+
+    def _authorized(self, kind: str) -> bool:
+        if kind.startswith("vnpt"):
+            return all(
+                self.headers.get(name) for name in ("Authorization", "Token-id", "Token-key")
+            )
+        return (self.headers.get("Authorization") or "").startswith("Bearer ")
+
+    def _inject_fault(self, kind: str) -> int | None:
+        """Send an auth, quota or server error response if one is due; return its status."""
+        provider = self.server.provider
+        config = provider.config
+        retry_after = {"Retry-After": f"{config.retry_after:g}"}
+
+        if not self._authorized(kind):
+            self._send_json(401, {"error": {"message": "Unauthorized: missing credentials"}})
+            return 401
+        if not provider.take_quota():
+            headers = {**retry_after, "X-RateLimit-Remaining": "0"}
+            self._send_json(
+                429, {"error": {"message": "Too Many Requests: quota exceeded"}}, headers
+            )
+            return 429
+
+        roll = provider.random()
+        if roll < config.rate_429:
+            self._send_json(429, {"error": {"message": "Too Many Requests"}}, retry_after)
+            return 429
+        roll -= config.rate_429
+        if roll < config.rate_401 and kind.startswith("vnpt"):
+            self._send_json(401, {"error": {"message": "Rate limit exceeded for this token"}})
+            return 401
+        roll -= config.rate_401
+        if roll < config.rate_5xx:
+            status = (500, 502, 503, 504)[int(provider.random() * 4)]
+            time.sleep(provider.sample_latency(config.latency_ms) / 2)
+            self._send_json(status, {"error": {"message": "Upstream model server error"}})
+            return status
+        return None
+
+    def _handle_embedding(self, payload: dict[str, Any]) -> int:
+        provider = self.server.provider
+        texts = payload.get("input") or []
+        if isinstance(texts, str):
+            texts = [texts]
+        max_batch = provider.config.embedding_max_batch
+        if max_batch and len(texts) > max_batch:
+            message = f"Request too large: maximum {max_batch} inputs per request"
+            self._send_json(413, {"error": {"message": message}})
+            return 413
+        time.sleep(provider.sample_latency(provider.config.embedding_latency_ms))
+        data = [
+            {
+                "object": "embedding",
+                "index": i,
+                "embedding": fake_embedding(text, provider.config.embedding_dim),
+            }
+            for i, text in enumerate(texts)
+        ]
+        tokens = sum(len(text) for text in texts) // 4
+        self._send_json(200, {
+            "object": "list",
+            "model": payload.get("model", ""),
+            "data": data,
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        })
+        return 200
+
+    def _handle_chat(self, payload: dict[str, Any]) -> int:
+        provider = self.server.provider
+        messages = payload.get("messages") or []
+        reply = provider.chat_reply(messages)
+        latency = provider.sample_latency(provider.config.latency_ms)
+
+        if reply is None:
+            time.sleep(latency)
+            self._send_json(400, {"error": {"message": SAFETY_REFUSAL}})
+            return 400
+
+        tokens = re.findall(r"\S+\s*|\s+", reply)
+        usage = {
+            "prompt_tokens": sum(len(str(m.get("content", ""))) for m in messages) // 4,
+            "completion_tokens": len(tokens),
+        }
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        model = payload.get("model", "")
+
+        if not payload.get("stream"):
+            time.sleep(latency + len(tokens) * provider.config.token_ms / 1000)
+            self._send_json(
+                200,
+                {
+                    "id": f"chatcmpl-{_digest(0, reply):x}",
+                    "object": "chat.completion",
+                    "model": model,
+                    "choices": [
+                        {
+                            "index": 0,
+                            "message": {"role": "assistant", "content": reply},
+                            "finish_reason": "stop",
+                        }
+                    ],
+                    "usage": usage,
+                },
+            )
+            return 200
+
+        time.sleep(latency)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for token in tokens:
+                self._send_event({"object": "chat.completion.chunk", "model": model, "choices": [
+                    {"index": 0, "delta": {"content": token}, "finish_reason": None}
+                ]})
+                time.sleep(provider.config.token_ms / 1000)
+            self._send_event({"object": "chat.completion.chunk", "model": model, "choices": [
+                {"index": 0, "delta": {}, "finish_reason": "stop"}
+            ]})
+            self._send_event(
+                {"object": "chat.completion.chunk", "model": model, "choices": [], "usage": usage}
+            )
+            self._write_chunk(b"data: [DONE]\n\n")
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # Client stopped reading (early stop)
+            self.close_connection = True
+            return 499
+        return 200
+
+    def _send_event(self, event: dict[str, Any]) -> None:
+        self._write_chunk(
+            b"data: " + json.dumps(event, ensure_ascii=False).encode("utf-8") + b"\n\n"
+        )
+
+    def _write_chunk(self, data: bytes) -> None:
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+
+class FakeProviderServer(ThreadingHTTPServer):
+    """Threaded HTTP server for the fake provider; use `start()` to run it in the background."""
+
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, config: FakeProviderConfig, host: str = "127.0.0.1", port: int = 0):
+        super().__init__((host, port), FakeProviderHandler)
+        self.provider = FakeProvider(config)
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def env(self) -> dict[str, str]:
+        """Settings environment variables that point the pipeline at this server."""
+        return provider_env(self.url)
+
+    def start(self) -> "FakeProviderServer":
+        self._thread = threading.Thread(
+            target=self.serve_forever, name="fake-provider", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+
+def add_config_arguments(parser: argparse.ArgumentParser) -> None:
+    """Register the latency / fault-injection options (shared with the benchmark script)."""
+    group = parser.add_argument_group("fake provider")
+    group.add_argument(
+        "--latency-ms", type=float, default=300.0, help="Median chat latency before the first token"
+    )
+    group.add_argument(
+        "--latency-dist",
+        choices=["fixed", "uniform", "exponential", "lognormal"],
+        default="lognormal",
+        help="Latency distribution around the median",
+    )
+    group.add_argument(
+        "--latency-sigma", type=float, default=0.5, help="Lognormal spread (tail heaviness)"
+    )
+    group.add_argument("--embedding-latency-ms", type=float, default=50.0)
+    group.add_argument("--token-ms", type=float, default=2.0, help="Delay per generated token")
+    group.add_argument(
+        "--error-429", type=float, default=0.0, help="Fraction of requests answered 429"
+    )
+    group.add_argument(
+        "--error-401", type=float, default=0.0, help="Fraction answered VNPT-style 401 rate limit"
+    )
+    group.add_argument(
+        "--error-5xx", type=float, default=0.0, help="Fraction answered 500/502/503/504"
+    )
+    group.add_argument(
+        "--toxic-rate", type=float, default=0.0, help="Fraction of router calls answered 'toxic'"
+    )
+    group.add_argument(
+        "--retry-after", type=float, default=1.0, help="Retry-After seconds sent with 429s"
+    )
+    group.add_argument(
+        "--rpm", type=float, default=0.0, help="Server-side quota in requests/minute (0 = none)"
+    )
+    group.add_argument("--embedding-dim", type=int, default=256)
+    group.add_argument(
+        "--embedding-max-batch",
+        type=int,
+        default=0,
+        help="Answer 413 to embedding requests with more inputs (0 = no limit)",
+    )
+    group.add_argument("--seed", type=int, default=0)
+    group.add_argument("--script", help="JSON file of scripted rules (see examples)")
+
+
+def config_from_args(args: argparse.Namespace) -> FakeProviderConfig:
+    script = json.loads(Path(args.script).read_text(encoding="utf-8")) if args.script else []
+    return FakeProviderConfig(
+        latency_ms=args.latency_ms,
+        latency_dist=args.latency_dist,
+        latency_sigma=args.latency_sigma,
+        embedding_latency_ms=args.embedding_latency_ms,
+        token_ms=args.token_ms,
+        rate_429=args.error_429,
+        rate_401=args.error_401,
+        rate_5xx=args.error_5xx,
+        toxic_rate=args.toxic_rate,
+        retry_after=args.retry_after,
+        rpm=args.rpm,
+        embedding_dim=args.embedding_dim,
+        embedding_max_batch=args.embedding_max_batch,
+        seed=args.seed,
+        script=script,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run a fake VNPT/OpenRouter API server for load and chaos testing",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=EPILOG,
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    server = FakeProviderServer(config_from_args(args), args.host, args.port)
+    print(f"[Fake] Serving on {server.url} (GET /stats for counters)")
+    print("[Fake] Point the pipeline at it with:")
+    for name, value in server.env().items():
+        print(f"{name}={value}")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n[Fake] Stopped")
+    finally:
+        print(json.dumps(server.provider.stats(), indent=2))
+        server.server_close()
+        sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
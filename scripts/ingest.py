@@ -2,11 +2,15 @@
 """CLI script to ingest documents into Qdrant vector database.
 
 Supports:
-- JSON files from web crawler
+- JSON and JSONL files from web crawler
 - PDF files
 - DOCX files
 - TXT files
 - Directory of files
+
+With --sync, the default knowledge base (DATA_DIR, or each --dir) is brought up to date
+incrementally: only new or changed files are indexed and points of removed files are
+deleted. --append updates the given files in place the same way.
 """
 
 import argparse
@@ -18,8 +22,8 @@ _project_root = Path(__file__).resolve().parent.parent
 if str(_project_root) not in sys.path:
     sys.path.insert(0, str(_project_root))
 
-from src.config import settings
-from src.utils.ingestion import ingest_files
+from src.config import DATA_DIR, settings
+from src.utils.ingestion import ingest_all_data, ingest_files
 
 EPILOG = """
 Examples:
@@ -27,6 +31,8 @@ Examples:
   python scripts/ingest.py data/crawled/*.json --append
   python scripts/ingest.py documents/report.pdf --collection my_collection
   python scripts/ingest.py --dir data/documents
+  python scripts/ingest.py --sync
+  python scripts/ingest.py --sync --dir data/crawled --force
 """
 
 
@@ -36,16 +42,48 @@ def main():
         formatter_class=argparse.RawDescriptionHelpFormatter,
         epilog=EPILOG,
     )
-    parser.add_argument("files", nargs="*", help="Files to ingest (JSON, PDF, DOCX, TXT)")
+    parser.add_argument("files", nargs="*", help="Files to ingest (JSON, JSONL, PDF, DOCX, TXT)")
     parser.add_argument(
         "--dir",
         action="append",
         help="Directory containing files to ingest (can be used multiple times)",
     )
     parser.add_argument("--collection", help=f"Collection name (default: {settings.qdrant_collection})")
-    parser.add_argument("--append", action="store_true", help="Append to existing collection")
+    parser.add_argument(
+        "--append",
+        action="store_true",
+        help="Update existing collection (skip unchanged files, replace changed ones)",
+    )
+    parser.add_argument(
+        "--sync",
+        action="store_true",
+        help=(
+            f"Incrementally sync the default collection with {DATA_DIR} (or each --dir), "
+            "deleting removed files"
+        ),
+    )
+    parser.add_argument(
+        "--force", action="store_true", help="With --sync: rebuild the collection from scratch"
+    )
     
     args = parser.parse_args()
+
+    if args.sync:
+        if args.files or args.collection:
+            parser.error("--sync works on directories of the default collection; use --dir")
+        try:
+            for i, d in enumerate(args.dir or [DATA_DIR]):
+                dir_path = Path(d)
+                if not dir_path.is_dir():
+                    print(f"[Error] Directory not found: {d}")
+                    sys.exit(1)
+                # Only the first directory may wipe the collection
+                ingest_all_data(base_dir=dir_path, force=args.force and i == 0)
+            print("\n[Done]")
+        except KeyboardInterrupt:
+            print("\n[Cancelled]")
+            sys.exit(1)
+        return
     
     file_paths = []
     
@@ -61,7 +99,7 @@ def main():
         for d in args.dir:
             dir_path = Path(d)
             if dir_path.is_dir():
-                for ext in ["*.json", "*.pdf", "*.docx", "*.txt"]:
+                for ext in ["*.json", "*.jsonl", "*.pdf", "*.docx", "*.txt"]:
                     # Recursively include files in subdirectories
                     file_paths.extend(dir_path.rglob(ext))
             else:
@@ -13,7 +13,7 @@ DATA_DIR = Path(os.getenv("DATA_DIR", PROJECT_ROOT / "data"))
 DATA_INPUT_DIR = Path(os.getenv("DATA_INPUT_DIR", PROJECT_ROOT / "test_data"))
 DATA_OUTPUT_DIR = Path(os.getenv("DATA_OUTPUT_DIR", PROJECT_ROOT / "output"))
 DATA_CRAWLED_DIR = Path(os.getenv("DATA_CRAWLED_DIR", DATA_DIR / "crawled"))
-BATCH_SIZE = 1
+BATCH_SIZE = int(os.getenv("BATCH_SIZE", "64"))
 
 
 class Settings(BaseSettings):
@@ -88,6 +88,51 @@ class Settings(BaseSettings):
         alias="VNPT_EMBEDDING_ENDPOINT",
     )
 
+    # VNPT embedding batching (document ingestion)
+    embedding_batch_size: int = Field(
+        default=32,
+        alias="EMBEDDING_BATCH_SIZE",
+        description="Max texts per embedding request (halved if the API rejects a batch)",
+    )
+    embedding_max_batch_chars: int = Field(
+        default=32_000,
+        alias="EMBEDDING_MAX_BATCH_CHARS",
+        description="Max total characters per embedding request",
+    )
+    embedding_concurrency: int = Field(
+        default=4,
+        alias="EMBEDDING_CONCURRENCY",
+        description="Embedding requests kept in flight while embedding documents",
+    )
+
+    # Query embedding micro-batching (concurrent RAG questions)
+    query_embed_batch_max_size: int = Field(
+        default=32,
+        alias="QUERY_EMBED_BATCH_MAX_SIZE",
+        description="Max concurrent queries embedded in one backend call (1 disables batching)",
+    )
+    query_embed_batch_window_ms: float = Field(
+        default=20.0,
+        alias="QUERY_EMBED_BATCH_WINDOW_MS",
+        description="How long the first waiting query waits for others to join its batch",
+    )
+
+    # On-disk embedding cache (both backends, documents and queries)
+    embedding_cache_enabled: bool = Field(
+        default=True,
+        alias="EMBEDDING_CACHE_ENABLED",
+        description="Reuse vectors of texts embedded before, keyed by model and text hash",
+    )
+    embedding_cache_path: str = Field(
+        default="",
+        alias="EMBEDDING_CACHE_PATH",
+    )
+    embedding_cache_dtype: str = Field(
+        default="float16",
+        alias="EMBEDDING_CACHE_DTYPE",
+        description="Storage precision of cached vectors: float16 or float32",
+    )
+
     # Local HuggingFace models
     llm_model_small: str = Field(
         default="/mnt/dataset1/pretrained_fm/Qwen_Qwen3-4B-Instruct-2507",
@@ -101,6 +146,30 @@ class Settings(BaseSettings):
         default="bkai-foundation-models/vietnamese-bi-encoder",
         alias="EMBEDDING_MODEL",
     )
+    local_embedding_backend: str = Field(
+        default="torch",
+        alias="LOCAL_EMBEDDING_BACKEND",
+        description="Local embedding runtime: torch, torch-int8, onnx or onnx-int8 (last 3 on CPU)",
+    )
+    embedding_threads: int = Field(
+        default=0,
+        alias="EMBEDDING_THREADS",
+        description="CPU threads for local embedding inference (0 = library default)",
+    )
+    local_embedding_batch_tokens: int = Field(
+        default=8192,
+        alias="LOCAL_EMBEDDING_BATCH_TOKENS",
+        description="Padded tokens per local embedding batch; texts are batched by token length",
+    )
+    embedding_onnx_quantization: str = Field(
+        default="avx2",
+        alias="EMBEDDING_ONNX_QUANTIZATION",
+        description="Dynamic int8 config for onnx-int8: arm64, avx2, avx512 or avx512_vnni",
+    )
+    embedding_export_path: str = Field(
+        default="",
+        alias="EMBEDDING_EXPORT_PATH",
+    )
 
     # OpenRouter API
     openrouter_api_key: str = Field(
@@ -130,6 +199,263 @@ class Settings(BaseSettings):
         description="Optional app title for OpenRouter X-Title header",
     )
 
+    # Multi-provider routing (overrides USE_OPENROUTER_API/USE_VNPT_API for chat models)
+    llm_providers: str = Field(
+        default="",
+        alias="LLM_PROVIDERS",
+        description="Comma-separated chat backends to route between: vnpt, openrouter, local",
+    )
+    provider_priorities: dict[str, int] = Field(
+        default_factory=dict,
+        alias="PROVIDER_PRIORITIES",
+        description='JSON, e.g. {"vnpt": 0, "openrouter": 1, "local": 2}; lower tiers go first',
+    )
+    provider_weights: dict[str, float] = Field(
+        default_factory=dict,
+        alias="PROVIDER_WEIGHTS",
+        description='JSON, e.g. {"vnpt_large": 2.0}; a higher weight is favoured within a tier',
+    )
+    provider_quotas: dict[str, int] = Field(
+        default_factory=dict,
+        alias="PROVIDER_QUOTAS",
+        description='JSON max calls per run, e.g. {"openrouter": 5000, "vnpt_large": 500}',
+    )
+    provider_cooldown: float = Field(
+        default=60.0,
+        alias="PROVIDER_COOLDOWN",
+        description="Seconds a throttled backend is skipped when the provider gives no Retry-After",
+    )
+
+    # Shared HTTP connection pools (API backends)
+    http2: bool = Field(
+        default=False,
+        alias="HTTP2",
+        description="Negotiate HTTP/2 with API endpoints (requires the 'h2' package)",
+    )
+    http_max_connections: int = Field(
+        default=100,
+        alias="HTTP_MAX_CONNECTIONS",
+    )
+    http_max_keepalive_connections: int = Field(
+        default=20,
+        alias="HTTP_MAX_KEEPALIVE_CONNECTIONS",
+    )
+    http_keepalive_expiry: float = Field(
+        default=60.0,
+        alias="HTTP_KEEPALIVE_EXPIRY",
+        description="Seconds an idle pooled connection is kept alive",
+    )
+    http_timeout: float = Field(
+        default=60.0,
+        alias="HTTP_TIMEOUT",
+    )
+    http_connect_timeout: float = Field(
+        default=10.0,
+        alias="HTTP_CONNECT_TIMEOUT",
+        description="Timeout for connection warmup requests",
+    )
+
+    # Adaptive per-endpoint rate limiting
+    rate_limit_rpm: float = Field(
+        default=0.0,
+        alias="RATE_LIMIT_RPM",
+        description="Token-bucket request rate per endpoint (requests/minute, 0 = unlimited)",
+    )
+    rate_limit_burst: int = Field(
+        default=5,
+        alias="RATE_LIMIT_BURST",
+    )
+    rate_limit_max_retries: int = Field(
+        default=20,
+        alias="RATE_LIMIT_MAX_RETRIES",
+        description="How many times a rate-limited request is paused and retried before failing",
+    )
+    rate_limit_default_pause: float = Field(
+        default=5.0,
+        alias="RATE_LIMIT_DEFAULT_PAUSE",
+        description="Base pause (seconds) after a 429 without Retry-After; doubles per attempt",
+    )
+    rate_limit_max_pause: float = Field(
+        default=300.0,
+        alias="RATE_LIMIT_MAX_PAUSE",
+    )
+    rate_limit_question_retries: int = Field(
+        default=3,
+        alias="RATE_LIMIT_QUESTION_RETRIES",
+        description="Times a question is re-queued if a rate limit still escapes the HTTP layer",
+    )
+    concurrency_initial: int = Field(
+        default=4,
+        alias="CONCURRENCY_INITIAL",
+        description="Starting in-flight request limit per endpoint (AIMD controlled)",
+    )
+    concurrency_min: int = Field(
+        default=1,
+        alias="CONCURRENCY_MIN",
+    )
+    concurrency_max: int = Field(
+        default=32,
+        alias="CONCURRENCY_MAX",
+    )
+
+    # Retries and circuit breaking for transient provider failures
+    retry_max_attempts: int = Field(
+        default=4,
+        alias="RETRY_MAX_ATTEMPTS",
+        description="Attempts per request on transport errors and 5xx responses (1 = no retries)",
+    )
+    retry_base_delay: float = Field(
+        default=0.5,
+        alias="RETRY_BASE_DELAY",
+    )
+    retry_max_delay: float = Field(
+        default=10.0,
+        alias="RETRY_MAX_DELAY",
+    )
+    retry_budget_ratio: float = Field(
+        default=0.2,
+        alias="RETRY_BUDGET_RATIO",
+        description="Retries per run as a fraction of requests (on top of RETRY_BUDGET_MIN)",
+    )
+    retry_budget_min: int = Field(
+        default=20,
+        alias="RETRY_BUDGET_MIN",
+    )
+    circuit_failure_threshold: int = Field(
+        default=5,
+        alias="CIRCUIT_FAILURE_THRESHOLD",
+        description="Consecutive failures that open an endpoint's circuit breaker",
+    )
+    circuit_reset_timeout: float = Field(
+        default=30.0,
+        alias="CIRCUIT_RESET_TIMEOUT",
+        description="Seconds an open circuit waits before letting a probe request through",
+    )
+
+    # Hedged requests (async calls to the large model)
+    hedge_large_model: bool = Field(
+        default=False,
+        alias="HEDGE_LARGE_MODEL",
+        description="Duplicate a large-model request that runs past the latency percentile",
+    )
+    hedge_percentile: float = Field(
+        default=95.0,
+        alias="HEDGE_PERCENTILE",
+    )
+    hedge_min_delay: float = Field(
+        default=2.0,
+        alias="HEDGE_MIN_DELAY",
+        description="Never hedge earlier than this many seconds",
+    )
+    hedge_min_samples: int = Field(
+        default=20,
+        alias="HEDGE_MIN_SAMPLES",
+        description="Latency samples required before hedging starts",
+    )
+    hedge_budget_ratio: float = Field(
+        default=0.05,
+        alias="HEDGE_BUDGET_RATIO",
+        description="Duplicate requests allowed per run as a fraction of hedgeable requests",
+    )
+    hedge_budget_min: int = Field(
+        default=5,
+        alias="HEDGE_BUDGET_MIN",
+    )
+
+    # Local HuggingFace dynamic batching and prefix KV reuse
+    local_batch_max_size: int = Field(
+        default=8,
+        alias="LOCAL_BATCH_MAX_SIZE",
+        description="Max requests decoded together by a local model (1 disables batching)",
+    )
+    local_batch_window_ms: float = Field(
+        default=20.0,
+        alias="LOCAL_BATCH_WINDOW_MS",
+        description="How long the first queued request waits for others to join its batch",
+    )
+
+    local_prefix_cache_size: int = Field(
+        default=8,
+        alias="LOCAL_PREFIX_CACHE_SIZE",
+        description="System-prompt prefixes whose KV cache is kept per local model (0 disables)",
+    )
+    local_prefix_min_tokens: int = Field(
+        default=32,
+        alias="LOCAL_PREFIX_MIN_TOKENS",
+        description="Shorter prefixes are not worth caching",
+    )
+
+    # Streaming
+    stream_early_stop: bool = Field(
+        default=True,
+        alias="STREAM_EARLY_STOP",
+        description="Stream node generations and stop once the answer (or code block) is emitted",
+    )
+
+    # Async graph execution
+    sync_executor_workers: int = Field(
+        default=16,
+        alias="SYNC_EXECUTOR_WORKERS",
+        description="Threads for blocking work left in async nodes (vector search, code execution)",
+    )
+
+    # Per-resource concurrency inside graph nodes. BATCH_SIZE only bounds questions in flight
+    # and defaults well above these limits, so they are what throttles model and embedding calls
+    limit_small_model: int = Field(
+        default=16,
+        alias="LIMIT_SMALL_MODEL",
+        description="Concurrent small-model (router) calls",
+    )
+    limit_large_model: int = Field(
+        default=16,
+        alias="LIMIT_LARGE_MODEL",
+        description="Concurrent large-model (solver) calls",
+    )
+    limit_embeddings: int = Field(
+        default=16,
+        alias="LIMIT_EMBEDDINGS",
+        description="Concurrent query-embedding backend calls (each may carry a micro-batch)",
+    )
+    limit_code_execution: int = Field(
+        default=1,
+        alias="LIMIT_CODE_EXECUTION",
+        description="Concurrent logic-solver code runs (PythonREPL executes them one at a time)",
+    )
+
+    # Token usage accounting
+    token_prices: dict[str, list[float]] = Field(
+        default_factory=dict,
+        alias="TOKEN_PRICES",
+        description=(
+            "JSON USD per 1M [input, output] tokens by model name, "
+            'e.g. {"openai/gpt-4o-mini": [0.15, 0.6]}'
+        ),
+    )
+
+    # On-disk LLM response cache
+    llm_cache_enabled: bool = Field(
+        default=True,
+        alias="LLM_CACHE_ENABLED",
+        description="Serve repeated identical chat requests from a persistent SQLite cache",
+    )
+    llm_cache_path: str = Field(
+        default="",
+        alias="LLM_CACHE_PATH",
+    )
+    llm_cache_max_entries: int = Field(
+        default=100_000,
+        alias="LLM_CACHE_MAX_ENTRIES",
+    )
+    llm_cache_max_mb: int = Field(
+        default=512,
+        alias="LLM_CACHE_MAX_MB",
+    )
+    llm_cache_max_age_days: float = Field(
+        default=30.0,
+        alias="LLM_CACHE_MAX_AGE_DAYS",
+        description="Entries older than this are ignored and evicted (0 disables age eviction)",
+    )
+
     # Vector database
     qdrant_collection: str = Field(
         default="vnpt_knowledge_base",
@@ -139,6 +465,43 @@ class Settings(BaseSettings):
         default="",
         alias="VECTOR_DB_PATH",
     )
+    index_snapshot_path: str = Field(
+        default="",
+        alias="INDEX_SNAPSHOT_PATH",
+        description="Prebuilt index snapshot restored when the local index is missing or outdated",
+    )
+
+    # Staged ingestion (parse processes -> embedding -> upsert)
+    ingest_workers: int = Field(
+        default=0,
+        alias="INGEST_WORKERS",
+        description="Processes parsing and chunking files (0 = CPU count, 1 = in-process)",
+    )
+    ingest_batch_chunks: int = Field(
+        default=512,
+        alias="INGEST_BATCH_CHUNKS",
+        description="Chunks per embed+upsert batch (large files are split, small files combined)",
+    )
+    ingest_memory_limit_mb: int = Field(
+        default=512,
+        alias="INGEST_MEMORY_LIMIT_MB",
+        description="Approximate ceiling for chunks and vectors held between parsing and upsert",
+    )
+    ingest_queue_size: int = Field(
+        default=8,
+        alias="INGEST_QUEUE_SIZE",
+        description="Parsed files waiting for the embedding stage before parsing pauses",
+    )
+    near_duplicate_filter_enabled: bool = Field(
+        default=True,
+        alias="NEAR_DUPLICATE_FILTER_ENABLED",
+        description="Skip chunks that nearly duplicate a chunk already in the index (SimHash)",
+    )
+    near_duplicate_max_distance: int = Field(
+        default=3,
+        alias="NEAR_DUPLICATE_MAX_DISTANCE",
+        description="Bits in which 64-bit SimHash fingerprints of near-duplicate chunks may differ",
+    )
 
     chunk_size: int = 1000
     chunk_overlap: int = 100
@@ -151,6 +514,39 @@ class Settings(BaseSettings):
             return Path(self.vector_db_path)
         return DATA_DIR / "qdrant_storage"
 
+    @property
+    def index_snapshot_path_resolved(self) -> Path:
+        """Resolve index snapshot directory, defaulting to DATA_DIR/index_snapshot."""
+        if self.index_snapshot_path:
+            return Path(self.index_snapshot_path)
+        return DATA_DIR / "index_snapshot"
+
+    @property
+    def llm_provider_list(self) -> list[str]:
+        """Providers named in LLM_PROVIDERS, in order."""
+        return [p.strip().lower() for p in self.llm_providers.split(",") if p.strip()]
+
+    @property
+    def embedding_cache_path_resolved(self) -> Path:
+        """Resolve embedding cache directory, defaulting to DATA_DIR/embedding_cache."""
+        if self.embedding_cache_path:
+            return Path(self.embedding_cache_path)
+        return DATA_DIR / "embedding_cache"
+
+    @property
+    def embedding_export_path_resolved(self) -> Path:
+        """Resolve the exported ONNX models directory, defaulting to DATA_DIR/embedding_models."""
+        if self.embedding_export_path:
+            return Path(self.embedding_export_path)
+        return DATA_DIR / "embedding_models"
+
+    @property
+    def llm_cache_path_resolved(self) -> Path:
+        """Resolve LLM cache path, defaulting to DATA_DIR/llm_cache.sqlite."""
+        if self.llm_cache_path:
+            return Path(self.llm_cache_path)
+        return DATA_DIR / "llm_cache.sqlite"
+
     class Config:
         env_file = ".env"
         extra = "ignore"
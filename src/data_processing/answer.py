@@ -11,6 +11,10 @@ import string
 
 from src.utils.logging import print_log
 
+# "Đáp án: B" / "**Answer:** C" followed by at least one non-word character, so a
+# partially streamed "Đáp án: A..." (e.g. the start of a word) is not taken as final.
+_FINAL_ANSWER_PATTERN = re.compile(r"(?i:Đáp án|Answer)\s*\**\s*:\s*\**\s*([A-Z])(?=\W)")
+
 
 def extract_answer(response: str, max_choices: int = 26) -> str:
     """Extract answer letter from LLM response (supports CoT format).
@@ -53,6 +57,25 @@ def extract_answer(response: str, max_choices: int = 26) -> str:
     return "A"
 
 
+def find_final_answer(text: str, max_choices: int = 26) -> str | None:
+    """Return the letter of a definitive "Đáp án: X" statement in partial output.
+
+    Used to stop streaming generation early. Only the explicit colon form counts, and
+    the letter must already be followed by another character.
+
+    Args:
+        text: Response text generated so far
+        max_choices: Maximum number of valid choices (A-Z)
+
+    Returns:
+        Answer letter, or None if no definitive answer has been emitted yet
+    """
+    match = _FINAL_ANSWER_PATTERN.search(text)
+    if match and match.group(1) in string.ascii_uppercase[:max_choices]:
+        return match.group(1)
+    return None
+
+
 def validate_answer(answer: str, num_choices: int) -> tuple[bool, str]:
     """Validate if answer is within valid range and normalize it.
     
@@ -26,4 +26,7 @@ class InferenceLogEntry(BaseModel):
     final_answer: str = Field(description="Final predicted answer")
     raw_response: str = Field(default="", description="Raw LLM response")
     route: str = Field(default="unknown", description="Pipeline route taken")
-    retrieved_context: str = Field(default="", description="Retrieved context from RAG")
\ No newline at end of file
+    retrieved_context: str = Field(default="", description="Retrieved context from RAG")
+    token_usage: dict[str, dict[str, int]] = Field(
+        default_factory=dict, description="LLM calls and tokens per graph node"
+    )
\ No newline at end of file
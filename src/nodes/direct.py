@@ -2,14 +2,16 @@
 
 from langchain_core.prompts import ChatPromptTemplate
 
-from src.data_processing.answer import extract_answer
+from src.data_processing.answer import extract_answer, find_final_answer
 from src.state import GraphState, format_choices, get_choices_from_state
 from src.utils.llm import get_large_model
 from src.utils.logging import print_log
 from src.utils.prompts import load_prompt
+from src.utils.resource_limits import LARGE_MODEL, get_resource_limiter
+from src.utils.streaming import agenerate_until
 
 
-def direct_answer_node(state: GraphState) -> dict:
+async def direct_answer_node(state: GraphState) -> dict:
     """Answer questions directly using Large Model (Skip Retrieval)."""
     print_log("        [Direct] Processing Reading Comprehension/General Question...")
 
@@ -26,12 +28,17 @@ def direct_answer_node(state: GraphState) -> dict:
         ("human", user_prompt),
     ])
 
-    chain = prompt | llm
-    response = chain.invoke({})
+    num_choices = len(all_choices) or 4
+    async with get_resource_limiter(LARGE_MODEL):
+        response = await agenerate_until(
+            llm,
+            prompt.format_messages(),
+            lambda text: find_final_answer(text, num_choices) is not None,
+        )
 
     content = response.content.strip()
     print_log(f"        [Direct] Reasoning: {content}...")
 
-    answer = extract_answer(content, max_choices=len(all_choices) or 4)
+    answer = extract_answer(content, max_choices=num_choices)
     print_log(f"        [Direct] Final Answer: {answer}")
     return {"answer": answer, "raw_response": content}
@@ -1,17 +1,23 @@
 """Logic solver node implementing a Manual Code Execution workflow."""
 
 import re
+import threading
 
 from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
 from langchain_experimental.utilities import PythonREPL
 
 from src.data_processing.answer import extract_answer
 from src.state import GraphState, format_choices, get_choices_from_state
+from src.utils.executor import run_blocking
 from src.utils.llm import get_large_model
 from src.utils.logging import print_log
 from src.utils.prompts import load_prompt
+from src.utils.resource_limits import CODE_EXECUTION, LARGE_MODEL, get_resource_limiter
+from src.utils.streaming import agenerate_until
 
 _python_repl = PythonREPL()
+# PythonREPL swaps the process-wide sys.stdout while it executes, so runs cannot overlap
+_python_repl_lock = threading.Lock()
 
 
 def extract_python_code(text: str) -> str | None:
@@ -27,7 +33,12 @@ def _indent_code(code: str) -> str:
     return "\n".join(f"        {line}" for line in code.splitlines())
 
 
-def logic_solver_node(state: GraphState) -> dict:
+def _run_code(code: str) -> str:
+    with _python_repl_lock:
+        return _python_repl.run(code)
+
+
+async def logic_solver_node(state: GraphState) -> dict:
     """Solve math/logic questions using Python code execution."""
     llm = get_large_model()
     all_choices = get_choices_from_state(state)
@@ -45,7 +56,12 @@ def logic_solver_node(state: GraphState) -> dict:
 
     max_steps = 5
     for step in range(max_steps):
-        response = llm.invoke(messages)
+        # Only the first code block is executed; stop before the model imagines its output
+        # Slots are taken per step, so a long self-correction loop does not hold one throughout
+        async with get_resource_limiter(LARGE_MODEL):
+            response = await agenerate_until(
+                llm, messages, lambda text: extract_python_code(text) is not None
+            )
         content = response.content
         raw_responses.append(content)
         messages.append(response)
@@ -67,7 +83,8 @@ def logic_solver_node(state: GraphState) -> dict:
                             var_name = last_line.strip()
                         code_block += f"\nprint({var_name})"
 
-                output = _python_repl.run(code_block)
+                async with get_resource_limiter(CODE_EXECUTION):
+                    output = await run_blocking(_run_code, code_block)
                 output = output.strip() if output else "No output."
                 print_log(f"        [Logic] Code output: {output}")
 
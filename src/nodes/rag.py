@@ -1,23 +1,36 @@
 """RAG node for knowledge-based question answering."""
 
+from langchain_core.documents import Document
 from langchain_core.prompts import ChatPromptTemplate
 
 from src.config import settings
-from src.data_processing.answer import extract_answer
+from src.data_processing.answer import extract_answer, find_final_answer
 from src.state import GraphState, format_choices, get_choices_from_state
+from src.utils.executor import run_blocking
 from src.utils.ingestion import get_vector_store
 from src.utils.llm import get_large_model
 from src.utils.logging import print_log
 from src.utils.prompts import load_prompt
+from src.utils.resource_limits import LARGE_MODEL, get_resource_limiter
+from src.utils.streaming import agenerate_until
 
 
-def knowledge_rag_node(state: GraphState) -> dict:
-    """Retrieve relevant context and answer knowledge-based questions."""
+async def _retrieve(query: str) -> list[Document]:
+    """Embed the query and search the local Qdrant index without blocking the event loop."""
     vector_store = get_vector_store()
+    # Cache hits return at once; misses join a micro-batch that holds an EMBEDDINGS slot
+    embedding = await vector_store.embeddings.aembed_query(query)
+    return await run_blocking(
+        vector_store.similarity_search_by_vector, embedding, k=settings.top_k_retrieval
+    )
+
+
+async def knowledge_rag_node(state: GraphState) -> dict:
+    """Retrieve relevant context and answer knowledge-based questions."""
     query = state["question"]
     print_log(f"        [RAG] Retrieving context for: '{query}'")
 
-    docs = vector_store.similarity_search(query, k=settings.top_k_retrieval)
+    docs = await _retrieve(query)
     context = "\n\n".join([doc.page_content for doc in docs])
 
     if docs:
@@ -38,11 +51,16 @@ def knowledge_rag_node(state: GraphState) -> dict:
         ("human", user_prompt),
     ])
 
-    chain = prompt | llm
-    response = chain.invoke({})
+    num_choices = len(all_choices) or 4
+    async with get_resource_limiter(LARGE_MODEL):
+        response = await agenerate_until(
+            llm,
+            prompt.format_messages(),
+            lambda text: find_final_answer(text, num_choices) is not None,
+        )
     content = response.content.strip()
     print_log(f"        [RAG] Reasoning: {content}")
 
-    answer = extract_answer(content, max_choices=len(all_choices) or 4)
+    answer = extract_answer(content, max_choices=num_choices)
     print_log(f"        [RAG] Final Answer: {answer}")
     return {"answer": answer, "context": context, "raw_response": content}
@@ -9,6 +9,7 @@ from src.state import GraphState, format_choices, get_choices_from_state
 from src.utils.llm import get_small_model
 from src.utils.logging import print_log
 from src.utils.prompts import load_prompt
+from src.utils.resource_limits import SMALL_MODEL, get_resource_limiter
 
 
 def _find_refusal_option(state: GraphState) -> str | None:
@@ -31,7 +32,7 @@ def _find_refusal_option(state: GraphState) -> str | None:
     return None
 
 
-def _classify_with_llm(state: GraphState) -> str:
+async def _classify_with_llm(state: GraphState) -> str:
     """Classify question using LLM."""
     choices_text = format_choices(get_choices_from_state(state))
     llm = get_small_model()
@@ -44,11 +45,12 @@ def _classify_with_llm(state: GraphState) -> str:
         ("human", user_prompt),
     ])
     chain = prompt | llm
-    response = chain.invoke({})
+    async with get_resource_limiter(SMALL_MODEL):
+        response = await chain.ainvoke({})
     return response.content.strip().lower()
 
 
-def router_node(state: GraphState) -> dict:
+async def router_node(state: GraphState) -> dict:
     """Analyze question and determine routing path. Returns answer immediately for toxic content."""
     question = state["question"].lower()
     
@@ -70,7 +72,7 @@ def router_node(state: GraphState) -> dict:
     
     print_log("        [Router] Slow-track: Using LLM to classify...")
     try:
-        route = _classify_with_llm(state)
+        route = await _classify_with_llm(state)
         print_log(f"        [Router] LLM Decision: {route}")
         
         if "direct" in route:
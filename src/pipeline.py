@@ -3,11 +3,10 @@
 import asyncio
 import csv
 import string
-import sys
 import time
 from pathlib import Path
 
-from src.config import BATCH_SIZE, DATA_OUTPUT_DIR
+from src.config import BATCH_SIZE, settings
 from src.data_processing.answer import normalize_answer
 from src.data_processing.formatting import format_choices_display, question_to_state
 from src.data_processing.models import InferenceLogEntry, PredictionOutput, QuestionInput
@@ -15,12 +14,26 @@ from src.graph import get_graph
 from src.utils.checkpointing import (
     append_log_entry,
     consolidate_log_file,
-    generate_csv_from_log,
     is_rate_limit_error,
 )
 from src.utils.common import sort_qids
+from src.utils.embeddings import log_embedding_stats
+from src.utils.hedging import get_hedge_stats, reset_hedge_budget
 from src.utils.ingestion import ingest_all_data
+from src.utils.llm import get_local_batching_stats
+from src.utils.llm_cache import log_cache_stats
 from src.utils.logging import log_done, log_pipeline, log_stats, print_log
+from src.utils.provider_router import get_provider_stats, reset_provider_usage
+from src.utils.rate_limit import get_limiter_stats
+from src.utils.resilience import CircuitOpenError, reset_retry_budget
+from src.utils.resource_limits import get_resource_limit_stats, reset_resource_limit_stats
+from src.utils.streaming import get_streaming_stats, reset_streaming_stats
+from src.utils.token_usage import (
+    TokenUsageTracker,
+    get_token_usage_stats,
+    record_question_usage,
+    reset_token_usage,
+)
 
 
 def sort_questions_by_qid(questions: list[QuestionInput]) -> list[QuestionInput]:
@@ -30,6 +43,37 @@ def sort_questions_by_qid(questions: list[QuestionInput]) -> list[QuestionInput]
     return [qid_to_question[qid] for qid in sorted_qids]
 
 
+def _log_transport_stats() -> None:
+    """Log the run's resource, limiter, provider, hedging, cache, batching and streaming stats."""
+    for resource_summary in get_resource_limit_stats():
+        log_stats(resource_summary)
+    for limiter_summary in get_limiter_stats():
+        log_stats(limiter_summary)
+    hedge_summary = get_hedge_stats()
+    if hedge_summary:
+        log_stats(hedge_summary)
+    log_cache_stats()
+    log_embedding_stats()
+    for provider_summary in get_provider_stats():
+        log_stats(provider_summary)
+    for batching_summary in get_local_batching_stats():
+        log_stats(batching_summary)
+    streaming_summary = get_streaming_stats()
+    if streaming_summary:
+        log_stats(streaming_summary)
+
+
+def _log_token_usage() -> None:
+    """Log token usage per node and route, and the estimated cost of the run."""
+    for usage_summary in get_token_usage_stats():
+        log_stats(usage_summary)
+
+
+def _is_retryable_error(error: Exception) -> bool:
+    """Provider is temporarily unavailable (rate limited or circuit open): retry later."""
+    return is_rate_limit_error(error) or isinstance(error, CircuitOpenError)
+
+
 async def run_pipeline_async(
     questions: list[QuestionInput],
     force_reingest: bool = False,
@@ -49,6 +93,12 @@ async def run_pipeline_async(
     ingest_all_data(force=force_reingest)
 
     questions = sort_questions_by_qid(questions)
+    reset_retry_budget()
+    reset_hedge_budget()
+    reset_provider_usage()
+    reset_token_usage()
+    reset_resource_limit_stats()
+    reset_streaming_stats()
 
     graph = get_graph()
     total = len(questions)
@@ -62,10 +112,12 @@ async def run_pipeline_async(
             print_log(f"\n[{q.qid}] {q.question}")
             print_log(format_choices_display(q.choices))
             state = question_to_state(q)
-            result = await graph.ainvoke(state)
+            usage = TokenUsageTracker()
+            result = await graph.ainvoke(state, config={"callbacks": [usage]})
 
             answer = result.get("answer", "A")
             route = result.get("route", "unknown")
+            record_question_usage(route, usage)
             num_choices = len(q.choices)
 
             normalized_answer = normalize_answer(
@@ -84,6 +136,8 @@ async def run_pipeline_async(
     elapsed = time.perf_counter() - start_time
     throughput = total / elapsed if elapsed > 0 else 0
     log_stats(f"Completed {total} questions in {elapsed:.2f}s ({throughput:.2f} req/s)")
+    _log_token_usage()
+    _log_transport_stats()
 
     sorted_qids = sort_qids(list(results.keys()))
     return [results[qid] for qid in sorted_qids]
@@ -114,6 +168,12 @@ async def run_pipeline_with_checkpointing(
 
     questions = sort_questions_by_qid(questions)
     log_pipeline(f"Processing {len(questions)} questions in qid order...")
+    reset_retry_budget()
+    reset_hedge_budget()
+    reset_provider_usage()
+    reset_token_usage()
+    reset_resource_limit_stats()
+    reset_streaming_stats()
 
     graph = get_graph()
     total = len(questions)
@@ -121,76 +181,86 @@ async def run_pipeline_with_checkpointing(
     processed_count = 0
 
     sem = asyncio.Semaphore(batch_size)
-    stop_event = asyncio.Event()
+    deferred_count = 0
 
     async def process_single_question(q: QuestionInput) -> None:
-        nonlocal processed_count
-        if stop_event.is_set():
-            return
-
-        async with sem:
-            if stop_event.is_set():
-                return
-            print_log(f"\n[{q.qid}] {q.question}")
-            print_log(format_choices_display(q.choices))
-            state = question_to_state(q)
-
-            try:
-                result = await graph.ainvoke(state)
-                answer = result.get("answer", "A")
-                route = result.get("route", "unknown")
-                raw_response = result.get("raw_response", "")
-                context = result.get("context", "")
-
-                num_choices = len(q.choices)
-                option_labels = string.ascii_uppercase
-                valid_answers = option_labels[:num_choices]
-
-                if answer not in valid_answers:
-                    print_log(f"        [Warning] Invalid answer '{answer}' for {q.qid}, defaulting to A")
-                    answer = "A"
-
-                log_entry = InferenceLogEntry(
-                    qid=q.qid,
-                    question=q.question,
-                    choices=q.choices,
-                    final_answer=answer,
-                    raw_response=raw_response,
-                    route=route,
-                    retrieved_context=context,
+        nonlocal processed_count, deferred_count
+
+        for attempt in range(settings.rate_limit_question_retries + 1):
+            async with sem:
+                print_log(f"\n[{q.qid}] {q.question}")
+                print_log(format_choices_display(q.choices))
+                state = question_to_state(q)
+
+                usage = TokenUsageTracker()
+
+                try:
+                    result = await graph.ainvoke(state, config={"callbacks": [usage]})
+                    answer = result.get("answer", "A")
+                    route = result.get("route", "unknown")
+                    raw_response = result.get("raw_response", "")
+                    context = result.get("context", "")
+
+                    num_choices = len(q.choices)
+                    option_labels = string.ascii_uppercase
+                    valid_answers = option_labels[:num_choices]
+
+                    if answer not in valid_answers:
+                        print_log(
+                            f"        [Warning] Invalid answer '{answer}' "
+                            f"for {q.qid}, defaulting to A"
+                        )
+                        answer = "A"
+
+                    log_entry = InferenceLogEntry(
+                        qid=q.qid,
+                        question=q.question,
+                        choices=q.choices,
+                        final_answer=answer,
+                        raw_response=raw_response,
+                        route=route,
+                        retrieved_context=context,
+                        token_usage=usage.to_dict(),
+                    )
+                    await append_log_entry(log_path, log_entry)
+                    record_question_usage(route, usage)
+
+                    log_done(f"{q.qid}: {answer} (Route: {route})")
+                    processed_count += 1
+                    return
+
+                except Exception as e:
+                    if not _is_retryable_error(e):
+                        print_log(f"        [Error] Failed to process {q.qid}: {e}")
+                        return
+                    print_log(f"        [Warning] Provider unavailable for {q.qid}: {e}")
+
+            # Pause outside the semaphore so the slot is free while the quota recovers
+            if attempt < settings.rate_limit_question_retries:
+                pause = min(
+                    settings.rate_limit_default_pause * 2**attempt, settings.rate_limit_max_pause
                 )
-                await append_log_entry(log_path, log_entry)
+                print_log(f"        [Warning] Re-queueing {q.qid} in {pause:.0f}s")
+                await asyncio.sleep(pause)
 
-                log_done(f"{q.qid}: {answer} (Route: {route})")
-                processed_count += 1
-
-            except Exception as e:
-                if is_rate_limit_error(e):
-                    print_log(f"        [CRITICAL] Rate Limit Detected on {q.qid}: {e}")
-                    stop_event.set()
-                else:
-                    print_log(f"        [Error] Failed to process {q.qid}: {e}")
+        deferred_count += 1
+        print_log(f"        [Error] {q.qid} still unavailable, leaving it for the next resume")
 
     tasks = [asyncio.create_task(process_single_question(q)) for q in questions]
     await asyncio.gather(*tasks)
 
-    if stop_event.is_set():
-        log_pipeline("!!! PIPELINE STOPPED DUE TO RATE LIMIT !!!")
-        log_pipeline("Consolidating logs and generating emergency submission...")
-        consolidate_log_file(log_path)
-
-        output_file = DATA_OUTPUT_DIR / "submission_emergency.csv"
-        total_entries = generate_csv_from_log(log_path, output_file)
-        log_pipeline(f"Saved emergency submission with {total_entries} entries to: {output_file}")
-
-        sys.exit(0)
-
     log_pipeline("Consolidating log file...")
     consolidate_log_file(log_path)
 
     elapsed = time.perf_counter() - start_time
     throughput = total / elapsed if elapsed > 0 else 0
     log_stats(f"Processed {processed_count}/{total} questions in {elapsed:.2f}s ({throughput:.2f} req/s)")
+    if deferred_count:
+        log_stats(
+            f"Deferred {deferred_count} questions (rate limit / circuit open) to the next resume"
+        )
+    _log_token_usage()
+    _log_transport_stats()
 
     return processed_count
 
@@ -1,4 +1,11 @@
-"""Utility functions for the RAG pipeline."""
+"""Utility functions for the RAG pipeline.
+
+Ingestion, model and crawler helpers are resolved lazily on first attribute access, so
+importing any `src.utils` submodule does not drag in Qdrant, torch or firecrawl.
+"""
+
+import importlib
+from typing import Any
 
 from src.utils.checkpointing import (
     append_log_entry,
@@ -9,15 +16,19 @@ from src.utils.checkpointing import (
     load_processed_qids,
 )
 from src.utils.common import normalize_text, remove_diacritics, sort_qids
-from src.utils.ingestion import (
-    get_embeddings,
-    get_qdrant_client,
-    get_vector_store,
-    ingest_all_data,
-    ingest_files,
-)
-from src.utils.llm import get_large_model, get_small_model
-from src.utils.web_crawler import WebCrawler, crawl_website, save_crawled_data
+
+_LAZY_ATTRIBUTES = {
+    "get_embeddings": "src.utils.ingestion",
+    "get_qdrant_client": "src.utils.ingestion",
+    "get_vector_store": "src.utils.ingestion",
+    "ingest_all_data": "src.utils.ingestion",
+    "ingest_files": "src.utils.ingestion",
+    "get_small_model": "src.utils.llm",
+    "get_large_model": "src.utils.llm",
+    "WebCrawler": "src.utils.web_crawler",
+    "crawl_website": "src.utils.web_crawler",
+    "save_crawled_data": "src.utils.web_crawler",
+}
 
 __all__ = [
     # Checkpointing
@@ -45,3 +56,12 @@ __all__ = [
     "crawl_website",
     "save_crawled_data",
 ]
+
+
+def __getattr__(name: str) -> Any:
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name), name)
+    globals()[name] = value
+    return value
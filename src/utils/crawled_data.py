@@ -0,0 +1,156 @@
+"""Reading and writing crawler output files.
+
+A crawl is stored in one of two formats:
+
+- `.json`: a single object holding the crawl's fields (source, domain, mode, topic,
+  crawled_at, total_pages) followed by a `documents` array,
+- `.jsonl`: the crawl's fields on the first line, then one document per line, so a crawl
+  can be written and read one document at a time.
+
+`iter_crawled_documents` reads both formats incrementally: only one document is decoded
+at a time, so reading a crawl takes memory proportional to its largest page rather
+than to the whole file.
+"""
+
+import json
+import re
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+from typing import Any, TextIO
+
+CRAWLED_EXTENSIONS = (".json", ".jsonl")
+
+_READ_BLOCK = 1 << 16
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_NUMBER_CHARS = re.compile(r"[0-9.eE+-]*")
+_decoder = json.JSONDecoder()
+
+
+class _JsonStream:
+    """Decodes a JSON text one value at a time from a file, reading it in blocks."""
+
+    def __init__(self, f: TextIO):
+        self._file = f
+        self._buffer = ""
+        self._pos = 0
+        self._offset = 0
+        self._eof = False
+
+    def _fill(self) -> None:
+        # Reading at least what is buffered doubles the buffer, so a value spanning many
+        # blocks is only re-scanned a logarithmic number of times
+        data = self._file.read(max(_READ_BLOCK, len(self._buffer) - self._pos))
+        self._eof = not data
+        self._offset += self._pos
+        self._buffer = self._buffer[self._pos:] + data
+        self._pos = 0
+
+    def peek(self) -> str:
+        """Next non-whitespace character, or '' at the end of the file."""
+        while True:
+            self._pos = _WHITESPACE.match(self._buffer, self._pos).end()
+            if self._pos < len(self._buffer) or self._eof:
+                return self._buffer[self._pos:self._pos + 1]
+            self._fill()
+
+    def expect(self, char: str) -> None:
+        found = self.peek()
+        if found != char:
+            position = self._offset + self._pos
+            raise ValueError(
+                f"Expected '{char}' at character {position}, found {found or 'end of file'!r}"
+            )
+        self._pos += 1
+
+    def close_or_comma(self, close: str) -> bool:
+        """Consume the separator after a member; True if it closed the container."""
+        if self.peek() == close:
+            self._pos += 1
+            return True
+        self.expect(",")
+        return False
+
+    def value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError as e:
+                if self._eof:
+                    raise ValueError(f"{e.msg} at character {self._offset + e.pos}") from None
+                self._fill()
+                continue
+            # A value ending at the buffer end, or a number followed only by number characters
+            # (a block boundary inside "1.5" decodes as 1), may continue in the next block
+            if isinstance(value, (int, float)):
+                end_of_number = _NUMBER_CHARS.match(self._buffer, end).end()
+            else:
+                end_of_number = end
+            if end_of_number == len(self._buffer) and not self._eof:
+                self._fill()
+                continue
+            self._pos = end
+            return value
+
+
+def _iter_json(f: TextIO) -> Iterator[tuple[dict[str, Any], Any]]:
+    stream = _JsonStream(f)
+    fields: dict[str, Any] = {}
+    stream.expect("{")
+    if stream.peek() == "}":
+        return
+    while True:
+        key = stream.value()
+        stream.expect(":")
+        if key == "documents" and stream.peek() == "[":
+            stream.expect("[")
+            if stream.peek() == "]":
+                stream.expect("]")
+            else:
+                while True:
+                    yield fields, stream.value()
+                    if stream.close_or_comma("]"):
+                        break
+        else:
+            fields[key] = stream.value()
+        if stream.close_or_comma("}"):
+            return
+
+
+def _iter_jsonl(f: TextIO) -> Iterator[tuple[dict[str, Any], Any]]:
+    fields: dict[str, Any] | None = None
+    for line in f:
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        if fields is None:
+            fields = record
+        else:
+            yield fields, record
+
+
+def iter_crawled_documents(path: Path) -> Iterator[tuple[dict[str, Any], Any]]:
+    """Yield (crawl fields, document) for each document of a crawl file, one at a time.
+
+    For `.json` files the fields are those preceding the `documents` array, which is
+    where `save_crawled_data` writes them.
+
+    Raises:
+        ValueError: If the file is not a crawl in either format
+    """
+    with open(path, encoding="utf-8") as f:
+        if path.suffix.lower() == ".jsonl":
+            yield from _iter_jsonl(f)
+        else:
+            yield from _iter_json(f)
+
+
+def write_crawled_jsonl(path: Path, fields: dict[str, Any], documents: Iterable[dict]) -> int:
+    """Write a crawl as JSONL, consuming `documents` lazily; returns the number written."""
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(json.dumps(fields, ensure_ascii=False) + "\n")
+        for document in documents:
+            f.write(json.dumps(document, ensure_ascii=False) + "\n")
+            count += 1
+    return count
@@ -0,0 +1,243 @@
+"""Persistent, content-addressed cache of embedding vectors.
+
+Vectors are keyed by a SHA-256 digest of the normalized text and stored per embedding
+model in a directory holding:
+
+- `meta.json`: model id, vector dimension and storage dtype,
+- `vectors.bin`: rows of float16 (or float32) values, read through a memory map,
+- `index.txt`: one digest per line; line N names row N of `vectors.bin`.
+
+Both files are append-only and vectors are written (and synced) before their index
+lines; loading truncates both files to the last complete row, so an interrupted write
+never shifts later rows. `CachedEmbeddings` wraps either
+`get_embeddings()` backend, so re-ingesting an unchanged corpus and repeated queries
+cost only hashing.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import unicodedata
+from pathlib import Path
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from src.config import settings
+from src.utils.logging import log_pipeline
+
+_embedding_caches: dict[str, "EmbeddingVectorCache"] = {}
+_embedding_caches_lock = threading.Lock()
+
+
+def text_digest(text: str) -> str:
+    """Digest of a text after Unicode (NFC) and whitespace normalization."""
+    normalized = " ".join(unicodedata.normalize("NFC", text).split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+class EmbeddingVectorCache:
+    """Append-only memory-mapped vector store for one embedding model."""
+
+    def __init__(self, directory: Path, model_id: str, dtype: str = "float16"):
+        self.directory = directory
+        self.model_id = model_id
+        self.dtype = np.dtype(dtype)
+        self.dim: int | None = None
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self._rows: dict[str, int] = {}
+        self._count = 0
+        self._vectors: np.memmap | None = None
+        self._lock = threading.Lock()
+
+        self._meta_path = directory / "meta.json"
+        self._vectors_path = directory / "vectors.bin"
+        self._index_path = directory / "index.txt"
+        directory.mkdir(parents=True, exist_ok=True)
+        self._load()
+
+    def _load(self) -> None:
+        if not self._meta_path.exists():
+            return
+        meta = json.loads(self._meta_path.read_text(encoding="utf-8"))
+        if meta.get("model") != self.model_id or np.dtype(meta.get("dtype")) != self.dtype:
+            log_pipeline(
+                f"Embedding cache at {self.directory} belongs to another model or dtype; "
+                "resetting it"
+            )
+            self._reset()
+            return
+        self.dim = int(meta["dim"])
+        row_bytes = self.dim * self.dtype.itemsize
+        stored_rows = (
+            self._vectors_path.stat().st_size // row_bytes if self._vectors_path.exists() else 0
+        )
+        index_bytes = 0
+        if self._index_path.exists():
+            with open(self._index_path, encoding="utf-8", newline="") as f:
+                for row, line in enumerate(f):
+                    if row >= stored_rows or not line.endswith("\n"):
+                        break
+                    self._rows[line.strip()] = row
+                    self._count = row + 1
+                    index_bytes += len(line.encode("utf-8"))
+        # Drop rows or index lines past the last complete pair (a crash between the two
+        # appends, or a torn write) so later appends land on the row numbers they record.
+        if self._vectors_path.exists():
+            with open(self._vectors_path, "r+b") as f:
+                f.truncate(self._count * row_bytes)
+        if self._index_path.exists():
+            with open(self._index_path, "r+b") as f:
+                f.truncate(index_bytes)
+
+    def _reset(self) -> None:
+        for path in (self._meta_path, self._vectors_path, self._index_path):
+            path.unlink(missing_ok=True)
+        self.dim = None
+        self._rows.clear()
+        self._count = 0
+        self._vectors = None
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def _mapped(self, row: int) -> np.memmap:
+        """Memory map covering `row`, re-mapped after appends."""
+        if self._vectors is None or row >= self._vectors.shape[0]:
+            self._vectors = np.memmap(
+                self._vectors_path, dtype=self.dtype, mode="r", shape=(self._count, self.dim)
+            )
+        return self._vectors
+
+    def get_many(self, digests: list[str]) -> list[list[float] | None]:
+        """Cached vectors for the digests, None for misses."""
+        results: list[list[float] | None] = []
+        with self._lock:
+            for digest in digests:
+                row = self._rows.get(digest)
+                if row is None:
+                    self.misses += 1
+                    results.append(None)
+                    continue
+                self.hits += 1
+                results.append(self._mapped(row)[row].astype(np.float32).tolist())
+        return results
+
+    def put_many(self, digests: list[str], vectors: list[list[float]]) -> None:
+        """Append vectors for digests that are not cached yet."""
+        with self._lock:
+            new = {}
+            for digest, vector in zip(digests, vectors):
+                if digest not in self._rows and digest not in new:
+                    new[digest] = vector
+            if not new:
+                return
+            array = np.asarray(list(new.values()), dtype=self.dtype)
+            if self.dim is None:
+                self.dim = array.shape[1]
+                meta = {"model": self.model_id, "dim": self.dim, "dtype": self.dtype.name}
+                self._meta_path.write_text(json.dumps(meta), encoding="utf-8")
+            elif array.shape[1] != self.dim:
+                raise ValueError(
+                    f"Embedding dimension {array.shape[1]} does not match "
+                    f"cache dimension {self.dim}"
+                )
+
+            with open(self._vectors_path, "ab") as f:
+                f.write(array.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            with open(self._index_path, "a", encoding="utf-8") as f:
+                f.write("".join(f"{digest}\n" for digest in new))
+                f.flush()
+                os.fsync(f.fileno())
+            for digest in new:
+                self._rows[digest] = self._count
+                self._count += 1
+            self.writes += len(new)
+
+    def stats_summary(self) -> str:
+        lookups = self.hits + self.misses
+        hit_rate = (self.hits / lookups * 100) if lookups else 0.0
+        return (
+            f"Embedding cache: {self.hits} hits / {self.misses} misses ({hit_rate:.1f}% hit rate), "
+            f"{self.writes} writes, {len(self)} vectors"
+        )
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that only sends texts missing from the vector cache to the backend."""
+
+    def __init__(self, embeddings: Embeddings, cache: EmbeddingVectorCache):
+        self.embeddings = embeddings
+        self.cache = cache
+
+    def _lookup(self, texts: list[str]) -> tuple[list[str], list[list[float] | None], list[str]]:
+        """Digests, cached vectors (None for misses) and the distinct texts to embed."""
+        digests = [text_digest(text) for text in texts]
+        vectors = self.cache.get_many(digests)
+        missing: dict[str, str] = {}
+        for text, digest, vector in zip(texts, digests, vectors):
+            if vector is None:
+                missing.setdefault(digest, text)
+        return digests, vectors, list(missing.values())
+
+    def _merge(
+        self,
+        digests: list[str],
+        vectors: list[list[float] | None],
+        missing: list[str],
+        computed: list[list[float]],
+    ) -> list[list[float]]:
+        missing_digests = [text_digest(text) for text in missing]
+        self.cache.put_many(missing_digests, computed)
+        by_digest = dict(zip(missing_digests, computed))
+        return [
+            vector if vector is not None else by_digest[digest]
+            for digest, vector in zip(digests, vectors)
+        ]
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        digests, vectors, missing = self._lookup(texts)
+        computed = self.embeddings.embed_documents(missing) if missing else []
+        return self._merge(digests, vectors, missing, computed)
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        digests, vectors, missing = self._lookup(texts)
+        computed = await self.embeddings.aembed_documents(missing) if missing else []
+        return self._merge(digests, vectors, missing, computed)
+
+    def embed_query(self, text: str) -> list[float]:
+        digest = text_digest(text)
+        vector = self.cache.get_many([digest])[0]
+        if vector is None:
+            vector = self.embeddings.embed_query(text)
+            self.cache.put_many([digest], [vector])
+        return vector
+
+    async def aembed_query(self, text: str) -> list[float]:
+        digest = text_digest(text)
+        vector = self.cache.get_many([digest])[0]
+        if vector is None:
+            vector = await self.embeddings.aembed_query(text)
+            self.cache.put_many([digest], [vector])
+        return vector
+
+
+def get_embedding_cache(model_id: str) -> EmbeddingVectorCache:
+    """Get or create the vector cache of an embedding model."""
+    with _embedding_caches_lock:
+        cache = _embedding_caches.get(model_id)
+        if cache is None:
+            slug = hashlib.sha256(model_id.encode("utf-8")).hexdigest()[:16]
+            cache = EmbeddingVectorCache(
+                settings.embedding_cache_path_resolved / slug,
+                model_id=model_id,
+                dtype=settings.embedding_cache_dtype,
+            )
+            _embedding_caches[model_id] = cache
+    return cache
+
@@ -1,17 +1,32 @@
 """Embedding models and utilities for vector generation."""
 
+import asyncio
+
 import httpx
-import torch
 from langchain_core.embeddings import Embeddings
-from langchain_huggingface import HuggingFaceEmbeddings
 from tqdm import tqdm
 
 from src.config import settings
-from src.utils.logging import log_pipeline
+from src.utils.executor import run_coroutine_sync
+from src.utils.http import aclose_async_clients, apost_json, post_json
+from src.utils.logging import log_pipeline, log_stats
+from src.utils.query_batching import QueryBatchingEmbeddings
+
+_BATCH_TOO_LARGE_MARKERS = ("too large", "too long", "too many", "maximum", "exceed")
+
+
+class EmbeddingBatchTooLargeError(RuntimeError):
+    """Raised when the embedding API rejects a request for its size (HTTP 413 or a size error)."""
 
 
 class VNPTEmbeddings(Embeddings):
-    """LangChain-compatible wrapper for VNPT Embedding API."""
+    """LangChain-compatible wrapper for VNPT Embedding API.
+
+    `aembed_documents` keeps EMBEDDING_CONCURRENCY requests in flight. Batches are cut at
+    EMBEDDING_BATCH_SIZE texts or EMBEDDING_MAX_BATCH_CHARS characters, whichever comes
+    first, and the batch size is halved for the rest of the run whenever the API rejects
+    a request as too large. Results are returned in input order.
+    """
 
     def __init__(
         self,
@@ -28,6 +43,7 @@ class VNPTEmbeddings(Embeddings):
         self.token_key = token_key
         self.model_name = model_name
         self.timeout = timeout
+        self._batch_size = max(settings.embedding_batch_size, 1)
 
     def _get_headers(self) -> dict[str, str]:
         return {
@@ -37,19 +53,18 @@ class VNPTEmbeddings(Embeddings):
             "Content-Type": "application/json",
         }
 
-    def _embed(self, texts: list[str]) -> list[list[float]]:
-        """Call VNPT API to get embeddings."""
-        payload = {"model": self.model_name, "input": texts}
-
+    @staticmethod
+    def _parse_response(response: httpx.Response) -> list[list[float]]:
+        if response.status_code == 413 or (
+            response.status_code == 400
+            and any(marker in response.text.lower() for marker in _BATCH_TOO_LARGE_MARKERS)
+        ):
+            raise EmbeddingBatchTooLargeError(
+                f"VNPT Embedding API rejected batch ({response.status_code}): {response.text}"
+            )
         try:
-            with httpx.Client(timeout=self.timeout) as client:
-                response = client.post(
-                    self.endpoint,
-                    headers=self._get_headers(),
-                    json=payload,
-                )
-                response.raise_for_status()
-                data = response.json()
+            response.raise_for_status()
+            data = response.json()
 
             return [item["embedding"] for item in data["data"]]
 
@@ -57,45 +72,114 @@ class VNPTEmbeddings(Embeddings):
             raise RuntimeError(
                 f"VNPT Embedding API error ({e.response.status_code}): {e.response.text}"
             ) from e
-        except httpx.RequestError as e:
-            raise RuntimeError(f"VNPT Embedding API request failed: {e}") from e
         except (KeyError, IndexError) as e:
             raise RuntimeError(f"Unexpected VNPT Embedding API response: {e}") from e
 
-    def embed_documents(self, texts: list[str]) -> list[list[float]]:
-        """Embed a list of documents with accurate progress bar."""
+    def _embed(self, texts: list[str]) -> list[list[float]]:
+        """Call VNPT API to get embeddings."""
+        payload = {"model": self.model_name, "input": texts}
+        try:
+            response = post_json(self.endpoint, self._get_headers(), payload, self.timeout)
+        except httpx.RequestError as e:
+            raise RuntimeError(f"VNPT Embedding API request failed: {e}") from e
+        return self._parse_response(response)
+
+    async def _aembed(self, texts: list[str]) -> list[list[float]]:
+        """Async version of `_embed`, sharing the pooled async client."""
+        payload = {"model": self.model_name, "input": texts}
+        try:
+            response = await apost_json(self.endpoint, self._get_headers(), payload, self.timeout)
+        except httpx.RequestError as e:
+            raise RuntimeError(f"VNPT Embedding API request failed: {e}") from e
+        return self._parse_response(response)
+
+    def _next_batch_end(self, texts: list[str], start: int) -> int:
+        """End index of the batch starting at `start` (always at least one text)."""
+        end = start + 1
+        chars = len(texts[start])
+        while end < len(texts) and end - start < self._batch_size:
+            chars += len(texts[end])
+            if chars > settings.embedding_max_batch_chars:
+                break
+            end += 1
+        return end
+
+    async def _aembed_batch(self, texts: list[str]) -> list[list[float]]:
+        """Embed one batch, splitting it in halves if the API rejects its size."""
+        try:
+            return await self._aembed(texts)
+        except EmbeddingBatchTooLargeError:
+            if len(texts) == 1:
+                raise
+            half = len(texts) // 2
+            if half < self._batch_size:
+                self._batch_size = half
+                log_pipeline(f"Embedding batch rejected as too large; batch size lowered to {half}")
+            return await self._aembed_batch(texts[:half]) + await self._aembed_batch(texts[half:])
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        """Embed documents with several batches in flight, preserving input order."""
         if not texts:
             return []
-        
-        batch_size = 32 
-        all_embeddings = []
-        
-        with tqdm(total=len(texts), desc="Embedding API", unit="chunk", leave=False) as pbar:
-            for i in range(0, len(texts), batch_size):
-                batch = texts[i : i + batch_size]
-                embeddings = self._embed(batch)
-                all_embeddings.extend(embeddings)
-                pbar.update(len(batch))
-            
-        return all_embeddings
+
+        results: list[list[float] | None] = [None] * len(texts)
+        next_start = 0
+
+        async def worker(pbar: tqdm) -> None:
+            nonlocal next_start
+            while next_start < len(texts):
+                # Batch boundaries are taken lazily so a lowered batch size applies at once
+                start = next_start
+                end = next_start = self._next_batch_end(texts, start)
+                results[start:end] = await self._aembed_batch(texts[start:end])
+                pbar.update(end - start)
+
+        workers = max(settings.embedding_concurrency, 1)
+        # A single request (e.g. a micro-batch of queries) needs no progress bar
+        single_batch = self._next_batch_end(texts, 0) == len(texts)
+        with tqdm(
+            total=len(texts), desc="Embedding API", unit="chunk", leave=False, disable=single_batch
+        ) as pbar:
+            await asyncio.gather(*(worker(pbar) for _ in range(workers)))
+        return results
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        """Embed a list of documents (concurrently, through `aembed_documents`)."""
+        return embed_documents_concurrently(self, texts)
 
     def embed_query(self, text: str) -> list[float]:
         """Embed a single query."""
         return self._embed([text])[0]
 
+    async def aembed_query(self, text: str) -> list[float]:
+        """Embed a single query without leaving the event loop."""
+        return (await self._aembed([text]))[0]
+
+
+def embed_documents_concurrently(embeddings: Embeddings, texts: list[str]) -> list[list[float]]:
+    """Run `embeddings.aembed_documents` from sync code, e.g. during ingestion.
+
+    Uses a private event loop (in a helper thread if the caller is on a running loop)
+    and closes that loop's pooled HTTP clients afterwards.
+    """
+    async def run() -> list[list[float]]:
+        try:
+            return await embeddings.aembed_documents(texts)
+        finally:
+            await aclose_async_clients()
 
-def get_device() -> str:
-    """Detect optimal device."""
-    if torch.cuda.is_available():
-        return "cuda"
-    if torch.backends.mps.is_available():
-        return "mps"
-    return "cpu"
+    return run_coroutine_sync(run())
 
 
 def get_embeddings() -> Embeddings:
-    """Get or create embeddings model singleton (VNPT API or local HuggingFace)."""
-    global _embeddings
+    """Get or create embeddings model singleton (VNPT API or local HuggingFace).
+
+    Concurrent queries are coalesced by `QueryBatchingEmbeddings`. With
+    EMBEDDING_CACHE_ENABLED, that is wrapped in `CachedEmbeddings` so documents and
+    queries embedded before are served from the on-disk vector cache without waiting
+    for a query batch.
+    """
+    global _embeddings, _embedding_model_id, _query_batcher
     if _embeddings is not None:
         return _embeddings
 
@@ -108,17 +192,63 @@ def get_embeddings() -> Embeddings:
             token_id=settings.vnpt_embedding_token_id,
             token_key=settings.vnpt_embedding_token_key,
         )
+        model_id = f"vnpt:{_embeddings.model_name}"
         log_pipeline(f"VNPT Embedding API initialized: {settings.vnpt_embedding_endpoint}")
     else:
-        device = get_device()
-        _embeddings = HuggingFaceEmbeddings(
-            model_name=settings.embedding_model,
-            model_kwargs={"device": device},
-            encode_kwargs={"normalize_embeddings": True},
+        # Local stack (torch, sentence-transformers) is only loaded when actually used
+        from src.utils.local_embeddings import load_local_embeddings
+
+        backend = settings.local_embedding_backend
+        _embeddings = load_local_embeddings(
+            settings.embedding_model,
+            backend=backend,
+            threads=settings.embedding_threads,
+            batch_tokens=settings.local_embedding_batch_tokens,
         )
-        log_pipeline(f"HuggingFace Embedding loaded: {settings.embedding_model}")
+        # Quantized runtimes produce slightly different vectors, so they get their own cache
+        model_id = f"huggingface:{settings.embedding_model}"
+        if backend != "torch":
+            model_id += f":{backend}"
+        log_pipeline(f"HuggingFace Embedding loaded: {settings.embedding_model} ({backend})")
+
+    _query_batcher = QueryBatchingEmbeddings(
+        _embeddings,
+        max_batch_size=settings.query_embed_batch_max_size,
+        window_seconds=settings.query_embed_batch_window_ms / 1000,
+    )
+    _embeddings = _query_batcher
+
+    _embedding_model_id = model_id
+    if settings.embedding_cache_enabled:
+        from src.utils.embedding_cache import CachedEmbeddings, get_embedding_cache
+
+        cache = get_embedding_cache(model_id)
+        _embeddings = CachedEmbeddings(_embeddings, cache)
+        log_pipeline(f"Embedding cache: {len(cache)} vectors at {cache.directory}")
 
     return _embeddings
 
 
 _embeddings: Embeddings | None = None
+_embedding_model_id: str | None = None
+_query_batcher: QueryBatchingEmbeddings | None = None
+
+
+def get_embedding_model_id() -> str:
+    """Identifier of the embedding backend and model (e.g. `vnpt:<model>`), loading it if needed."""
+    get_embeddings()
+    return _embedding_model_id
+
+
+def log_embedding_stats() -> None:
+    """Log embedding cache, query batching and local length-bucket statistics for this process."""
+    cache = getattr(_embeddings, "cache", None)
+    if cache is not None and (cache.hits or cache.misses):
+        log_stats(cache.stats_summary())
+    if _query_batcher is None:
+        return
+    if _query_batcher.queries:
+        log_stats(_query_batcher.stats_summary())
+    bucket_stats = getattr(_query_batcher.embeddings, "bucket_stats", None)
+    for bucket_summary in bucket_stats() if bucket_stats else []:
+        log_stats(bucket_summary)
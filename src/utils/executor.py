@@ -0,0 +1,65 @@
+"""Bounded thread pool for blocking work inside async graph nodes.
+
+Graph nodes are coroutines so that concurrent questions overlap their model calls on
+one event loop. The little work that is still synchronous (local vector search, code
+execution, local embedding) is sent to a single pool of SYNC_EXECUTOR_WORKERS threads
+instead of the loop's unbounded default executor, so a large BATCH_SIZE cannot spawn
+an unbounded number of threads competing for the CPU.
+
+`run_coroutine_sync` bridges the other way, letting sync code such as ingestion drive
+concurrent async work (batched embedding requests) on a private event loop.
+"""
+
+import asyncio
+import contextvars
+import functools
+import threading
+from collections.abc import Callable, Coroutine
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, TypeVar
+
+from src.config import settings
+
+T = TypeVar("T")
+
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Get or create the shared executor for blocking node work."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=max(settings.sync_executor_workers, 1),
+                thread_name_prefix="node-sync",
+            )
+    return _executor
+
+
+async def run_blocking(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run a blocking callable on the shared executor without blocking the event loop.
+
+    Context variables (callbacks, rate-limit fail-fast mode) are copied into the worker
+    thread, as `asyncio.to_thread` does.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    call = functools.partial(context.run, func, *args, **kwargs)
+    return await loop.run_in_executor(get_executor(), call)
+
+
+def run_coroutine_sync(coro: Coroutine[Any, Any, T]) -> T:
+    """Run a coroutine to completion from sync code on a private event loop.
+
+    Also works when the caller is itself running on an event loop thread (e.g. the
+    knowledge base is ingested synchronously at the start of `run_pipeline_async`):
+    the coroutine then runs in a helper thread instead of nesting loops.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="sync-bridge") as bridge:
+        return bridge.submit(contextvars.copy_context().run, asyncio.run, coro).result()
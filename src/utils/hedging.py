@@ -0,0 +1,188 @@
+"""Hedged requests to cut tail latency on slow API endpoints.
+
+When a request has not completed within a rolling latency percentile of its endpoint,
+a duplicate is sent; the first successful response wins and the other is cancelled.
+Both copies go through `apost_json`, so hedges hold slots in the endpoint's adaptive
+concurrency limiter like any other request; the cancelled copy returns its slot as
+aborted, so it counts as neither a success nor a failure. Streamed calls race the stream
+open the same way: the first copy to return response headers is kept and the other is
+closed. Extra requests are capped per run by a `RetryBudget` so quota stays protected.
+"""
+
+import asyncio
+from collections.abc import AsyncIterator
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import Any
+
+import httpx
+
+from src.config import settings
+from src.utils.http import apost_json, astream_post_json
+from src.utils.rate_limit import get_endpoint_limiter
+from src.utils.resilience import RetryBudget
+
+_hedge_budget: RetryBudget | None = None
+_hedges_fired = 0
+_hedges_won = 0
+
+
+def get_hedge_budget() -> RetryBudget:
+    """Get or create the run-wide budget for duplicate requests."""
+    global _hedge_budget
+    if _hedge_budget is None:
+        _hedge_budget = RetryBudget(settings.hedge_budget_ratio, settings.hedge_budget_min)
+    return _hedge_budget
+
+
+def reset_hedge_budget() -> None:
+    """Start a fresh hedge budget and counters (called at the start of each pipeline run)."""
+    global _hedges_fired, _hedges_won
+    get_hedge_budget().reset()
+    _hedges_fired = 0
+    _hedges_won = 0
+
+
+def get_hedge_stats() -> str | None:
+    """Summary of hedges sent in this run, or None if hedging never triggered."""
+    if not _hedges_fired:
+        return None
+    return f"Hedging: {_hedges_fired} duplicate requests sent, {_hedges_won} finished first"
+
+
+def _hedge_delay(endpoint: str) -> float | None:
+    """Seconds to wait before hedging, or None until enough latency samples exist."""
+    latency = get_endpoint_limiter(endpoint).concurrency.latency
+    if len(latency) < settings.hedge_min_samples:
+        return None
+    return max(latency.percentile(settings.hedge_percentile), settings.hedge_min_delay)
+
+
+async def hedged_apost_json(
+    endpoint: str,
+    headers: dict[str, str],
+    payload: dict[str, Any],
+    timeout: float | None = None,
+) -> httpx.Response:
+    """POST like `apost_json`, firing one duplicate if the call exceeds the hedge delay.
+
+    Args:
+        endpoint: Full endpoint URL
+        headers: Request headers
+        payload: JSON-serializable request body
+        timeout: Optional per-request timeout
+
+    Returns:
+        The first successful response of the primary and the hedge
+    """
+    global _hedges_fired, _hedges_won
+
+    budget = get_hedge_budget()
+    budget.record_request()
+    delay = _hedge_delay(endpoint)
+
+    primary = asyncio.create_task(apost_json(endpoint, headers, payload, timeout))
+    tasks = {primary}
+    try:
+        if delay is None:
+            return await primary
+
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if done or not budget.try_spend():
+            return await primary
+
+        _hedges_fired += 1
+        hedge = asyncio.create_task(apost_json(endpoint, headers, payload, timeout))
+        tasks.add(hedge)
+
+        pending = set(tasks)
+        error: BaseException | None = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is hedge:
+                        _hedges_won += 1
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+
+async def _open_stream(
+    stack: AsyncExitStack,
+    endpoint: str,
+    headers: dict[str, str],
+    payload: dict[str, Any],
+    timeout: float | None,
+) -> httpx.Response:
+    return await stack.enter_async_context(astream_post_json(endpoint, headers, payload, timeout))
+
+
+@asynccontextmanager
+async def hedged_astream_post_json(
+    endpoint: str,
+    headers: dict[str, str],
+    payload: dict[str, Any],
+    timeout: float | None = None,
+) -> AsyncIterator[httpx.Response]:
+    """Open a stream like `astream_post_json`, racing one duplicate if the headers are late.
+
+    Args:
+        endpoint: Full endpoint URL
+        headers: Request headers
+        payload: JSON-serializable request body
+        timeout: Optional per-request timeout
+
+    Yields:
+        The first response of the primary and the hedge to arrive without an error
+    """
+    global _hedges_fired, _hedges_won
+
+    budget = get_hedge_budget()
+    budget.record_request()
+    delay = _hedge_delay(endpoint)
+
+    stacks: dict[asyncio.Task, AsyncExitStack] = {}
+
+    def open_copy() -> asyncio.Task:
+        stack = AsyncExitStack()
+        task = asyncio.create_task(_open_stream(stack, endpoint, headers, payload, timeout))
+        stacks[task] = stack
+        return task
+
+    primary = open_copy()
+    hedge = None
+    winner = None
+    try:
+        if delay is not None:
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+            if not done and budget.try_spend():
+                _hedges_fired += 1
+                hedge = open_copy()
+
+        pending = set(stacks)
+        error: BaseException | None = None
+        while pending and winner is None:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    winner = winner or task
+                else:
+                    error = task.exception()
+        if winner is None:
+            raise error
+        if winner is hedge:
+            _hedges_won += 1
+    finally:
+        losers = [task for task in stacks if task is not winner]
+        for task in losers:
+            task.cancel()
+        await asyncio.gather(*losers, return_exceptions=True)
+        for task in losers:
+            await stacks[task].aclose()
+
+    async with stacks[winner]:
+        yield winner.result()
@@ -0,0 +1,443 @@
+"""Shared, pooled HTTP clients for API-backed chat models and embeddings.
+
+One long-lived client is kept per endpoint origin (scheme + host), so the VNPT small,
+large and embedding endpoints share warm keep-alive connections instead of paying
+TCP+TLS setup on every call. Async clients are bound to the event loop that created
+them, so they are pooled per loop.
+"""
+
+import asyncio
+import importlib.util
+import threading
+import time
+import weakref
+from collections.abc import AsyncIterator, Iterable, Iterator
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any
+from urllib.parse import urlsplit
+
+import httpx
+
+from src.config import settings
+from src.utils.logging import log_pipeline, print_log
+from src.utils.rate_limit import (
+    RateLimitError,
+    get_endpoint_limiter,
+    is_fail_fast,
+    is_rate_limit_response,
+    parse_retry_after,
+)
+from src.utils.resilience import (
+    RETRYABLE_STATUS_CODES,
+    get_circuit_breaker,
+    get_retry_budget,
+    get_retry_policy,
+)
+
+_sync_clients: dict[str, httpx.Client] = {}
+_async_clients: weakref.WeakKeyDictionary[
+    asyncio.AbstractEventLoop, dict[str, httpx.AsyncClient]
+] = weakref.WeakKeyDictionary()
+_clients_lock = threading.Lock()
+
+
+def _origin(endpoint: str) -> str:
+    """Return the scheme://host[:port] part of an endpoint URL."""
+    parts = urlsplit(endpoint)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def _http2_enabled() -> bool:
+    """Use HTTP/2 only when requested and the optional `h2` package is installed."""
+    if not settings.http2:
+        return False
+    if importlib.util.find_spec("h2") is None:
+        log_pipeline("[HTTP] HTTP2=True but 'h2' is not installed, falling back to HTTP/1.1")
+        return False
+    return True
+
+
+def _client_kwargs() -> dict[str, Any]:
+    """Build shared client configuration from settings."""
+    return {
+        "http2": _http2_enabled(),
+        "limits": httpx.Limits(
+            max_connections=settings.http_max_connections,
+            max_keepalive_connections=settings.http_max_keepalive_connections,
+            keepalive_expiry=settings.http_keepalive_expiry,
+        ),
+        "timeout": settings.http_timeout,
+    }
+
+
+def get_sync_client(endpoint: str) -> httpx.Client:
+    """Get or create the pooled sync client for an endpoint's origin."""
+    origin = _origin(endpoint)
+    with _clients_lock:
+        client = _sync_clients.get(origin)
+        if client is None or client.is_closed:
+            client = httpx.Client(**_client_kwargs())
+            _sync_clients[origin] = client
+    return client
+
+
+def get_async_client(endpoint: str) -> httpx.AsyncClient:
+    """Get or create the pooled async client for an endpoint's origin on the running loop."""
+    loop = asyncio.get_running_loop()
+    origin = _origin(endpoint)
+    with _clients_lock:
+        clients = _async_clients.setdefault(loop, {})
+        client = clients.get(origin)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(**_client_kwargs())
+            clients[origin] = client
+    return client
+
+
+class _RequestAttempts:
+    """Per-request bookkeeping that decides whether (and when) to retry an attempt.
+
+    - Rate-limited responses pause the endpoint limiter and are retried up to
+      RATE_LIMIT_MAX_RETRIES times (or raised at once under `rate_limit_fail_fast`);
+      they do not count as provider failures.
+    - Transport errors and retryable 5xx responses are retried with jittered
+      exponential backoff while the per-run retry budget allows, and feed the
+      endpoint's circuit breaker.
+    """
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.limiter = get_endpoint_limiter(endpoint)
+        self.breaker = get_circuit_breaker(endpoint)
+        self.policy = get_retry_policy()
+        self.budget = get_retry_budget()
+        self.failures = 0
+        self.rate_limited = 0
+        self.budget.record_request()
+
+    def before_attempt(self) -> None:
+        if is_fail_fast():
+            paused = self.limiter.pause_remaining()
+            if paused > 0:
+                raise RateLimitError(
+                    f"{self.limiter.name} is paused for {paused:.0f}s", retry_after=paused
+                )
+        self.breaker.before_call()
+
+    def after_attempt(
+        self,
+        response: httpx.Response | None,
+        error: httpx.TransportError | None,
+    ) -> float | None:
+        """Return seconds to wait before retrying, or None if `response` is final.
+
+        Raises:
+            RateLimitError: Still rate limited after all retries
+            httpx.TransportError: The last transport error once retries are exhausted
+        """
+        if response is not None and is_rate_limit_response(response):
+            # A 429 proves the provider is up; it must not trip the breaker
+            self.breaker.record_success()
+            if self.rate_limited >= settings.rate_limit_max_retries:
+                raise RateLimitError(
+                    f"HTTP 429 Too Many Requests from {self.endpoint} "
+                    f"after {self.rate_limited + 1} attempts"
+                )
+            pause = self.limiter.on_rate_limited(
+                parse_retry_after(response.headers), self.rate_limited
+            )
+            self.rate_limited += 1
+            if is_fail_fast():
+                raise RateLimitError(
+                    f"HTTP 429 Too Many Requests from {self.endpoint}", retry_after=pause
+                )
+            return 0.0
+
+        if error is None and response.status_code not in RETRYABLE_STATUS_CODES:
+            self.breaker.record_success()
+            return None
+
+        self.breaker.record_failure()
+        self.failures += 1
+        reason = str(error) if error is not None else f"HTTP {response.status_code}"
+        if self.failures >= self.policy.max_attempts or not self.budget.try_spend():
+            if error is not None:
+                raise error
+            return None
+
+        delay = self.policy.delay(self.failures - 1)
+        print_log(
+            f"        [Warning] {self.limiter.name}: {reason}, retry {self.failures}/"
+            f"{self.policy.max_attempts - 1} in {delay:.1f}s"
+        )
+        return delay
+
+
+def _is_abort(error: BaseException) -> bool:
+    """Cancellations and closed streams: the caller gave up, the request did not fail."""
+    return not isinstance(error, Exception)
+
+
+def post_json(
+    endpoint: str,
+    headers: dict[str, str],
+    payload: dict[str, Any],
+    timeout: float | None = None,
+) -> httpx.Response:
+    """POST a JSON payload through the pooled sync client with rate limiting and retries.
+
+    Args:
+        endpoint: Full endpoint URL
+        headers: Request headers
+        payload: JSON-serializable request body
+        timeout: Optional per-request timeout (defaults to HTTP_TIMEOUT)
+
+    Returns:
+        The raw httpx response (status is not checked; may be a 5xx once retries run out)
+
+    Raises:
+        RateLimitError: If the endpoint is still rate limited after all retries
+        CircuitOpenError: If the endpoint's circuit breaker is open
+        httpx.TransportError: If the request keeps failing at the transport level
+    """
+    client = get_sync_client(endpoint)
+    attempts = _RequestAttempts(endpoint)
+
+    while True:
+        attempts.before_attempt()
+        attempts.limiter.acquire()
+        start = time.perf_counter()
+        response, error, aborted = None, None, False
+        try:
+            response = client.post(
+                endpoint, headers=headers, json=payload, timeout=timeout or settings.http_timeout
+            )
+        except httpx.TransportError as e:
+            error = e
+        except BaseException as e:
+            attempts.breaker.abort_call()
+            aborted = _is_abort(e)
+            raise
+        finally:
+            attempts.limiter.release(time.perf_counter() - start, response, aborted=aborted)
+
+        delay = attempts.after_attempt(response, error)
+        if delay is None:
+            return response
+        time.sleep(delay)
+
+
+async def apost_json(
+    endpoint: str,
+    headers: dict[str, str],
+    payload: dict[str, Any],
+    timeout: float | None = None,
+) -> httpx.Response:
+    """POST a JSON payload through the pooled async client (see `post_json`)."""
+    client = get_async_client(endpoint)
+    attempts = _RequestAttempts(endpoint)
+
+    while True:
+        attempts.before_attempt()
+        await attempts.limiter.aacquire()
+        start = time.perf_counter()
+        response, error, aborted = None, None, False
+        try:
+            response = await client.post(
+                endpoint, headers=headers, json=payload, timeout=timeout or settings.http_timeout
+            )
+        except httpx.TransportError as e:
+            error = e
+        except BaseException as e:
+            # Hedge losers are cancelled here; their slot is returned as aborted
+            attempts.breaker.abort_call()
+            aborted = _is_abort(e)
+            raise
+        finally:
+            attempts.limiter.release(time.perf_counter() - start, response, aborted=aborted)
+
+        delay = attempts.after_attempt(response, error)
+        if delay is None:
+            return response
+        await asyncio.sleep(delay)
+
+
+def _build_post(
+    client: httpx.Client | httpx.AsyncClient,
+    endpoint: str,
+    headers: dict[str, str],
+    payload: dict[str, Any],
+    timeout: float | None,
+) -> httpx.Request:
+    return client.build_request(
+        "POST", endpoint, headers=headers, json=payload, timeout=timeout or settings.http_timeout
+    )
+
+
+@contextmanager
+def stream_post_json(
+    endpoint: str,
+    headers: dict[str, str],
+    payload: dict[str, Any],
+    timeout: float | None = None,
+) -> Iterator[httpx.Response]:
+    """POST a JSON payload and yield the response with its body left unread.
+
+    Rate limiting, retries and circuit breaking work as in `post_json`, but only until
+    the response headers arrive: once a 2xx stream has started it is handed to the
+    caller, whose limiter slot is held until the block exits. Leaving the block early
+    closes the connection, which stops the provider from generating further tokens.
+    Error responses (4xx/5xx) are yielded with their body already read.
+
+    Raises:
+        RateLimitError: If the endpoint is still rate limited after all retries
+        CircuitOpenError: If the endpoint's circuit breaker is open
+        httpx.TransportError: If the request keeps failing at the transport level
+    """
+    client = get_sync_client(endpoint)
+    attempts = _RequestAttempts(endpoint)
+
+    while True:
+        attempts.before_attempt()
+        attempts.limiter.acquire()
+        start = time.perf_counter()
+        response, error = None, None
+        try:
+            response = client.send(
+                _build_post(client, endpoint, headers, payload, timeout), stream=True
+            )
+            if response.status_code >= 400:
+                response.read()
+        except httpx.TransportError as e:
+            error = e
+            if response is not None:
+                response.close()
+                response = None
+        except BaseException as e:
+            if response is not None:
+                response.close()
+            attempts.breaker.abort_call()
+            attempts.limiter.release(time.perf_counter() - start, None, aborted=_is_abort(e))
+            raise
+        if error is None and response.status_code < 400:
+            break
+
+        attempts.limiter.release(time.perf_counter() - start, response)
+        delay = attempts.after_attempt(response, error)
+        if delay is None:
+            yield response
+            return
+        time.sleep(delay)
+
+    attempts.after_attempt(response, None)
+    aborted = False
+    try:
+        yield response
+    except BaseException as e:
+        aborted = _is_abort(e)
+        raise
+    finally:
+        response.close()
+        attempts.limiter.release(time.perf_counter() - start, response, aborted=aborted)
+
+
+@asynccontextmanager
+async def astream_post_json(
+    endpoint: str,
+    headers: dict[str, str],
+    payload: dict[str, Any],
+    timeout: float | None = None,
+) -> AsyncIterator[httpx.Response]:
+    """Async version of `stream_post_json`."""
+    client = get_async_client(endpoint)
+    attempts = _RequestAttempts(endpoint)
+
+    while True:
+        attempts.before_attempt()
+        await attempts.limiter.aacquire()
+        start = time.perf_counter()
+        response, error = None, None
+        try:
+            response = await client.send(
+                _build_post(client, endpoint, headers, payload, timeout), stream=True
+            )
+            if response.status_code >= 400:
+                await response.aread()
+        except httpx.TransportError as e:
+            error = e
+            if response is not None:
+                await response.aclose()
+                response = None
+        except BaseException as e:
+            attempts.breaker.abort_call()
+            attempts.limiter.release(time.perf_counter() - start, None, aborted=_is_abort(e))
+            if response is not None:
+                await response.aclose()
+            raise
+        if error is None and response.status_code < 400:
+            break
+
+        attempts.limiter.release(time.perf_counter() - start, response)
+        delay = attempts.after_attempt(response, error)
+        if delay is None:
+            yield response
+            return
+        await asyncio.sleep(delay)
+
+    attempts.after_attempt(response, None)
+    aborted = False
+    try:
+        yield response
+    except BaseException as e:
+        aborted = _is_abort(e)
+        raise
+    finally:
+        await response.aclose()
+        attempts.limiter.release(time.perf_counter() - start, response, aborted=aborted)
+
+
+async def warmup_clients(endpoints: Iterable[str]) -> None:
+    """Pre-open pooled connections so the first real request skips TCP+TLS setup.
+
+    A cheap HEAD request is sent to every distinct origin through both the async and
+    sync pools. Any response (even 4xx/405) leaves a warm keep-alive connection behind;
+    failures are logged and ignored.
+    """
+    origins = sorted({_origin(e) for e in endpoints if e})
+    if not origins:
+        return
+
+    def _warm_sync(origin: str) -> None:
+        get_sync_client(origin).head(origin, timeout=settings.http_connect_timeout)
+
+    for origin in origins:
+        try:
+            await get_async_client(origin).head(origin, timeout=settings.http_connect_timeout)
+            await asyncio.to_thread(_warm_sync, origin)
+        except httpx.HTTPError as e:
+            log_pipeline(f"[HTTP] Warmup failed for {origin}: {e}")
+    log_pipeline(f"[HTTP] Warmed up {len(origins)} connection pool(s)")
+
+
+def close_sync_clients() -> None:
+    """Close all pooled sync clients."""
+    with _clients_lock:
+        clients = list(_sync_clients.values())
+        _sync_clients.clear()
+    for client in clients:
+        client.close()
+
+
+async def aclose_async_clients() -> None:
+    """Close the pooled async clients of the running loop (e.g. before a private loop ends)."""
+    loop = asyncio.get_running_loop()
+    with _clients_lock:
+        clients = list(_async_clients.pop(loop, {}).values())
+    for client in clients:
+        await client.aclose()
+
+
+async def aclose_clients() -> None:
+    """Close pooled async clients of the running loop and all sync clients (call at shutdown)."""
+    await aclose_async_clients()
+    close_sync_clients()
@@ -0,0 +1,135 @@
+"""Prebuilt, versioned snapshots of the local vector index.
+
+A snapshot is a directory holding:
+
+- `qdrant_storage/`: a copy of the local Qdrant storage (vectors and payloads),
+- `manifest.json`: the collection's ingestion manifest,
+- `snapshot.json`: format version, collection, qdrant-client version, the index
+  signature (embedding model, chunking, near-duplicate filtering), point count and a
+  SHA-256 checksum of every file above.
+
+`scripts/build_index_snapshot.py` builds one (e.g. while building the Docker image).
+At startup `ingest_all_data` restores it instead of re-embedding the knowledge base when
+the local index is missing or does not match the settings, provided the snapshot itself
+was built with the current settings and its checksums verify. The incremental sync that
+follows then only indexes files that changed since the snapshot was built.
+"""
+
+import json
+import os
+import shutil
+from datetime import datetime
+from importlib.metadata import version
+from pathlib import Path
+from typing import Any
+
+from src.utils.ingest_manifest import file_sha256
+
+SNAPSHOT_FORMAT_VERSION = 1
+
+_META_FILE = "snapshot.json"
+_STORAGE_DIR = "qdrant_storage"
+_MANIFEST_FILE = "manifest.json"
+# Held by an open local Qdrant client; not part of the data
+_LOCK_FILE = ".lock"
+
+
+def _checksums(snapshot_dir: Path) -> dict[str, str]:
+    return {
+        path.relative_to(snapshot_dir).as_posix(): file_sha256(path)
+        for path in sorted(snapshot_dir.rglob("*"))
+        if path.is_file() and path.name not in (_META_FILE, _LOCK_FILE)
+    }
+
+
+def create_snapshot(
+    snapshot_dir: Path,
+    db_path: Path,
+    manifest_file: Path,
+    collection_name: str,
+    signature: dict[str, Any],
+    points: int,
+) -> dict[str, Any]:
+    """Copy a local Qdrant storage and its manifest into `snapshot_dir`, replacing it.
+
+    The Qdrant client using `db_path` must be closed. Returns the snapshot metadata.
+    """
+    build_dir = snapshot_dir.with_name(f"{snapshot_dir.name}.building")
+    shutil.rmtree(build_dir, ignore_errors=True)
+    shutil.copytree(db_path, build_dir / _STORAGE_DIR, ignore=shutil.ignore_patterns(_LOCK_FILE))
+    shutil.copy2(manifest_file, build_dir / _MANIFEST_FILE)
+
+    meta = {
+        "format_version": SNAPSHOT_FORMAT_VERSION,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "collection": collection_name,
+        "qdrant_client": version("qdrant-client"),
+        "signature": signature,
+        "points": points,
+        "checksums": _checksums(build_dir),
+    }
+    (build_dir / _META_FILE).write_text(
+        json.dumps(meta, indent=2, ensure_ascii=False), encoding="utf-8"
+    )
+
+    shutil.rmtree(snapshot_dir, ignore_errors=True)
+    os.replace(build_dir, snapshot_dir)
+    return meta
+
+
+def read_snapshot(snapshot_dir: Path) -> dict[str, Any] | None:
+    """Metadata of the snapshot in `snapshot_dir`, or None if there is none."""
+    meta_path = snapshot_dir / _META_FILE
+    if not meta_path.exists():
+        return None
+    return json.loads(meta_path.read_text(encoding="utf-8"))
+
+
+def snapshot_mismatch(
+    meta: dict[str, Any], collection_name: str, signature: dict[str, Any]
+) -> str | None:
+    """Why a snapshot cannot serve `collection_name` under current settings, or None if it can."""
+    if meta.get("format_version") != SNAPSHOT_FORMAT_VERSION:
+        return f"format version {meta.get('format_version')} (expected {SNAPSHOT_FORMAT_VERSION})"
+    if meta.get("collection") != collection_name:
+        return f"built for collection '{meta.get('collection')}'"
+    if meta.get("qdrant_client") != version("qdrant-client"):
+        return f"built with qdrant-client {meta.get('qdrant_client')}"
+    built_with = meta.get("signature", {})
+    changed = sorted(
+        key for key in {*built_with, *signature} if built_with.get(key) != signature.get(key)
+    )
+    if changed:
+        return "built with different " + ", ".join(
+            f"{key} ({built_with.get(key)!r} != {signature.get(key)!r})" for key in changed
+        )
+    return None
+
+
+def verify_snapshot(snapshot_dir: Path, meta: dict[str, Any]) -> None:
+    """Check every snapshot file against its recorded checksum.
+
+    Raises:
+        ValueError: If a file is missing, unexpected or modified
+    """
+    expected = meta.get("checksums", {})
+    actual = _checksums(snapshot_dir)
+    for name in sorted(expected.keys() | actual.keys()):
+        if name not in actual:
+            raise ValueError(f"{name} is missing")
+        if name not in expected:
+            raise ValueError(f"{name} is not part of the snapshot")
+        if expected[name] != actual[name]:
+            raise ValueError(f"{name} does not match its checksum")
+
+
+def restore_snapshot(snapshot_dir: Path, db_path: Path, manifest_file: Path) -> None:
+    """Replace the local Qdrant storage at `db_path` and the manifest with the snapshot's.
+
+    No Qdrant client may have `db_path` open.
+    """
+    shutil.rmtree(db_path, ignore_errors=True)
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    shutil.copytree(snapshot_dir / _STORAGE_DIR, db_path)
+    manifest_file.parent.mkdir(parents=True, exist_ok=True)
+    shutil.copy2(snapshot_dir / _MANIFEST_FILE, manifest_file)
@@ -0,0 +1,165 @@
+"""Manifest of indexed files and chunks for incremental ingestion.
+
+For every ingested file the manifest records its size, mtime and content hash, plus the
+Qdrant point IDs of its chunks with a hash of each chunk's payload. Point IDs are
+derived from the file key and the chunk text, so re-ingesting a file maps unchanged
+chunks onto the same points:
+
+- files whose size and mtime (or, failing that, content hash) are unchanged are skipped
+  without being parsed,
+- a changed file only upserts chunks that are new or whose metadata changed, and
+  deletes the points of chunks that disappeared,
+- files that were removed from disk have all their points deleted.
+
+With near-duplicate filtering enabled, the SimHash fingerprint of each indexed chunk is
+recorded too, so chunks of new files are compared against the whole index, and so is
+each skipped chunk with the fingerprint of the indexed chunk it duplicates: once that
+chunk is deleted, the file of the skipped one is re-indexed.
+
+The manifest also records what the index was built with (embedding model, chunking);
+if that no longer matches the settings, the collection is rebuilt from scratch.
+"""
+
+import hashlib
+import json
+import os
+import uuid
+from pathlib import Path
+from typing import Any
+
+from src.config import DATA_DIR, settings
+
+MANIFEST_VERSION = 1
+
+
+def manifest_key(path: Path) -> str:
+    """Stable key of a file: relative to DATA_DIR when inside it, else the absolute path."""
+    resolved = path.resolve()
+    try:
+        return resolved.relative_to(DATA_DIR.resolve()).as_posix()
+    except ValueError:
+        return resolved.as_posix()
+
+
+def chunk_point_id(file_key: str, chunk: str) -> str:
+    """Deterministic Qdrant point ID (a UUID) for a chunk of a file."""
+    digest = hashlib.sha256(f"{file_key}\0{chunk}".encode("utf-8")).hexdigest()
+    return str(uuid.UUID(hex=digest[:32]))
+
+
+def payload_hash(chunk: str, metadata: dict[str, Any]) -> str:
+    payload = json.dumps([chunk, metadata], ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def file_sha256(path: Path) -> str:
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def index_signature(embedding_model_id: str) -> dict[str, Any]:
+    """Settings that determine chunk boundaries and vectors; a change requires a rebuild."""
+    return {
+        "version": MANIFEST_VERSION,
+        "embedding_model": embedding_model_id,
+        "chunk_size": settings.chunk_size,
+        "chunk_overlap": settings.chunk_overlap,
+        "near_duplicate_max_distance": (
+            settings.near_duplicate_max_distance if settings.near_duplicate_filter_enabled else None
+        ),
+    }
+
+
+class IngestManifest:
+    """Per-collection record of indexed files and their chunk points."""
+
+    def __init__(self, path: Path, signature: dict[str, Any]):
+        self.path = path
+        self.signature = signature
+        self.files: dict[str, dict[str, Any]] = {}
+        self.matches_index = False
+
+        if path.exists():
+            data = json.loads(path.read_text(encoding="utf-8"))
+            if data.get("signature") == signature:
+                self.files = data.get("files", {})
+                self.matches_index = True
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.files
+
+    def is_unchanged(self, key: str, path: Path) -> bool:
+        """True if the file was indexed with its current content.
+
+        Size and mtime are checked first; only when they differ is the content hashed,
+        so touching a file does not trigger re-indexing.
+        """
+        entry = self.files.get(key)
+        if entry is None:
+            return False
+        stat = path.stat()
+        if entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime:
+            return True
+        if entry["size"] != stat.st_size or entry["sha256"] != file_sha256(path):
+            return False
+        entry["mtime"] = stat.st_mtime
+        return True
+
+    def points(self, key: str) -> dict[str, str]:
+        """Point ID -> payload hash of the chunks currently indexed for a file."""
+        return self.files.get(key, {}).get("points", {})
+
+    def fingerprints(self, key: str) -> dict[str, int]:
+        """Point ID -> SimHash fingerprint of the chunks indexed for a file."""
+        return self.files.get(key, {}).get("fingerprints", {})
+
+    def duplicates(self, key: str) -> dict[str, int]:
+        """Point ID -> fingerprint of the indexed copy, for chunks skipped as near-duplicates."""
+        return self.files.get(key, {}).get("duplicates", {})
+
+    def record(
+        self,
+        key: str,
+        path: Path,
+        points: dict[str, str],
+        fingerprints: dict[str, int] | None = None,
+        duplicates: dict[str, int] | None = None,
+    ) -> None:
+        stat = path.stat()
+        self.files[key] = {
+            "size": stat.st_size,
+            "mtime": stat.st_mtime,
+            "sha256": file_sha256(path),
+            "points": points,
+        }
+        if fingerprints:
+            self.files[key]["fingerprints"] = fingerprints
+        if duplicates:
+            self.files[key]["duplicates"] = duplicates
+
+    def remove(self, key: str) -> dict[str, str]:
+        """Forget a file; returns the points it had."""
+        return self.files.pop(key, {}).get("points", {})
+
+    def reset(self) -> None:
+        self.files.clear()
+        self.matches_index = True
+
+    def save(self) -> None:
+        """Write the manifest atomically (a crash keeps the previous version)."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(
+            json.dumps({"signature": self.signature, "files": self.files}, ensure_ascii=False),
+            encoding="utf-8",
+        )
+        os.replace(tmp_path, self.path)
+
+
+def manifest_path(collection_name: str) -> Path:
+    """Manifest file of a collection, kept next to the local Qdrant storage."""
+    db_path = settings.vector_db_path_resolved
+    return db_path.parent / f"{db_path.name}_manifests" / f"{collection_name}.json"
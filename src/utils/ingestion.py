@@ -1,23 +1,89 @@
-"""Knowledge base ingestion utilities for Qdrant vector store."""
-
-import json
-from pathlib import Path
+"""Knowledge base ingestion utilities for Qdrant vector store.
+
+Ingestion is incremental: an `IngestManifest` per collection records which files and
+chunks are indexed, chunks are stored under deterministic point IDs, and each run only
+parses new or changed files, upserts their new or changed chunks and deletes the points
+of removed chunks and files.
+
+Indexing runs as three overlapping stages connected by bounded queues: a process pool
+parses, normalizes and splits files (crawl files in batches of documents read
+incrementally), an embedding thread embeds fixed-size batches of INGEST_BATCH_CHUNKS
+chunks (across or within files) and an upsert thread writes them to Qdrant. A full
+queue blocks the stage feeding it, and chunks held between parsing and upsert are
+capped at INGEST_MEMORY_LIMIT_MB, so memory stays flat however large a file or a corpus
+is.
+
+Chunks that nearly duplicate a chunk already indexed (same SimHash fingerprint up to
+NEAR_DUPLICATE_MAX_DISTANCE bits) are skipped before embedding. Files are parsed in key
+order, so of near-duplicates first indexed in the same run the copy in the first file is
+kept; files whose skipped chunks lose the indexed copy (its file changed or was removed)
+are re-indexed at the end of the run.
+"""
+
+import array
+import itertools
+import multiprocessing
+import os
+import queue
 import re
+import threading
+import time
+from collections.abc import Callable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING
 
-from langchain_qdrant import QdrantVectorStore
-from langchain_qdrant.qdrant import QdrantVectorStoreError
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, VectorParams
 from tqdm import tqdm
 
 from src.config import DATA_DIR, settings
 from src.utils.common import normalize_text
+from src.utils.crawled_data import CRAWLED_EXTENSIONS, iter_crawled_documents
 from src.utils.doc_parsers import load_document
-from src.utils.embeddings import get_embeddings
-from src.utils.logging import log_pipeline
-
-SUPPORTED_EXTENSIONS = {".json", ".pdf", ".docx", ".txt"}
+from src.utils.embeddings import (
+    embed_documents_concurrently,
+    get_embedding_model_id,
+    get_embeddings,
+    log_embedding_stats,
+)
+from src.utils.index_snapshot import (
+    read_snapshot,
+    restore_snapshot,
+    snapshot_mismatch,
+    verify_snapshot,
+)
+from src.utils.ingest_manifest import (
+    IngestManifest,
+    chunk_point_id,
+    index_signature,
+    manifest_key,
+    manifest_path,
+    payload_hash,
+)
+from src.utils.logging import log_pipeline, log_stats
+
+# Qdrant and the text splitters take seconds to import; they are loaded on first use so
+# that answering questions against an existing index does not pay for them at startup
+if TYPE_CHECKING:
+    from langchain_qdrant import QdrantVectorStore
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+    from qdrant_client import QdrantClient
+
+    from src.utils.near_duplicates import NearDuplicateIndex
+
+SUPPORTED_EXTENSIONS = {".json", ".jsonl", ".pdf", ".docx", ".txt"}
+
+# Embedded batches waiting for the upsert stage
+_UPSERT_QUEUE_BATCHES = 2
+
+# Rough per-chunk memory besides its text: float32 vector plus metadata dict
+_CHUNK_OVERHEAD_BYTES = 8192
+
+# Crawl files are parsed in tasks of about this many characters of documents
+_PARSE_TASK_CHARS = 1 << 20
+
+_STAGE_DONE = None
 
 JUNK_PATTERNS = [
     r"đăng nhập", r"đăng ký", r"quên mật khẩu", r"chia sẻ qua email", 
@@ -28,24 +94,169 @@ JUNK_PATTERNS = [
     r"wikipedia", r"bách khoa toàn thư", r"sửa đổi", r"biểu quyết",
 ]
 
-_qdrant_client: QdrantClient | None = None
-_vector_store: QdrantVectorStore | None = None
+# All patterns in one alternation, so a chunk is scanned once rather than once per pattern
+_JUNK_RE = re.compile("|".join(f"(?:{pattern})" for pattern in JUNK_PATTERNS))
+
+
+@dataclass
+class IngestResult:
+    """Counters of one ingestion run."""
+
+    indexed_files: int = 0
+    unchanged_files: int = 0
+    removed_files: int = 0
+    failed_files: int = 0
+    chunks: int = 0
+    upserted_chunks: int = 0
+    near_duplicates: int = 0
+    deleted_points: int = 0
+    reindexed_files: int = 0
+
+    def summary(self) -> str:
+        summary = (
+            f"{self.indexed_files} new/changed files ({self.chunks} chunks, "
+            f"{self.upserted_chunks} upserted, {self.near_duplicates} near-duplicates skipped), "
+            f"{self.unchanged_files} unchanged, {self.removed_files} removed, "
+            f"{self.deleted_points} stale points deleted"
+        )
+        if self.reindexed_files:
+            summary += f", {self.reindexed_files} re-indexed for removed near-duplicate copies"
+        return summary
+
+
+@dataclass
+class _ParsedFile:
+    """A file being indexed: the points of all its chunks parsed so far."""
+
+    path: Path
+    key: str
+    indexed: dict[str, str]
+    points: dict[str, str] = field(default_factory=dict)
+    fingerprints: dict[str, int] = field(default_factory=dict)
+    duplicates: dict[str, int] = field(default_factory=dict)
+    stale_ids: list[str] = field(default_factory=list)
+
+
+@dataclass
+class _ParsedPart:
+    """Chunks of one parse task that still need writing; `last` marks the file's final part."""
+
+    file: _ParsedFile
+    ids: list[str] = field(default_factory=list)
+    chunks: list[str] = field(default_factory=list)
+    metadatas: list[dict] = field(default_factory=list)
+    last: bool = False
+
+
+@dataclass
+class _Slice:
+    """Chunks [start, end) of a parsed part; `last` marks the file's final slice."""
+
+    part: _ParsedPart
+    start: int
+    end: int
+
+    @property
+    def file(self) -> _ParsedFile:
+        return self.part.file
+
+    @property
+    def last(self) -> bool:
+        return self.part.last and self.end == len(self.part.chunks)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(_chunk_bytes(chunk) for chunk in self.part.chunks[self.start:self.end])
+
+
+def _chunk_bytes(chunk: str) -> int:
+    return 4 * len(chunk) + _CHUNK_OVERHEAD_BYTES
+
+
+class _MemoryBudget:
+    """Byte budget for chunks held between the parse and upsert stages.
+
+    A request that does not fit waits until enough is released, except when nothing is
+    held, so a single file larger than the budget still goes through (alone).
+    """
+
+    def __init__(self, limit_bytes: int):
+        self.limit = limit_bytes
+        self.used = 0
+        self.peak = 0
+        self.waiting = False
+        self._condition = threading.Condition()
+
+    def acquire(self, amount: int) -> None:
+        with self._condition:
+            self.waiting = True
+            self._condition.wait_for(lambda: self.used == 0 or self.used + amount <= self.limit)
+            self.waiting = False
+            self.used += amount
+            self.peak = max(self.peak, self.used)
+
+    def release(self, amount: int) -> None:
+        with self._condition:
+            self.used -= amount
+            self._condition.notify_all()
+
+
+class _StageStats:
+    """Counters of one ingestion stage."""
+
+    def __init__(self, name: str, unit: str):
+        self.name = name
+        self.unit = unit
+        self.items = 0
+        self.chunks = 0
+        self.busy = 0.0
+        self.blocked = 0.0
+
+    def put(self, target: queue.Queue, item) -> None:
+        """Hand an item to the next stage, counting time spent waiting for queue space."""
+        start = time.perf_counter()
+        target.put(item)
+        self.blocked += time.perf_counter() - start
+
+    def summary(self) -> str:
+        return (
+            f"Ingest stage {self.name}: {self.items} {self.unit}, {self.chunks} chunks, "
+            f"busy {self.busy:.1f}s, blocked {self.blocked:.1f}s on the next stage"
+        )
 
 
-def get_qdrant_client() -> QdrantClient:
+_qdrant_client: "QdrantClient | None" = None
+_vector_store: "QdrantVectorStore | None" = None
+
+
+def get_qdrant_client() -> "QdrantClient":
     """Get or create persistent Qdrant client singleton."""
     global _qdrant_client
     if _qdrant_client is None:
+        from qdrant_client import QdrantClient
+
         db_path = settings.vector_db_path_resolved
         db_path.parent.mkdir(parents=True, exist_ok=True)
         _qdrant_client = QdrantClient(path=str(db_path))
     return _qdrant_client
 
 
-def get_vector_store() -> QdrantVectorStore:
+def close_qdrant_client() -> None:
+    """Close the Qdrant client singleton, releasing the local storage (reopened on next use)."""
+    global _qdrant_client, _vector_store
+    if _qdrant_client is not None:
+        _qdrant_client.close()
+        _qdrant_client = None
+        _vector_store = None
+
+
+def get_vector_store() -> "QdrantVectorStore":
     """Get the global vector store instance (Lazy load)."""
     global _vector_store
     if _vector_store is None:
+        from langchain_qdrant import QdrantVectorStore
+        from langchain_qdrant.qdrant import QdrantVectorStoreError
+
         client = get_qdrant_client()
         embeddings = get_embeddings()
         try:
@@ -59,6 +270,8 @@ def get_vector_store() -> QdrantVectorStore:
             log_pipeline(f"Vector store init failed ({e}). Recreating collection '{settings.qdrant_collection}'.")
             sample_embedding = embeddings.embed_query("test")
             _initialize_collection(client, settings.qdrant_collection, len(sample_embedding), force_recreate=True)
+            # The emptied collection no longer matches its manifest; the next ingestion rebuilds it
+            manifest_path(settings.qdrant_collection).unlink(missing_ok=True)
             _vector_store = QdrantVectorStore(
                 client=client,
                 collection_name=settings.qdrant_collection,
@@ -71,20 +284,22 @@ def _is_junk_text(text: str) -> bool:
     if len(text.split()) < 5:  # Loại bỏ câu quá ngắn
         return True
     
-    text_lower = text.lower()
-    for pattern in JUNK_PATTERNS:
-        if re.search(pattern, text_lower):
-            return True
-    return False
+    return _JUNK_RE.search(text.lower()) is not None
 
 
 def _initialize_collection(
-    client: QdrantClient,
+    client: "QdrantClient",
     collection_name: str,
     vector_size: int,
     force_recreate: bool = False,
-) -> None:
-    """Initialize Qdrant collection, creating if needed."""
+) -> bool:
+    """Initialize Qdrant collection, creating if needed.
+
+    Returns:
+        True if the collection was (re)created empty
+    """
+    from qdrant_client.models import Distance, VectorParams
+
     collection_exists = client.collection_exists(collection_name)
 
     def _existing_vector_size() -> int | None:
@@ -115,23 +330,16 @@ def _initialize_collection(
             collection_name=collection_name,
             vectors_config=VectorParams(size=vector_size, distance=Distance.COSINE),
         )
+    return not collection_exists
 
 
-def _process_crawled_json(json_path: Path) -> tuple[list[str], list[dict]]:
-    """Process crawled JSON file, normalize content, and return (chunks, metadatas)."""
-    with open(json_path, encoding="utf-8") as f:
-        data = json.load(f)
-
-    documents = data.get("documents", [])
-    if not documents:
-        return [], []
-
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=settings.chunk_size,
-        chunk_overlap=settings.chunk_overlap,
-        separators=["\n\n", "\n", ".", " ", ""],
-    )
-
+def _chunk_crawled_documents(
+    json_path: Path,
+    fields: dict,
+    documents: list[dict],
+    splitter: "RecursiveCharacterTextSplitter",
+) -> tuple[list[str], list[dict]]:
+    """Normalize and split documents of a crawl file, returning (chunks, metadatas)."""
     all_chunks = []
     all_metadatas = []
 
@@ -151,9 +359,9 @@ def _process_crawled_json(json_path: Path) -> tuple[list[str], list[dict]]:
             "source_url": doc.get("url", ""),
             "title": normalize_text(doc.get("title", "")),
             "summary": normalize_text(doc.get("summary", "")),
-            "topic": data.get("topic", ""),
+            "topic": fields.get("topic", ""),
             "keywords": keywords_str,
-            "domain": data.get("domain", ""),
+            "domain": fields.get("domain", ""),
             "source_file": str(json_path),
         }
 
@@ -173,16 +381,50 @@ def _process_crawled_json(json_path: Path) -> tuple[list[str], list[dict]]:
     return all_chunks, all_metadatas
 
 
+def _process_crawled_json(json_path: Path) -> tuple[list[str], list[dict]]:
+    """Process a crawl file (JSON or JSONL) document by document, returning (chunks, metadatas)."""
+    splitter = _get_text_splitter()
+
+    all_chunks = []
+    all_metadatas = []
+    for fields, doc in iter_crawled_documents(json_path):
+        chunks, metadatas = _chunk_crawled_documents(json_path, fields, [doc], splitter)
+        all_chunks.extend(chunks)
+        all_metadatas.extend(metadatas)
+
+    return all_chunks, all_metadatas
+
+
+def _internal_dirs() -> list[Path]:
+    """Directories the pipeline writes under DATA_DIR, which are not knowledge-base documents."""
+    db_path = settings.vector_db_path_resolved
+    return [
+        path.resolve()
+        for path in (
+            db_path,
+            manifest_path(settings.qdrant_collection).parent,
+            settings.embedding_cache_path_resolved,
+            settings.embedding_export_path_resolved,
+            settings.index_snapshot_path_resolved,
+        )
+    ]
+
+
 def _scan_data_files(base_dir: Path) -> list[Path]:
-    """Recursively scan directory for supported files."""
+    """Recursively scan directory for supported files, skipping the pipeline's own stores."""
+    internal_dirs = _internal_dirs()
     files = []
     for ext in SUPPORTED_EXTENSIONS:
-        files.extend(base_dir.rglob(f"*{ext}"))
+        for path in base_dir.rglob(f"*{ext}"):
+            if not any(path.resolve().is_relative_to(internal) for internal in internal_dirs):
+                files.append(path)
     return sorted(files)
 
 
-def _get_text_splitter() -> RecursiveCharacterTextSplitter:
+def _get_text_splitter() -> "RecursiveCharacterTextSplitter":
     """Create a text splitter with standard settings."""
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
     return RecursiveCharacterTextSplitter(
         chunk_size=settings.chunk_size,
         chunk_overlap=settings.chunk_overlap,
@@ -190,56 +432,578 @@ def _get_text_splitter() -> RecursiveCharacterTextSplitter:
     )
 
 
+def _upsert_chunks(
+    vector_store: "QdrantVectorStore",
+    ids: list[str],
+    chunks: list[str],
+    metadatas: list[dict],
+    vectors: list[list[float]],
+) -> None:
+    """Write pre-embedded chunks with the same point layout as `QdrantVectorStore.add_texts`."""
+    from qdrant_client.models import PointStruct
+
+    points = [
+        PointStruct(
+            id=point_id,
+            vector={vector_store.vector_name: vector},
+            payload={
+                vector_store.content_payload_key: chunk,
+                vector_store.metadata_payload_key: metadata,
+            },
+        )
+        for point_id, chunk, metadata, vector in zip(ids, chunks, metadatas, vectors)
+    ]
+    vector_store.client.upsert(collection_name=vector_store.collection_name, points=points)
+
+
+def _delete_points(vector_store: "QdrantVectorStore", ids: list[str]) -> None:
+    from qdrant_client.models import PointIdsList
+
+    if ids:
+        vector_store.client.delete(
+            collection_name=vector_store.collection_name,
+            points_selector=PointIdsList(points=ids),
+        )
+
+
+def _ingest_worker_count(files: int) -> int:
+    workers = settings.ingest_workers or os.cpu_count() or 1
+    return max(min(workers, files), 1)
+
+
+_ParseResult = tuple[list[str], list[dict], list[int], float]
+
+
+def _with_fingerprints(chunks: list[str], metadatas: list[dict], start: float) -> _ParseResult:
+    """Add SimHash fingerprints (when near-duplicates are filtered) and the time since `start`."""
+    fingerprints = []
+    if settings.near_duplicate_filter_enabled and chunks:
+        from src.utils.near_duplicates import simhashes
+
+        fingerprints = simhashes(chunks)
+    return chunks, metadatas, fingerprints, time.perf_counter() - start
+
+
+def _parse_file(file_path: Path) -> _ParseResult:
+    """Parse, normalize and split one file (runs in a worker process)."""
+    start = time.perf_counter()
+    chunks, metadatas = _extract_chunks_from_file(file_path, _get_text_splitter())
+    return _with_fingerprints(chunks, metadatas, start)
+
+
+def _parse_documents(file_path: Path, fields: dict, documents: list[dict]) -> _ParseResult:
+    """Normalize and split a batch of a crawl file's documents (runs in a worker process)."""
+    start = time.perf_counter()
+    chunks, metadatas = _chunk_crawled_documents(file_path, fields, documents, _get_text_splitter())
+    return _with_fingerprints(chunks, metadatas, start)
+
+
+def _parse_tasks(file_path: Path) -> Iterator[tuple[Callable, tuple]]:
+    """Parse tasks of a file: incremental document batches for crawl files, else the whole file."""
+    if file_path.suffix.lower() not in CRAWLED_EXTENSIONS:
+        yield _parse_file, (file_path,)
+        return
+    batch: list[dict] = []
+    batch_chars = 0
+    for fields, document in iter_crawled_documents(file_path):
+        batch.append(document)
+        batch_chars += len(document.get("content") or "") if isinstance(document, dict) else 0
+        if batch_chars >= _PARSE_TASK_CHARS:
+            yield _parse_documents, (file_path, fields, batch)
+            batch, batch_chars = [], 0
+    if batch:
+        yield _parse_documents, (file_path, fields, batch)
+
+
+def _parse_files(
+    files: list[Path],
+    ordered: bool = False,
+) -> Iterator[tuple[Path, _ParseResult | Exception | None]]:
+    """Parse files on a process pool, yielding (path, result or error) per parse task.
+
+    Results arrive in completion order, or in submission order if `ordered`; once every
+    task of a file has been yielded, (path, None) follows. At most two tasks per worker
+    are in flight, and crawl files are read and submitted a batch of documents at a time,
+    so parsed chunks only accumulate while the consumer (the embedding stage) keeps up,
+    however large a file is. If the pool cannot be used (e.g. the calling script lacks a
+    `__main__` guard), unfinished and remaining files are parsed in-process; parts of a
+    file may then be yielded twice.
+    """
+    remaining = iter(files)
+    workers = _ingest_worker_count(len(files))
+    if workers > 1:
+        # spawn: the parent already runs embedding/upsert threads, which fork does not carry
+        # over safely
+        context = multiprocessing.get_context("spawn")
+        in_flight: dict[Future, Path] = {}
+        # Tasks submitted but not yet yielded, per unfinished file
+        unfinished: dict[Path, int] = {}
+        scanning: Path | None = None
+        tasks: Iterator[tuple[Callable, tuple]] = iter(())
+        try:
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+                while True:
+                    while len(in_flight) < 2 * workers:
+                        if scanning is None:
+                            scanning = next(remaining, None)
+                            if scanning is None:
+                                break
+                            unfinished[scanning] = 0
+                            tasks = _parse_tasks(scanning)
+                        try:
+                            task = next(tasks, None)
+                        except Exception as e:
+                            yield scanning, e
+                            task = None
+                        if task is None:
+                            if unfinished[scanning] == 0:
+                                del unfinished[scanning]
+                                yield scanning, None
+                            scanning = None
+                            continue
+                        function, args = task
+                        in_flight[pool.submit(function, *args)] = scanning
+                        unfinished[scanning] += 1
+                    if not in_flight:
+                        return
+                    if ordered:
+                        wait([next(iter(in_flight))])
+                        done = list(itertools.takewhile(Future.done, in_flight))
+                    else:
+                        done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        error = future.exception()
+                        if isinstance(error, BrokenProcessPool):
+                            raise error
+                        file_path = in_flight.pop(future)
+                        unfinished[file_path] -= 1
+                        yield file_path, error if error is not None else future.result()
+                        if unfinished[file_path] == 0 and file_path != scanning:
+                            del unfinished[file_path]
+                            yield file_path, None
+        except BrokenProcessPool as e:
+            log_pipeline(f"Parse worker pool failed ({e}); parsing the remaining files in-process")
+            remaining = iter([*unfinished, *remaining])
+
+    for file_path in remaining:
+        try:
+            for function, args in _parse_tasks(file_path):
+                try:
+                    yield file_path, function(*args)
+                except Exception as e:
+                    yield file_path, e
+        except Exception as e:
+            yield file_path, e
+        yield file_path, None
+
+
 def _process_and_index_documents(
     files: list[Path],
-    vector_store: QdrantVectorStore,
+    vector_store: "QdrantVectorStore",
+    manifest: IngestManifest,
     desc: str = "Processing Files",
-) -> tuple[int, int, int]:
-    """Process files and add to vector store.
+    reparse: set[str] | None = None,
+) -> IngestResult:
+    """Index new and changed files, skipping files the manifest shows as unchanged.
+
+    Files are parsed on INGEST_WORKERS processes, crawl files (JSON or JSONL) a batch of
+    documents at a time as they are read. The chunks are cut into batches of
+    INGEST_BATCH_CHUNKS, regardless of file boundaries, embedded with
+    `aembed_documents` (several requests in flight) and upserted while the next batch
+    is embedded. Only chunks that are new or whose payload changed are embedded and
+    written, and chunks nearly duplicating one elsewhere in the index (or earlier in the
+    run) are skipped; points of chunks that disappeared from a changed file are deleted
+    once its last batch is written, and the file is then recorded in the manifest, so an
+    interrupted run resumes where it stopped. Files of the manifest with chunks skipped
+    in favour of a chunk that is no longer indexed are then re-indexed.
 
     Args:
         files: List of file paths to process
         vector_store: QdrantVectorStore instance
+        manifest: Manifest of the collection, updated in place
         desc: Progress bar description
+        reparse: Keys of files to parse even if unchanged; set for the re-indexing pass,
+            which does not look for further files to re-index
 
     Returns:
-        Tuple of (total_chunks, total_docs, failed_files)
+        Counters of the run
     """
-    splitter = _get_text_splitter()
-    total_chunks = 0
-    total_docs = 0
-    failed_files = 0
-
-    with tqdm(total=len(files), desc=desc, unit="file", position=0) as pbar:
-        for file_path in files:
+    result = IngestResult()
+    result_lock = threading.Lock()
+    failed_keys: set[str] = set()
+    batch_chunks = max(settings.ingest_batch_chunks, 1)
+    budget = _MemoryBudget(settings.ingest_memory_limit_mb * 1024 * 1024)
+    parse_stats = _StageStats("parse", "files")
+    embed_stats = _StageStats("embed", "batches")
+    upsert_stats = _StageStats("upsert", "batches")
+    embed_queue: queue.Queue[_ParsedPart | None] = queue.Queue(
+        maxsize=max(settings.ingest_queue_size, 1)
+    )
+    upsert_queue: queue.Queue[tuple[list[_Slice], list[array.array]] | None] = queue.Queue(
+        maxsize=_UPSERT_QUEUE_BATCHES
+    )
+    # Progress is counted in chunks; the total grows as files are parsed
+    pbar = tqdm(total=0, desc=desc, unit="chunk", position=0)
+    files_done = 0
+
+    def file_done(count: int = 1) -> None:
+        nonlocal files_done
+        with result_lock:
+            files_done += count
+            pbar.set_postfix_str(f"files {files_done}/{len(files)}")
+
+    def fail(slices: list[_Slice], error: Exception) -> None:
+        with result_lock:
+            new = {item.file.key: item.file for item in slices if item.file.key not in failed_keys}
+            failed_keys.update(new)
+        if new:
+            names = ", ".join(parsed.path.name for parsed in new.values())
+            tqdm.write(f"        [Error] Indexing failed for {names}: {error}")
+
+    def embed_stage() -> None:
+        pending: list[_Slice] = []
+
+        def flush() -> None:
+            chunks = [chunk for item in pending for chunk in item.part.chunks[item.start:item.end]]
+            start = time.perf_counter()
+            try:
+                vectors = (
+                    embed_documents_concurrently(vector_store.embeddings, chunks) if chunks else []
+                )
+            except Exception as e:
+                fail(pending, e)
+                budget.release(sum(item.nbytes for item in pending))
+                pbar.update(len(chunks))
+                file_done(sum(item.last for item in pending))
+            else:
+                embed_stats.items += 1
+                embed_stats.chunks += len(chunks)
+                embed_stats.busy += time.perf_counter() - start
+                # float32 arrays take a quarter of the memory of lists of Python floats
+                packed = [array.array("f", vector) for vector in vectors]
+                embed_stats.put(upsert_queue, (list(pending), packed))
+            pending.clear()
+
+        pending_chunks = 0
+        while True:
+            try:
+                part = embed_queue.get(timeout=0.1)
+            except queue.Empty:
+                # Parsing is waiting for memory held by a partial batch: embed what there is
+                if budget.waiting and pending:
+                    flush()
+                    pending_chunks = 0
+                continue
+            if part is _STAGE_DONE:
+                break
+            start = 0
+            while True:
+                end = min(start + batch_chunks - pending_chunks, len(part.chunks))
+                pending.append(_Slice(part, start, end))
+                pending_chunks += end - start
+                if pending_chunks >= batch_chunks:
+                    flush()
+                    pending_chunks = 0
+                start = end
+                if start >= len(part.chunks):
+                    break
+        if pending:
+            flush()
+        upsert_queue.put(_STAGE_DONE)
+
+    def upsert_stage() -> None:
+        while (item := upsert_queue.get()) is not _STAGE_DONE:
+            slices, vectors = item
+            start = time.perf_counter()
+            completed = [
+                piece.file for piece in slices if piece.last and piece.file.key not in failed_keys
+            ]
             try:
-                pbar.set_postfix_str(f"Current: {file_path.name}")
-                chunks_to_add, metadatas_to_add = _extract_chunks_from_file(file_path, splitter)
-
-                if chunks_to_add:
-                    vector_store.add_texts(
-                        chunks_to_add,
-                        metadatas=metadatas_to_add,
-                        batch_size=len(chunks_to_add),
+                if vectors:
+                    spans = [(piece.part, slice(piece.start, piece.end)) for piece in slices]
+                    _upsert_chunks(
+                        vector_store,
+                        [point_id for part, span in spans for point_id in part.ids[span]],
+                        [chunk for part, span in spans for chunk in part.chunks[span]],
+                        [metadata for part, span in spans for metadata in part.metadatas[span]],
+                        [vector.tolist() for vector in vectors],
                     )
-                    total_chunks += len(chunks_to_add)
-                    total_docs += 1
-                    tqdm.write(f"        [Ingest] {file_path.name}: {len(chunks_to_add)} chunks")
-                else:
-                    tqdm.write(f"        [Warning] {file_path.name}: No content found")
-
+                stale_ids = [point_id for parsed in completed for point_id in parsed.stale_ids]
+                _delete_points(vector_store, stale_ids)
+                for parsed in completed:
+                    manifest.record(
+                        parsed.key,
+                        parsed.path,
+                        parsed.points,
+                        parsed.fingerprints,
+                        parsed.duplicates,
+                    )
+                    tqdm.write(f"        [Ingest] {parsed.path.name}: {len(parsed.points)} chunks")
+                if completed:
+                    manifest.save()
             except Exception as e:
-                tqdm.write(f"        [Error] {file_path.name}: {e}")
-                failed_files += 1
-            finally:
-                pbar.update(1)
+                fail(slices, e)
+            else:
+                upsert_stats.items += 1
+                upsert_stats.chunks += len(vectors)
+                upsert_stats.busy += time.perf_counter() - start
+                with result_lock:
+                    result.indexed_files += len(completed)
+                    result.chunks += sum(len(parsed.points) for parsed in completed)
+                    result.upserted_chunks += len(vectors)
+                    result.deleted_points += len(stale_ids)
+            budget.release(sum(piece.nbytes for piece in slices))
+            pbar.update(len(vectors))
+            file_done(sum(piece.last for piece in slices))
+
+    to_parse = []
+    for file_path in files:
+        key = manifest_key(file_path)
+        if (reparse is None or key not in reparse) and manifest.is_unchanged(key, file_path):
+            result.unchanged_files += 1
+            file_done()
+        else:
+            to_parse.append(file_path)
+    near_duplicates = _near_duplicate_index(
+        manifest, {manifest_key(file_path) for file_path in to_parse}
+    )
+    if near_duplicates is not None:
+        # Of near-duplicates new in this run, the copy in the first file by key is indexed
+        to_parse.sort(key=manifest_key)
+
+    stages = [
+        threading.Thread(target=embed_stage, name="ingest-embed", daemon=True),
+        threading.Thread(target=upsert_stage, name="ingest-upsert", daemon=True),
+    ]
+    for stage in stages:
+        stage.start()
+    try:
+        parsing: dict[Path, _ParsedFile] = {}
+        parse_results = _parse_files(to_parse, ordered=near_duplicates is not None)
+        for file_path, parsed_or_error in parse_results:
+            parsed = parsing.get(file_path)
+            if parsed is None:
+                key = manifest_key(file_path)
+                parsed = parsing[file_path] = _ParsedFile(
+                    file_path, key, indexed=manifest.points(key)
+                )
+
+            if parsed_or_error is None:
+                # All parts parsed: points the file no longer has are deleted with its last part
+                del parsing[file_path]
+                part = _ParsedPart(parsed, last=True)
+                if parsed.key not in failed_keys:
+                    parse_stats.items += 1
+                    if not parsed.points:
+                        tqdm.write(f"        [Warning] {file_path.name}: No content found")
+                    parsed.stale_ids = [
+                        point_id for point_id in parsed.indexed if point_id not in parsed.points
+                    ]
+            elif isinstance(parsed_or_error, Exception):
+                tqdm.write(f"        [Error] {file_path.name}: {parsed_or_error}")
+                with result_lock:
+                    failed_keys.add(parsed.key)
+                continue
+            elif parsed.key in failed_keys:
+                continue
+            else:
+                chunks_to_add, metadatas_to_add, fingerprints, seconds = parsed_or_error
+                parse_stats.chunks += len(chunks_to_add)
+                parse_stats.busy += seconds
+                part = _ParsedPart(parsed)
+                skipped = 0
+                for chunk, metadata, fingerprint in zip(
+                    chunks_to_add, metadatas_to_add, fingerprints or [None] * len(chunks_to_add)
+                ):
+                    point_id = chunk_point_id(parsed.key, chunk)
+                    if point_id in parsed.points:
+                        # Repeated chunk text within a file is indexed once
+                        continue
+                    if near_duplicates is not None:
+                        kept = near_duplicates.find(fingerprint)
+                        if kept is not None:
+                            parsed.duplicates[point_id] = kept
+                            skipped += 1
+                            continue
+                        near_duplicates.add(fingerprint)
+                        parsed.fingerprints[point_id] = fingerprint
+                    parsed.points[point_id] = payload_hash(chunk, metadata)
+                    if parsed.indexed.get(point_id) != parsed.points[point_id]:
+                        part.ids.append(point_id)
+                        part.chunks.append(chunk)
+                        part.metadatas.append(metadata)
+                del chunks_to_add, metadatas_to_add, fingerprints, parsed_or_error
+                with result_lock:
+                    result.near_duplicates += skipped
+
+            start = time.perf_counter()
+            budget.acquire(sum(_chunk_bytes(chunk) for chunk in part.chunks))
+            parse_stats.blocked += time.perf_counter() - start
+            with result_lock:
+                pbar.total += len(part.chunks)
+                pbar.refresh()
+            parse_stats.put(embed_queue, part)
+    finally:
+        embed_queue.put(_STAGE_DONE)
+        for stage in stages:
+            stage.join()
+        pbar.close()
+
+    result.failed_files += len(failed_keys)
+    if to_parse:
+        for stats in (parse_stats, embed_stats, upsert_stats):
+            log_stats(stats.summary())
+        log_stats(
+            f"Ingest memory: peak {budget.peak / 2**20:.0f} MB of chunks in flight "
+            f"(limit {settings.ingest_memory_limit_mb} MB)"
+        )
+
+    if reparse is None and near_duplicates is not None:
+        orphaned = _orphaned_duplicate_files(manifest)
+        if orphaned:
+            log_pipeline(f"Re-indexing {len(orphaned)} files whose near-duplicates lost their copy")
+            rerun = _process_and_index_documents(
+                [_manifest_file_path(key) for key in orphaned],
+                vector_store,
+                manifest,
+                desc="Re-indexing Files",
+                reparse=set(orphaned),
+            )
+            result.reindexed_files += rerun.indexed_files
+            result.upserted_chunks += rerun.upserted_chunks
+            result.deleted_points += rerun.deleted_points
+            result.failed_files += rerun.failed_files
+    return result
+
+
+def _manifest_file_path(key: str) -> Path:
+    return Path(key) if Path(key).is_absolute() else DATA_DIR / key
+
+
+def _near_duplicate_index(
+    manifest: IngestManifest, reparsed: set[str]
+) -> "NearDuplicateIndex | None":
+    """Fingerprints of the chunks that stay indexed: files not being re-parsed and still on disk."""
+    if not settings.near_duplicate_filter_enabled:
+        return None
+    from src.utils.near_duplicates import NearDuplicateIndex
+
+    index = NearDuplicateIndex(settings.near_duplicate_max_distance)
+    for key in manifest.files:
+        if key in reparsed or not _manifest_file_path(key).exists():
+            continue
+        for fingerprint in manifest.fingerprints(key).values():
+            index.add(fingerprint)
+    return index
+
+
+def _orphaned_duplicate_files(manifest: IngestManifest) -> list[str]:
+    """Files on disk with chunks skipped as near-duplicates of a chunk that is no longer indexed."""
+    indexed = set()
+    for key in manifest.files:
+        indexed.update(manifest.fingerprints(key).values())
+    return sorted(
+        key
+        for key in manifest.files
+        if _manifest_file_path(key).exists()
+        and any(fingerprint not in indexed for fingerprint in manifest.duplicates(key).values())
+    )
 
-    return total_chunks, total_docs, failed_files
+
+def _remove_missing_files(
+    vector_store: "QdrantVectorStore",
+    manifest: IngestManifest,
+    base_dir: Path,
+    files: list[Path],
+    result: IngestResult,
+) -> None:
+    """Delete the points of manifest files under base_dir that no longer exist."""
+    present = {manifest_key(file_path) for file_path in files}
+    base_dir = base_dir.resolve()
+    for key in list(manifest.files):
+        path = _manifest_file_path(key)
+        if key in present or not path.resolve().is_relative_to(base_dir):
+            continue
+        stale = list(manifest.points(key))
+        _delete_points(vector_store, stale)
+        manifest.remove(key)
+        log_pipeline(f"Removed {key}: {len(stale)} points deleted")
+        result.removed_files += 1
+        result.deleted_points += len(stale)
+    manifest.save()
+
+
+def _open_collection(
+    collection_name: str,
+    manifest: IngestManifest,
+    rebuild: bool,
+) -> "QdrantVectorStore":
+    """Open (or create) a collection for ingestion, emptying it and the manifest if `rebuild`."""
+    from langchain_qdrant import QdrantVectorStore
+    from langchain_qdrant.qdrant import QdrantVectorStoreError
+
+    embeddings = get_embeddings()
+    client = get_qdrant_client()
+
+    sample_embedding = embeddings.embed_query("test")
+    if _initialize_collection(
+        client, collection_name, len(sample_embedding), force_recreate=rebuild
+    ):
+        manifest.reset()
+
+    try:
+        return QdrantVectorStore(
+            client=client,
+            collection_name=collection_name,
+            embedding=embeddings,
+        )
+    except QdrantVectorStoreError as e:
+        # Handle dimension mismatch or other config issues by recreating the collection
+        log_pipeline(
+            f"Existing collection incompatible ({e}). Recreating collection '{collection_name}'."
+        )
+        _initialize_collection(client, collection_name, len(sample_embedding), force_recreate=True)
+        manifest.reset()
+        return QdrantVectorStore(
+            client=client,
+            collection_name=collection_name,
+            embedding=embeddings,
+        )
+
+
+def _load_manifest(collection_name: str) -> IngestManifest:
+    return IngestManifest(manifest_path(collection_name), index_signature(get_embedding_model_id()))
+
+
+def _restore_index_snapshot(collection_name: str, signature: dict) -> bool:
+    """Replace the local index with the prebuilt snapshot if it matches the current settings."""
+    snapshot_dir = settings.index_snapshot_path_resolved
+    meta = read_snapshot(snapshot_dir)
+    if meta is None:
+        return False
+    reason = snapshot_mismatch(meta, collection_name, signature)
+    if reason:
+        log_pipeline(f"Index snapshot at {snapshot_dir} not used: {reason}")
+        return False
+    start = time.perf_counter()
+    try:
+        verify_snapshot(snapshot_dir, meta)
+    except ValueError as e:
+        log_pipeline(f"Index snapshot at {snapshot_dir} is corrupt ({e}); ingesting from scratch")
+        return False
+
+    close_qdrant_client()
+    restore_snapshot(snapshot_dir, settings.vector_db_path_resolved, manifest_path(collection_name))
+    log_pipeline(
+        f"Restored index snapshot from {snapshot_dir}: {meta['points']} points, "
+        f"built {meta['created_at']} ({time.perf_counter() - start:.1f}s)"
+    )
+    return True
 
 
 def _extract_chunks_from_file(
     file_path: Path,
-    splitter: RecursiveCharacterTextSplitter,
+    splitter: "RecursiveCharacterTextSplitter",
 ) -> tuple[list[str], list[dict]]:
     """Extract chunks and metadata from a single file.
 
@@ -250,7 +1014,7 @@ def _extract_chunks_from_file(
     Returns:
         Tuple of (chunks, metadatas)
     """
-    if file_path.suffix.lower() == ".json":
+    if file_path.suffix.lower() in CRAWLED_EXTENSIONS:
         return _process_crawled_json(file_path)
 
     text, metadata = load_document(file_path)
@@ -271,10 +1035,16 @@ def _extract_chunks_from_file(
 def ingest_all_data(
     base_dir: Path | None = None,
     force: bool = False,
-) -> QdrantVectorStore:
+) -> "QdrantVectorStore":
     """Ingest all data from crawled JSON and documents into Qdrant.
 
-    Recursively scans base_dir for JSON, PDF, DOCX, and TXT files.
+    Recursively scans base_dir for JSON, PDF, DOCX, and TXT files and brings the
+    collection up to date with them: new and changed files are indexed, unchanged files
+    are skipped and points of files removed from base_dir are deleted. If the collection
+    is missing or has no matching manifest (e.g. it was built before incremental
+    ingestion, or with another embedding model or chunking), the prebuilt snapshot at
+    INDEX_SNAPSHOT_PATH is restored when it matches the settings; otherwise the collection
+    is rebuilt from scratch, as it is when `force` is set.
 
     Args:
         base_dir: Directory to scan (default: DATA_DIR)
@@ -286,58 +1056,49 @@ def ingest_all_data(
     global _vector_store
 
     base_dir = base_dir or DATA_DIR
-    embeddings = get_embeddings()
     client = get_qdrant_client()
     collection_name = settings.qdrant_collection
+    manifest = _load_manifest(collection_name)
 
     collection_exists = client.collection_exists(collection_name)
-
-    if collection_exists and not force:
-        log_pipeline(f"Loading existing vector store: {settings.vector_db_path_resolved}")
-        try:
-            _vector_store = QdrantVectorStore(
-                client=client,
-                collection_name=collection_name,
-                embedding=embeddings,
-            )
-            return _vector_store
-        except QdrantVectorStoreError as e:
-            # Handle dimension mismatch or other config issues by recreating the collection
-            log_pipeline(f"Existing collection incompatible ({e}). Recreating collection '{collection_name}'.")
-            sample_embedding = embeddings.embed_query("test")
-            _initialize_collection(client, collection_name, len(sample_embedding), force_recreate=True)
-            _vector_store = QdrantVectorStore(
-                client=client,
-                collection_name=collection_name,
-                embedding=embeddings,
-            )
-            return _vector_store
+    if not force and not (collection_exists and manifest.matches_index):
+        if _restore_index_snapshot(collection_name, manifest.signature):
+            client = get_qdrant_client()
+            manifest = _load_manifest(collection_name)
+            collection_exists = client.collection_exists(collection_name)
 
     if force and collection_exists:
         log_pipeline(f"Force re-ingesting: deleting collection '{collection_name}'")
+    elif collection_exists and not manifest.matches_index:
+        log_pipeline(
+            f"No matching ingestion manifest for '{collection_name}'; rebuilding the collection"
+        )
+    elif collection_exists:
+        log_pipeline(f"Updating existing vector store: {settings.vector_db_path_resolved}")
+    rebuild = force or not collection_exists or not manifest.matches_index
 
-    files = _scan_data_files(base_dir)
-    sample_embedding = embeddings.embed_query("test")
-    _initialize_collection(client, collection_name, len(sample_embedding), force_recreate=force)
-
-    _vector_store = QdrantVectorStore(
-        client=client,
-        collection_name=collection_name,
-        embedding=embeddings,
-    )
+    _vector_store = _open_collection(collection_name, manifest, rebuild=rebuild)
 
-    if not files:
+    files = _scan_data_files(base_dir)
+    if not files and not manifest.files:
         log_pipeline(f"No supported files found in {base_dir}")
         return _vector_store
 
-    log_pipeline(f"Found {len(files)} files to ingest from {base_dir}")
+    log_pipeline(f"Found {len(files)} files in {base_dir}")
 
-    total_chunks, total_docs, failed_files = _process_and_index_documents(files, _vector_store)
+    # Removed files go first, so their chunks are not kept as near-duplicates' indexed copies
+    removed = IngestResult()
+    _remove_missing_files(_vector_store, manifest, base_dir, files, removed)
+    result = _process_and_index_documents(files, _vector_store, manifest)
+    result.removed_files = removed.removed_files
+    result.deleted_points += removed.deleted_points
 
-    log_pipeline(f"Ingestion complete: {total_docs} files, {total_chunks} chunks")
-    if failed_files > 0:
-        log_pipeline(f"Failed files: {failed_files}")
+    log_pipeline(f"Ingestion complete: {result.summary()}")
+    if result.failed_files > 0:
+        log_pipeline(f"Failed files: {result.failed_files}")
     log_pipeline(f"Collection: '{collection_name}'")
+    if result.upserted_chunks:
+        log_embedding_stats()
 
     return _vector_store
 
@@ -352,39 +1113,31 @@ def ingest_files(
     Args:
         file_paths: List of file paths to ingest
         collection_name: Optional collection name (default from settings)
-        append: If True, append to existing collection; otherwise recreate
+        append: If True, update the existing collection incrementally (unchanged files
+            are skipped, changed files replace their previous chunks); otherwise recreate
 
     Returns:
-        Number of chunks ingested
+        Number of chunks of the new or changed files
     """
     collection_name = collection_name or settings.qdrant_collection
-    embeddings = get_embeddings()
+    manifest = _load_manifest(collection_name)
     client = get_qdrant_client()
-
-    sample_embedding = embeddings.embed_query("test")
-    _initialize_collection(client, collection_name, len(sample_embedding), force_recreate=not append)
-
-    try:
-        vector_store = QdrantVectorStore(
-            client=client,
-            collection_name=collection_name,
-            embedding=embeddings,
-        )
-    except QdrantVectorStoreError as e:
-        # If existing collection is incompatible (e.g., dimension mismatch), recreate it
-        log_pipeline(f"Existing collection incompatible ({e}). Recreating collection '{collection_name}'.")
-        _initialize_collection(client, collection_name, len(sample_embedding), force_recreate=True)
-        vector_store = QdrantVectorStore(
-            client=client,
-            collection_name=collection_name,
-            embedding=embeddings,
+    collection_exists = client.collection_exists(collection_name)
+    if append and collection_exists and not manifest.matches_index:
+        log_pipeline(
+            f"No matching ingestion manifest for '{collection_name}'; rebuilding the collection"
         )
+    rebuild = not append or not collection_exists or not manifest.matches_index
 
-    total_chunks, _, _ = _process_and_index_documents(
+    vector_store = _open_collection(collection_name, manifest, rebuild=rebuild)
+    result = _process_and_index_documents(
         file_paths,
         vector_store,
+        manifest,
         desc="Ingesting Files",
     )
 
-    log_pipeline(f"Total: {total_chunks} chunks in '{collection_name}'")
-    return total_chunks
+    log_pipeline(f"Total: {result.summary()} in '{collection_name}'")
+    if result.upserted_chunks:
+        log_embedding_stats()
+    return result.chunks
@@ -1,20 +1,91 @@
 """LLM utility functions for hybrid model selection (Local HuggingFace vs VNPT API)."""
 
+import json
+import sys
+from collections.abc import AsyncIterator, Iterator
 from typing import Any
 
 import httpx
-import torch
 from langchain_core.language_models.chat_models import BaseChatModel
-from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
-from langchain_core.outputs import ChatGeneration, ChatResult
-from langchain_huggingface import ChatHuggingFace, HuggingFacePipeline
+from langchain_core.messages import (
+    AIMessage,
+    AIMessageChunk,
+    BaseMessage,
+    HumanMessage,
+    SystemMessage,
+)
+from langchain_core.messages.ai import UsageMetadata
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
 
 from src.config import settings
+from src.utils.hedging import hedged_apost_json, hedged_astream_post_json
+from src.utils.http import (
+    apost_json,
+    astream_post_json,
+    post_json,
+    stream_post_json,
+    warmup_clients,
+)
+from src.utils.llm_cache import CachedChatModel, get_llm_cache
 from src.utils.logging import log_pipeline
+from src.utils.provider_router import ProviderRouterChatModel
+from src.utils.streaming import stop_requested
+from src.utils.token_usage import usage_metadata
 
 _model_cache: dict[str, BaseChatModel] = {}
 
 
+def _is_event_stream(response: httpx.Response) -> bool:
+    return "text/event-stream" in response.headers.get("content-type", "")
+
+
+def _parse_sse_line(line: str) -> dict | None:
+    """Decode one server-sent-events line; None for blanks, comments and `[DONE]`."""
+    if not line.startswith("data:"):
+        return None
+    data = line[5:].strip()
+    if not data or data == "[DONE]":
+        return None
+    return json.loads(data)
+
+
+def _parse_usage(usage: dict) -> UsageMetadata | None:
+    """Convert an OpenAI-style `usage` object into LangChain's standard usage metadata."""
+    if not usage or "prompt_tokens" not in usage:
+        return None
+    return usage_metadata(usage.get("prompt_tokens") or 0, usage.get("completion_tokens") or 0)
+
+
+def _build_stream_chunk(
+    content: str, finish_reason: str | None, usage: dict
+) -> ChatGenerationChunk:
+    generation_info = {}
+    if finish_reason:
+        generation_info["finish_reason"] = finish_reason
+    if usage:
+        generation_info["usage"] = usage
+    return ChatGenerationChunk(
+        message=AIMessageChunk(content=content, usage_metadata=_parse_usage(usage)),
+        generation_info=generation_info or None,
+    )
+
+
+def _parse_stream_event(event: dict) -> ChatGenerationChunk | None:
+    """Turn an OpenAI-style `chat.completion.chunk` event into a generation chunk."""
+    usage = event.get("usage") or {}
+    choices = event.get("choices") or []
+    if not choices:
+        return _build_stream_chunk("", None, usage) if usage else None
+
+    choice = choices[0]
+    delta = choice.get("delta") or choice.get("message") or {}
+    content = delta.get("content") or choice.get("text") or ""
+    finish_reason = choice.get("finish_reason")
+    if not content and not finish_reason and not usage:
+        return None
+    return _build_stream_chunk(content, finish_reason, usage)
+
+
 class VNPTChatModel(BaseChatModel):
     """LangChain-compatible wrapper for VNPT API."""
 
@@ -26,6 +97,7 @@ class VNPTChatModel(BaseChatModel):
     timeout: float = 60.0
     max_tokens: int = 1024
     temperature: float = 0.0
+    hedging: bool = False
 
     @property
     def _llm_type(self) -> str:
@@ -84,6 +156,15 @@ class VNPTChatModel(BaseChatModel):
             payload["stop"] = stop
         return payload
 
+    def _read_response_data(self, response: httpx.Response) -> dict:
+        """Decode JSON body, keeping error payloads so safety refusals can be detected."""
+        if response.status_code >= 400:
+            try:
+                return response.json()
+            except Exception:
+                response.raise_for_status()
+        return response.json()
+
     def _handle_api_response(self, data: dict) -> tuple[str, str | None, dict]:
         """Process API response data and handle safety refusals gracefully.
 
@@ -132,7 +213,7 @@ class VNPTChatModel(BaseChatModel):
     def _build_chat_result(self, content: str, finish_reason: str | None, usage: dict) -> ChatResult:
         """Build ChatResult from parsed response data."""
         generation = ChatGeneration(
-            message=AIMessage(content=content),
+            message=AIMessage(content=content, usage_metadata=_parse_usage(usage)),
             generation_info={"finish_reason": finish_reason, "usage": usage},
         )
         return ChatResult(
@@ -151,19 +232,8 @@ class VNPTChatModel(BaseChatModel):
         payload = self._create_payload(messages, stop, **kwargs)
 
         try:
-            with httpx.Client(timeout=self.timeout) as client:
-                response = client.post(
-                    self.endpoint,
-                    headers=self._get_headers(),
-                    json=payload,
-                )
-                if response.status_code >= 400:
-                    try:
-                        data = response.json()
-                    except Exception:
-                        response.raise_for_status()
-                else:
-                    data = response.json()
+            response = post_json(self.endpoint, self._get_headers(), payload, self.timeout)
+            data = self._read_response_data(response)
 
             content, finish_reason, usage = self._handle_api_response(data)
             return self._build_chat_result(content, finish_reason, usage)
@@ -186,19 +256,9 @@ class VNPTChatModel(BaseChatModel):
         payload = self._create_payload(messages, stop, **kwargs)
 
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.post(
-                    self.endpoint,
-                    headers=self._get_headers(),
-                    json=payload,
-                )
-                if response.status_code >= 400:
-                    try:
-                        data = response.json()
-                    except Exception:
-                        response.raise_for_status()
-                else:
-                    data = response.json()
+            post = hedged_apost_json if self.hedging else apost_json
+            response = await post(self.endpoint, self._get_headers(), payload, self.timeout)
+            data = self._read_response_data(response)
 
             content, finish_reason, usage = self._handle_api_response(data)
             return self._build_chat_result(content, finish_reason, usage)
@@ -210,6 +270,93 @@ class VNPTChatModel(BaseChatModel):
                 raise
             raise RuntimeError(f"VNPT API processing failed: {e}") from e
 
+    def _chunk_from_event(self, event: dict) -> ChatGenerationChunk | None:
+        if "error" in event:
+            return _build_stream_chunk(*self._handle_api_response(event))
+        return _parse_stream_event(event)
+
+    def _stream(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        """Stream response tokens from VNPT API (sync).
+
+        Closing the iterator early, or `stop_requested()` after a chunk, closes the
+        connection, so generation stops as soon as the caller has what it needs. Falls
+        back to a single chunk when the endpoint answers with a plain JSON body.
+        """
+        payload = {**self._create_payload(messages, stop, **kwargs), "stream": True}
+
+        try:
+            with stream_post_json(
+                self.endpoint, self._get_headers(), payload, self.timeout
+            ) as response:
+                if not _is_event_stream(response):
+                    response.read()
+                    data = self._read_response_data(response)
+                    yield _build_stream_chunk(*self._handle_api_response(data))
+                    return
+
+                for line in response.iter_lines():
+                    event = _parse_sse_line(line)
+                    chunk = self._chunk_from_event(event) if event is not None else None
+                    if chunk is None:
+                        continue
+                    if run_manager:
+                        run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+                    yield chunk
+                    if stop_requested():
+                        return
+
+        except httpx.RequestError as e:
+            raise RuntimeError(f"VNPT API request failed: {e}") from e
+        except Exception as e:
+            if isinstance(e, RuntimeError):
+                raise
+            raise RuntimeError(f"VNPT API processing failed: {e}") from e
+
+    async def _astream(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        """Stream response tokens from VNPT API (async, see `_stream`)."""
+        payload = {**self._create_payload(messages, stop, **kwargs), "stream": True}
+
+        try:
+            open_stream = hedged_astream_post_json if self.hedging else astream_post_json
+            async with open_stream(
+                self.endpoint, self._get_headers(), payload, self.timeout
+            ) as response:
+                if not _is_event_stream(response):
+                    await response.aread()
+                    data = self._read_response_data(response)
+                    yield _build_stream_chunk(*self._handle_api_response(data))
+                    return
+
+                async for line in response.aiter_lines():
+                    event = _parse_sse_line(line)
+                    chunk = self._chunk_from_event(event) if event is not None else None
+                    if chunk is None:
+                        continue
+                    if run_manager:
+                        await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+                    yield chunk
+                    if stop_requested():
+                        return
+
+        except httpx.RequestError as e:
+            raise RuntimeError(f"VNPT API request failed: {e}") from e
+        except Exception as e:
+            if isinstance(e, RuntimeError):
+                raise
+            raise RuntimeError(f"VNPT API processing failed: {e}") from e
+
 
 class OpenRouterChatModel(BaseChatModel):
     """LangChain-compatible wrapper for OpenRouter API."""
@@ -222,6 +369,7 @@ class OpenRouterChatModel(BaseChatModel):
     timeout: float = 60.0
     max_tokens: int = 1024
     temperature: float = 0.0
+    hedging: bool = False
 
     @property
     def _llm_type(self) -> str:
@@ -293,7 +441,7 @@ class OpenRouterChatModel(BaseChatModel):
 
     def _build_chat_result(self, content: str, finish_reason: str | None, usage: dict) -> ChatResult:
         generation = ChatGeneration(
-            message=AIMessage(content=content),
+            message=AIMessage(content=content, usage_metadata=_parse_usage(usage)),
             generation_info={"finish_reason": finish_reason, "usage": usage},
         )
         return ChatResult(
@@ -311,13 +459,8 @@ class OpenRouterChatModel(BaseChatModel):
         payload = self._create_payload(messages, stop, **kwargs)
 
         try:
-            with httpx.Client(timeout=self.timeout) as client:
-                response = client.post(
-                    self.endpoint,
-                    headers=self._get_headers(),
-                    json=payload,
-                )
-                data = response.json()
+            response = post_json(self.endpoint, self._get_headers(), payload, self.timeout)
+            data = response.json()
 
             content, finish_reason, usage = self._handle_api_response(data)
             return self._build_chat_result(content, finish_reason, usage)
@@ -335,13 +478,9 @@ class OpenRouterChatModel(BaseChatModel):
         payload = self._create_payload(messages, stop, **kwargs)
 
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.post(
-                    self.endpoint,
-                    headers=self._get_headers(),
-                    json=payload,
-                )
-                data = response.json()
+            post = hedged_apost_json if self.hedging else apost_json
+            response = await post(self.endpoint, self._get_headers(), payload, self.timeout)
+            data = response.json()
 
             content, finish_reason, usage = self._handle_api_response(data)
             return self._build_chat_result(content, finish_reason, usage)
@@ -349,28 +488,94 @@ class OpenRouterChatModel(BaseChatModel):
         except httpx.RequestError as e:
             raise RuntimeError(f"OpenRouter API request failed: {e}") from e
 
+    def _chunk_from_event(self, event: dict) -> ChatGenerationChunk | None:
+        if "error" in event:
+            self._handle_api_response(event)
+        return _parse_stream_event(event)
+
+    def _stream(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        payload = {
+            **self._create_payload(messages, stop, **kwargs),
+            "stream": True,
+            "stream_options": {"include_usage": True},
+        }
+
+        try:
+            with stream_post_json(
+                self.endpoint, self._get_headers(), payload, self.timeout
+            ) as response:
+                if not _is_event_stream(response):
+                    response.read()
+                    yield _build_stream_chunk(*self._handle_api_response(response.json()))
+                    return
+
+                for line in response.iter_lines():
+                    event = _parse_sse_line(line)
+                    chunk = self._chunk_from_event(event) if event is not None else None
+                    if chunk is None:
+                        continue
+                    if run_manager:
+                        run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+                    yield chunk
+                    if stop_requested():
+                        return
+
+        except httpx.RequestError as e:
+            raise RuntimeError(f"OpenRouter API request failed: {e}") from e
+
+    async def _astream(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        payload = {
+            **self._create_payload(messages, stop, **kwargs),
+            "stream": True,
+            "stream_options": {"include_usage": True},
+        }
+
+        try:
+            open_stream = hedged_astream_post_json if self.hedging else astream_post_json
+            async with open_stream(
+                self.endpoint, self._get_headers(), payload, self.timeout
+            ) as response:
+                if not _is_event_stream(response):
+                    await response.aread()
+                    yield _build_stream_chunk(*self._handle_api_response(response.json()))
+                    return
+
+                async for line in response.aiter_lines():
+                    event = _parse_sse_line(line)
+                    chunk = self._chunk_from_event(event) if event is not None else None
+                    if chunk is None:
+                        continue
+                    if run_manager:
+                        await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+                    yield chunk
+                    if stop_requested():
+                        return
+
+        except httpx.RequestError as e:
+            raise RuntimeError(f"OpenRouter API request failed: {e}") from e
+
 
-def _load_huggingface_model(model_path: str, model_type: str) -> ChatHuggingFace:
+def _load_huggingface_model(model_path: str, model_type: str) -> BaseChatModel:
     """Load a local HuggingFace model with caching."""
     if model_path in _model_cache:
         return _model_cache[model_path]
 
-    llm_pipeline = HuggingFacePipeline.from_model_id(
-        model_id=model_path,
-        task="text-generation",
-        pipeline_kwargs={
-            "max_new_tokens": 1024,
-            "do_sample": False,
-            "return_full_text": False,
-        },
-        model_kwargs={
-            "trust_remote_code": True,
-            "device_map": "auto",
-            "torch_dtype": torch.float32,
-        },
-    )
+    # Imported here so API-only runs never pay for torch/transformers at startup
+    from src.utils.local_llm import load_local_chat_model
 
-    llm = ChatHuggingFace(llm=llm_pipeline)
+    llm = load_local_chat_model(model_path)
     _model_cache[model_path] = llm
     log_pipeline(f"[Model] {model_type} loaded from {model_path}")
     return llm
@@ -398,6 +603,7 @@ def _get_openrouter_model(model_type: str) -> OpenRouterChatModel:
         api_key=api_key,
         site_url=settings.openrouter_site_url or None,
         app_name=settings.openrouter_app_name or None,
+        hedging=settings.hedge_large_model and model_type == "large",
     )
 
     _model_cache[cache_key] = model
@@ -435,6 +641,7 @@ def _get_vnpt_model(model_type: str) -> VNPTChatModel:
         authorization=authorization,
         token_id=token_id,
         token_key=token_key,
+        hedging=settings.hedge_large_model and model_type == "large",
     )
 
     _model_cache[cache_key] = model
@@ -442,19 +649,81 @@ def _get_vnpt_model(model_type: str) -> VNPTChatModel:
     return model
 
 
-def get_small_model() -> BaseChatModel:
-    """Get or create small LLM (VNPT API or local HuggingFace)."""
+def _with_response_cache(model: BaseChatModel) -> BaseChatModel:
+    """Wrap model with the on-disk response cache when LLM_CACHE_ENABLED."""
+    if not settings.llm_cache_enabled:
+        return model
+
+    cache_key = f"cached_{id(model)}"
+    if cache_key not in _model_cache:
+        _model_cache[cache_key] = CachedChatModel(model=model, response_cache=get_llm_cache())
+    return _model_cache[cache_key]
+
+
+def _get_provider_model(provider: str, model_type: str) -> BaseChatModel:
+    """Get the backend of one provider for a model size ("small" or "large")."""
+    if provider == "vnpt":
+        return _get_vnpt_model(model_type)
+    if provider == "openrouter":
+        return _get_openrouter_model(model_type)
+    if provider == "local":
+        model_path = settings.llm_model_small if model_type == "small" else settings.llm_model_large
+        return _load_huggingface_model(model_path, model_type.capitalize())
+    raise ValueError(f"Unknown provider in LLM_PROVIDERS: {provider}")
+
+
+def _get_chat_model(model_type: str) -> BaseChatModel:
+    """Resolve the chat backend for a model size from LLM_PROVIDERS or the USE_* flags."""
+    providers = settings.llm_provider_list
+    if len(providers) > 1:
+        cache_key = f"router_{model_type}"
+        if cache_key not in _model_cache:
+            _model_cache[cache_key] = ProviderRouterChatModel(
+                backends={p: _get_provider_model(p, model_type) for p in providers},
+                model_type=model_type,
+            )
+            log_pipeline(f"[Model] {model_type} routed across: {', '.join(providers)}")
+        return _model_cache[cache_key]
+    if providers:
+        return _get_provider_model(providers[0], model_type)
     if settings.use_openrouter_api:
-        return _get_openrouter_model("small")
+        return _get_provider_model("openrouter", model_type)
     if settings.use_vnpt_api:
-        return _get_vnpt_model("small")
-    return _load_huggingface_model(settings.llm_model_small, "Small")
+        return _get_provider_model("vnpt", model_type)
+    return _get_provider_model("local", model_type)
+
+
+def get_small_model() -> BaseChatModel:
+    """Get or create small LLM (VNPT API, OpenRouter, local HuggingFace or a router over them)."""
+    return _with_response_cache(_get_chat_model("small"))
 
 
 def get_large_model() -> BaseChatModel:
-    """Get or create large LLM (VNPT API or local HuggingFace)."""
-    if settings.use_openrouter_api:
-        return _get_openrouter_model("large")
+    """Get or create large LLM (VNPT API, OpenRouter, local HuggingFace or a router over them)."""
+    return _with_response_cache(_get_chat_model("large"))
+
+
+def _model_endpoints(model: BaseChatModel) -> list[str]:
+    if isinstance(model, CachedChatModel):
+        model = model.model
+    if isinstance(model, ProviderRouterChatModel):
+        return model.endpoints
+    return [getattr(model, "endpoint", "")]
+
+
+async def warmup_models() -> None:
+    """Load small and large models and pre-open pooled connections to their API endpoints."""
+    models = [get_small_model(), get_large_model()]
+    endpoints = [endpoint for model in models for endpoint in _model_endpoints(model)]
     if settings.use_vnpt_api:
-        return _get_vnpt_model("large")
-    return _load_huggingface_model(settings.llm_model_large, "Large")
+        endpoints.append(settings.vnpt_embedding_endpoint)
+    await warmup_clients(endpoints)
+
+
+def get_local_batching_stats() -> list[str]:
+    """Batching engine summaries; empty (and torch left unimported) when no local model ran."""
+    if "src.utils.local_batching" not in sys.modules:
+        return []
+    from src.utils.local_batching import get_batching_stats
+
+    return get_batching_stats()
@@ -0,0 +1,403 @@
+"""Persistent, content-addressed on-disk cache for chat model responses."""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections.abc import AsyncIterator, Iterator
+from contextlib import aclosing, closing
+from pathlib import Path
+from typing import Any
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import ConfigDict
+
+from src.config import settings
+from src.utils.logging import log_stats
+from src.utils.streaming import stop_requested
+
+_EVICT_EVERY_WRITES = 200
+
+_llm_cache: "LLMResponseCache | None" = None
+
+
+class LLMResponseCache:
+    """SQLite-backed response store with age and size based eviction.
+
+    Entries are keyed by a SHA-256 digest of the request and evicted oldest-access
+    first once `max_entries` or `max_bytes` is exceeded. Expired entries (older than
+    `max_age_seconds`) are treated as misses and purged on the next eviction pass.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        max_entries: int = 100_000,
+        max_bytes: int = 512 * 1024 * 1024,
+        max_age_seconds: float | None = None,
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_accessed ON responses(accessed_at)")
+        self._conn.commit()
+        self.evict()
+
+    @staticmethod
+    def make_key(
+        provider: str,
+        model_name: str,
+        messages: list[dict[str, Any]],
+        max_tokens: int | None,
+        temperature: float | None,
+        stop: list[str] | None,
+    ) -> str:
+        """Build a content-addressed key from everything that determines the response."""
+        request = {
+            "provider": provider,
+            "model": model_name,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "stop": stop or [],
+        }
+        encoded = json.dumps(request, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+    def get(self, key: str, accept_partial: bool = True) -> dict | None:
+        """Return the cached value for key, or None on miss/expiry.
+
+        With `accept_partial=False` an early-stopped (partial) response counts as a miss.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or self._is_expired(row[1], now):
+                self.misses += 1
+                return None
+            value = json.loads(row[0])
+            if value.get("partial") and not accept_partial:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+        return value
+
+    def set(self, key: str, value: dict) -> None:
+        """Store a JSON-serializable value under key."""
+        encoded = json.dumps(value, ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, created_at, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (key, encoded, len(encoded.encode("utf-8")), now, now),
+            )
+            self._conn.commit()
+            self.writes += 1
+            should_evict = self.writes % _EVICT_EVERY_WRITES == 0
+        if should_evict:
+            self.evict()
+
+    def evict(self) -> int:
+        """Drop expired entries, then least-recently-used ones beyond the size limits.
+
+        Returns:
+            Number of entries removed
+        """
+        removed = 0
+        with self._lock:
+            if self.max_age_seconds:
+                cursor = self._conn.execute(
+                    "DELETE FROM responses WHERE created_at < ?",
+                    (time.time() - self.max_age_seconds,),
+                )
+                removed += cursor.rowcount
+
+            count, total_bytes = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+            if count > self.max_entries or total_bytes > self.max_bytes:
+                to_remove = max(count - self.max_entries, 0)
+                excess_bytes = total_bytes - self.max_bytes
+                if excess_bytes > 0:
+                    # Walk LRU order until enough bytes are reclaimed
+                    freed = 0
+                    for i, (size,) in enumerate(
+                        self._conn.execute("SELECT size FROM responses ORDER BY accessed_at")
+                    ):
+                        freed += size
+                        if freed >= excess_bytes:
+                            to_remove = max(to_remove, i + 1)
+                            break
+                cursor = self._conn.execute(
+                    "DELETE FROM responses WHERE key IN"
+                    " (SELECT key FROM responses ORDER BY accessed_at LIMIT ?)",
+                    (to_remove,),
+                )
+                removed += cursor.rowcount
+            self._conn.commit()
+            self.evictions += removed
+        return removed
+
+    def _is_expired(self, created_at: float, now: float) -> bool:
+        return bool(self.max_age_seconds) and created_at < now - self.max_age_seconds
+
+    def stats_summary(self) -> str:
+        """Human-readable hit/miss statistics."""
+        lookups = self.hits + self.misses
+        hit_rate = (self.hits / lookups * 100) if lookups else 0.0
+        return (
+            f"LLM cache: {self.hits} hits / {self.misses} misses ({hit_rate:.1f}% hit rate), "
+            f"{self.writes} writes, {self.evictions} evicted"
+        )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class CachedChatModel(BaseChatModel):
+    """Chat model wrapper that serves repeated requests from an `LLMResponseCache`.
+
+    Streams that the caller closes early (e.g. once the answer letter is out) are
+    stored as partial entries: they are replayed to later streaming calls but never
+    returned from `_generate`, which needs the complete response.
+    """
+
+    model: BaseChatModel
+    response_cache: LLMResponseCache
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    @property
+    def _llm_type(self) -> str:
+        return f"cached-{self.model._llm_type}"
+
+    @property
+    def _identifying_params(self) -> dict[str, Any]:
+        return self.model._identifying_params
+
+    @property
+    def model_name(self) -> str:
+        """Name of the wrapped model (reported to callbacks for usage accounting)."""
+        return str(getattr(self.model, "model_name", None) or getattr(self.model, "model_id", ""))
+
+    @property
+    def endpoint(self) -> str:
+        """Endpoint of the wrapped API model (empty for local models)."""
+        return getattr(self.model, "endpoint", "")
+
+    def _convert_messages(self, messages: list[BaseMessage]) -> list[dict[str, Any]]:
+        convert = getattr(self.model, "_convert_messages", None)
+        if convert is not None:
+            return convert(messages)
+        return [{"role": msg.type, "content": msg.content} for msg in messages]
+
+    def _cache_key(self, messages: list[BaseMessage], stop: list[str] | None, kwargs: dict) -> str:
+        return LLMResponseCache.make_key(
+            provider=self.model._llm_type,
+            model_name=self.model_name,
+            messages=self._convert_messages(messages),
+            max_tokens=kwargs.get("max_tokens", getattr(self.model, "max_tokens", None)),
+            temperature=kwargs.get("temperature", getattr(self.model, "temperature", None)),
+            stop=stop,
+        )
+
+    @staticmethod
+    def _serialize(result: ChatResult) -> dict:
+        return {
+            "generations": [
+                {"content": gen.message.content, "generation_info": gen.generation_info or {}}
+                for gen in result.generations
+            ],
+            "llm_output": result.llm_output or {},
+        }
+
+    @staticmethod
+    def _deserialize(value: dict) -> ChatResult:
+        generations = [
+            ChatGeneration(
+                message=AIMessage(content=gen["content"]),
+                generation_info={**gen["generation_info"], "cached": True},
+            )
+            for gen in value["generations"]
+        ]
+        return ChatResult(
+            generations=generations, llm_output={**value["llm_output"], "cached": True}
+        )
+
+    def _store_stream(
+        self, key: str, parts: list[str], generation_info: dict, partial: bool
+    ) -> None:
+        if not parts:
+            return
+        value = {
+            "generations": [{"content": "".join(parts), "generation_info": generation_info}],
+            "llm_output": {},
+        }
+        if partial:
+            value["partial"] = True
+        self.response_cache.set(key, value)
+
+    @staticmethod
+    def _replay_chunk(value: dict, cached: bool = True) -> ChatGenerationChunk:
+        """Emit a stored (or freshly generated) response as a single stream chunk."""
+        generation = value["generations"][0]
+        generation_info = dict(generation["generation_info"])
+        if cached:
+            generation_info["cached"] = True
+        return ChatGenerationChunk(
+            message=AIMessageChunk(content=generation["content"]),
+            generation_info=generation_info,
+        )
+
+    def _streams_natively(self) -> bool:
+        return type(self.model)._stream is not BaseChatModel._stream
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        key = self._cache_key(messages, stop, kwargs)
+        cached = self.response_cache.get(key, accept_partial=False)
+        if cached is not None:
+            return self._deserialize(cached)
+
+        result = self.model._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        self.response_cache.set(key, self._serialize(result))
+        return result
+
+    async def _agenerate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        key = self._cache_key(messages, stop, kwargs)
+        cached = self.response_cache.get(key, accept_partial=False)
+        if cached is not None:
+            return self._deserialize(cached)
+
+        result = await self.model._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        self.response_cache.set(key, self._serialize(result))
+        return result
+
+    def _stream(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        key = self._cache_key(messages, stop, kwargs)
+        cached = self.response_cache.get(key)
+        if cached is not None:
+            yield self._replay_chunk(cached)
+            return
+
+        if not self._streams_natively():
+            result = self.model._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+            self.response_cache.set(key, self._serialize(result))
+            yield self._replay_chunk(self._serialize(result), cached=False)
+            return
+
+        parts: list[str] = []
+        generation_info: dict = {}
+        stream = self.model._stream(messages, stop=stop, run_manager=run_manager, **kwargs)
+        try:
+            with closing(stream):
+                for chunk in stream:
+                    parts.append(chunk.text)
+                    generation_info.update(chunk.generation_info or {})
+                    yield chunk
+        except GeneratorExit:
+            self._store_stream(key, parts, generation_info, partial=True)
+            raise
+        # A stream ended by `stop_requested` is as partial as one closed early
+        self._store_stream(key, parts, generation_info, partial=stop_requested())
+
+    async def _astream(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        key = self._cache_key(messages, stop, kwargs)
+        cached = self.response_cache.get(key)
+        if cached is not None:
+            yield self._replay_chunk(cached)
+            return
+
+        if not self._streams_natively() and type(self.model)._astream is BaseChatModel._astream:
+            result = await self.model._agenerate(
+                messages, stop=stop, run_manager=run_manager, **kwargs
+            )
+            self.response_cache.set(key, self._serialize(result))
+            yield self._replay_chunk(self._serialize(result), cached=False)
+            return
+
+        parts: list[str] = []
+        generation_info: dict = {}
+        stream = self.model._astream(messages, stop=stop, run_manager=run_manager, **kwargs)
+        try:
+            async with aclosing(stream):
+                async for chunk in stream:
+                    parts.append(chunk.text)
+                    generation_info.update(chunk.generation_info or {})
+                    yield chunk
+        except GeneratorExit:
+            self._store_stream(key, parts, generation_info, partial=True)
+            raise
+        # A stream ended by `stop_requested` is as partial as one closed early
+        self._store_stream(key, parts, generation_info, partial=stop_requested())
+
+
+def get_llm_cache() -> LLMResponseCache:
+    """Get or create the process-wide response cache singleton."""
+    global _llm_cache
+    if _llm_cache is None:
+        max_age_days = settings.llm_cache_max_age_days
+        _llm_cache = LLMResponseCache(
+            path=settings.llm_cache_path_resolved,
+            max_entries=settings.llm_cache_max_entries,
+            max_bytes=settings.llm_cache_max_mb * 1024 * 1024,
+            max_age_seconds=max_age_days * 86400 if max_age_days > 0 else None,
+        )
+    return _llm_cache
+
+
+def log_cache_stats() -> None:
+    """Log hit/miss statistics if the cache has been used in this process."""
+    if _llm_cache is not None:
+        log_stats(_llm_cache.stats_summary())
@@ -0,0 +1,316 @@
+"""Dynamic batching for local HuggingFace chat models.
+
+Concurrent requests are queued and collected for up to LOCAL_BATCH_WINDOW_MS (or until
+LOCAL_BATCH_MAX_SIZE is reached), padded and decoded together in one `generate` call on
+a dedicated worker thread; requests whose system block is in the `PrefixKVCache` only
+prefill the rest of their prompt. Results come back through futures; streaming
+requests additionally receive text deltas as tokens are produced and can be cancelled
+individually without stopping the rest of the batch; a cancelled or completed row's
+future resolves at the next decoding step rather than when the whole batch ends.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any
+
+import torch
+from transformers import StoppingCriteria, StoppingCriteriaList
+from transformers.generation.streamers import BaseStreamer
+
+from src.utils.prefix_cache import PrefixKVCache
+
+_STREAM_END = None
+
+_engines: list["LocalBatchingEngine"] = []
+
+
+class LocalRequest:
+    """A single prompt submitted to a `LocalBatchingEngine`."""
+
+    def __init__(
+        self, prompt: str, max_new_tokens: int, stream: bool = False, prefix: str | None = None
+    ):
+        self.prompt = prompt
+        self.prefix = prefix
+        self.max_new_tokens = max_new_tokens
+        self.future: Future[str] = Future()
+        self.chunks: queue.Queue[str | None] | None = queue.Queue() if stream else None
+        self.prompt_tokens = 0
+        self.token_ids: list[int] = []
+        self.cancelled = threading.Event()
+        self.finished = False
+        self._streamed_text = ""
+
+    @property
+    def done(self) -> bool:
+        return (
+            self.finished or self.cancelled.is_set() or len(self.token_ids) >= self.max_new_tokens
+        )
+
+    def cancel(self) -> None:
+        """Stop generating for this request; the rest of its batch continues."""
+        self.cancelled.set()
+
+    def add_token(self, token_id: int, tokenizer: Any) -> None:
+        self.token_ids.append(token_id)
+        if self.chunks is None:
+            return
+        text = tokenizer.decode(self.token_ids, skip_special_tokens=True)
+        # Hold back incomplete multi-byte characters until the next token completes them
+        if text.endswith("\ufffd"):
+            return
+        delta = text[len(self._streamed_text):]
+        if delta:
+            self._streamed_text = text
+            self.chunks.put(delta)
+
+    def finish(self, tokenizer: Any) -> None:
+        if self.finished:
+            return
+        self.finished = True
+        text = tokenizer.decode(self.token_ids, skip_special_tokens=True)
+        if self.chunks is not None:
+            delta = text[len(self._streamed_text):]
+            if delta:
+                self.chunks.put(delta)
+            self.chunks.put(_STREAM_END)
+        if not self.future.done():
+            self.future.set_result(text)
+
+    def fail(self, error: BaseException) -> None:
+        self.finished = True
+        if self.chunks is not None:
+            self.chunks.put(_STREAM_END)
+        if not self.future.done():
+            self.future.set_exception(error)
+
+
+class _BatchStreamer(BaseStreamer):
+    """Routes each decoding step's tokens to the request owning that batch row."""
+
+    def __init__(self, requests: list[LocalRequest], tokenizer: Any, eos_token_ids: set[int]):
+        self.requests = requests
+        self.tokenizer = tokenizer
+        self.eos_token_ids = eos_token_ids
+        self._prompt_seen = False
+
+    def put(self, value: torch.Tensor) -> None:
+        if not self._prompt_seen:
+            # generate() first reports the (padded) prompt ids
+            self._prompt_seen = True
+            return
+        for request, token_id in zip(self.requests, value.view(-1).tolist()):
+            if request.finished:
+                continue
+            if not request.cancelled.is_set() and token_id not in self.eos_token_ids:
+                request.add_token(token_id, self.tokenizer)
+            # Resolve a row as soon as it is done instead of when the whole batch ends
+            if request.done or token_id in self.eos_token_ids:
+                request.finish(self.tokenizer)
+
+    def end(self) -> None:
+        # Rows still running at the batch token limit are finished by the engine
+        pass
+
+
+class _RequestsDone(StoppingCriteria):
+    """Per-row stop: a row ends once its request is finished, cancelled or at its token limit."""
+
+    def __init__(self, requests: list[LocalRequest]):
+        self.requests = requests
+
+    def __call__(
+        self, input_ids: torch.LongTensor, scores: torch.FloatTensor, **kwargs: Any
+    ) -> torch.BoolTensor:
+        return torch.tensor(
+            [r.done for r in self.requests], dtype=torch.bool, device=input_ids.device
+        )
+
+
+class LocalBatchingEngine:
+    """Queue in front of a local causal LM that batches concurrent generate calls."""
+
+    def __init__(
+        self,
+        model: Any,
+        tokenizer: Any,
+        generation_kwargs: dict[str, Any],
+        max_new_tokens: int,
+        max_batch_size: int,
+        window_seconds: float,
+        prefix_cache: PrefixKVCache | None = None,
+        name: str = "local",
+    ):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.generation_kwargs = generation_kwargs
+        self.max_new_tokens = max_new_tokens
+        self.max_batch_size = max(max_batch_size, 1)
+        self.window_seconds = window_seconds
+        self.prefix_cache = prefix_cache
+        self.name = name
+
+        if tokenizer.pad_token_id is None:
+            tokenizer.pad_token = tokenizer.eos_token
+        eos = getattr(model.generation_config, "eos_token_id", None) or tokenizer.eos_token_id
+        self.eos_token_ids = set(eos) if isinstance(eos, list) else {eos}
+
+        self.batches = 0
+        self.requests = 0
+        self.generated_tokens = 0
+        self.busy_seconds = 0.0
+
+        self._queue: queue.Queue[LocalRequest] = queue.Queue()
+        self._worker = threading.Thread(target=self._loop, name=f"{name}-batching", daemon=True)
+        self._worker.start()
+        _engines.append(self)
+
+    def submit(
+        self,
+        prompt: str,
+        max_new_tokens: int | None = None,
+        stream: bool = False,
+        prefix: str | None = None,
+    ) -> LocalRequest:
+        """Queue a prompt (already chat-formatted) for generation.
+
+        Args:
+            prompt: Prompt text
+            max_new_tokens: Optional per-request limit (defaults to the engine's)
+            stream: Also deliver text deltas through `request.chunks`
+            prefix: Leading part of `prompt` shared with other requests (e.g. the
+                rendered system block), eligible for KV reuse
+
+        Returns:
+            The request; its `future` resolves to the generated text
+        """
+        request = LocalRequest(
+            prompt, max_new_tokens or self.max_new_tokens, stream=stream, prefix=prefix
+        )
+        self._queue.put(request)
+        return request
+
+    def _collect_batch(self) -> list[LocalRequest]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.window_seconds
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        active = []
+        for request in batch:
+            if request.cancelled.is_set():
+                request.finish(self.tokenizer)
+            else:
+                active.append(request)
+        return active
+
+    def _loop(self) -> None:
+        while True:
+            batch = self._collect_batch()
+            if not batch:
+                continue
+            try:
+                self._run_batch(batch)
+            except BaseException as e:
+                for request in batch:
+                    request.fail(e)
+
+    def _split_prefix(self, request: LocalRequest) -> tuple[tuple[int, ...], list[int]]:
+        """Tokenize a request into (cacheable prefix ids, remaining ids)."""
+        input_ids = self.tokenizer(request.prompt, add_special_tokens=False).input_ids
+        request.prompt_tokens = len(input_ids)
+        if request.prefix and self.prefix_cache is not None:
+            prefix_ids = self.tokenizer(request.prefix, add_special_tokens=False).input_ids
+            if len(prefix_ids) < len(input_ids) and input_ids[: len(prefix_ids)] == prefix_ids:
+                return tuple(prefix_ids), input_ids[len(prefix_ids):]
+        return (), input_ids
+
+    def _run_batch(self, batch: list[LocalRequest]) -> None:
+        """Group the batch by cached prefix and run one generate() per group."""
+        groups: dict[tuple[int, ...], list[tuple[LocalRequest, list[int]]]] = {}
+        cached_layers: dict[tuple[int, ...], list] = {}
+        for request in batch:
+            prefix_ids, input_ids = self._split_prefix(request)
+            if prefix_ids:
+                layers = self.prefix_cache.lookup(prefix_ids)
+                if layers is None:
+                    prefix_ids, input_ids = (), list(prefix_ids) + input_ids
+                else:
+                    cached_layers[prefix_ids] = layers
+            groups.setdefault(prefix_ids, []).append((request, input_ids))
+
+        for prefix_ids, members in groups.items():
+            self._generate(prefix_ids, cached_layers.get(prefix_ids), members)
+
+    def _generate(
+        self,
+        prefix_ids: tuple[int, ...],
+        prefix_layers: list | None,
+        members: list[tuple[LocalRequest, list[int]]],
+    ) -> None:
+        """Decode requests sharing a prefix together.
+
+        Rows are laid out as [prefix][padding][own tokens]. Padding is masked out, and
+        generate() derives position ids from the attention mask, so the reused prefix
+        keys/values and each row's tokens keep the positions they would have unpadded.
+        """
+        requests = [request for request, _ in members]
+        prefix_len = len(prefix_ids)
+        width = prefix_len + max(len(ids) for _, ids in members)
+
+        input_ids = torch.full((len(members), width), self.tokenizer.pad_token_id, dtype=torch.long)
+        attention_mask = torch.zeros_like(input_ids)
+        if prefix_len:
+            input_ids[:, :prefix_len] = torch.tensor(prefix_ids)
+            attention_mask[:, :prefix_len] = 1
+        for row, (_, ids) in enumerate(members):
+            input_ids[row, width - len(ids):] = torch.tensor(ids)
+            attention_mask[row, width - len(ids):] = 1
+
+        cache_kwargs = {}
+        if prefix_layers is not None:
+            cache_kwargs["past_key_values"] = PrefixKVCache.build_cache(prefix_layers, len(members))
+
+        start = time.perf_counter()
+        with torch.inference_mode():
+            self.model.generate(
+                input_ids=input_ids.to(self.model.device),
+                attention_mask=attention_mask.to(self.model.device),
+                **cache_kwargs,
+                **self.generation_kwargs,
+                max_new_tokens=max(r.max_new_tokens for r in requests),
+                pad_token_id=self.tokenizer.pad_token_id,
+                streamer=_BatchStreamer(requests, self.tokenizer, self.eos_token_ids),
+                stopping_criteria=StoppingCriteriaList([_RequestsDone(requests)]),
+            )
+        self.busy_seconds += time.perf_counter() - start
+        self.batches += 1
+        self.requests += len(requests)
+        self.generated_tokens += sum(len(r.token_ids) for r in requests)
+        for request in requests:
+            request.finish(self.tokenizer)
+
+    def stats_summary(self) -> str:
+        avg_batch = self.requests / self.batches if self.batches else 0.0
+        tokens_per_second = self.generated_tokens / self.busy_seconds if self.busy_seconds else 0.0
+        summary = (
+            f"Local batching ({self.name}): {self.requests} requests in {self.batches} batches "
+            f"(avg {avg_batch:.1f}), {self.generated_tokens} tokens "
+            f"at {tokens_per_second:.1f} tok/s"
+        )
+        if self.prefix_cache is not None:
+            summary += f"; prefix cache: {self.prefix_cache.stats_summary()}"
+        return summary
+
+
+def get_batching_stats() -> list[str]:
+    """Summaries for every batching engine that has run at least one batch."""
+    return [engine.stats_summary() for engine in _engines if engine.batches]
@@ -0,0 +1,275 @@
+"""Local bi-encoder embedding backends (float, int8 and ONNX Runtime).
+
+LOCAL_EMBEDDING_BACKEND selects how EMBEDDING_MODEL runs when USE_VNPT_API=False:
+
+- `torch`: the float model on the best available device (default),
+- `torch-int8`: Linear layers dynamically quantized to int8 on CPU (no extra packages),
+- `onnx`: an ONNX Runtime export on CPU (needs `pip install "sentence-transformers[onnx]"`),
+- `onnx-int8`: the ONNX export with dynamic int8 quantization for the
+  EMBEDDING_ONNX_QUANTIZATION instruction set.
+
+Every backend embeds through `BucketedHuggingFaceEmbeddings`, which sorts texts by token
+length and cuts batches under a padded-token budget, so short chunks are not padded to
+the longest chunk of a file-ordered batch.
+
+ONNX exports are written once under EMBEDDING_EXPORT_PATH and reused on later loads.
+Quantized vectors differ slightly from the float model; `cosine_agreement` (used by
+`scripts/benchmark_embeddings.py`) measures how closely a backend tracks it.
+
+Kept apart from `src.utils.embeddings` because it pulls in torch and
+sentence-transformers; it is only imported once local embeddings are requested.
+"""
+
+import hashlib
+import importlib.util
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import torch
+from langchain_core.embeddings import Embeddings
+from langchain_huggingface import HuggingFaceEmbeddings
+from pydantic import PrivateAttr
+
+from src.config import settings
+from src.utils.logging import log_pipeline
+
+BACKENDS = ("torch", "torch-int8", "onnx", "onnx-int8")
+
+_ONNX_INSTALL_HINT = 'pip install "sentence-transformers[onnx]"'
+
+
+def get_device() -> str:
+    """Detect optimal device."""
+    if torch.cuda.is_available():
+        return "cuda"
+    if torch.backends.mps.is_available():
+        return "mps"
+    return "cpu"
+
+
+class _BucketStats:
+    """Counters for batches whose padded length falls in one power-of-two bucket."""
+
+    def __init__(self):
+        self.batches = 0
+        self.texts = 0
+        self.tokens = 0
+        self.padded_tokens = 0
+        self.seconds = 0.0
+
+
+class BucketedHuggingFaceEmbeddings(HuggingFaceEmbeddings):
+    """HuggingFaceEmbeddings that batches texts of similar token length together.
+
+    Texts are tokenized once, sorted by length and cut into batches whose padded size
+    (texts x longest text) stays within `batch_tokens`, so short texts run in large
+    batches and long ones in small batches. Vectors are returned in input order; the
+    attention mask makes them independent of the padding. Time spent per padded-length
+    bucket is recorded for `bucket_stats`.
+    """
+
+    batch_tokens: int = 8192
+
+    _bucket_stats: dict[int, _BucketStats] = PrivateAttr(default_factory=dict)
+    _stats_lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    def _token_lengths(self, texts: list[str]) -> list[int]:
+        max_length = self._client.max_seq_length
+        encoded = self._client.tokenizer(texts, truncation=True, max_length=max_length)
+        return [len(ids) for ids in encoded["input_ids"]]
+
+    def _embed(self, texts: list[str], encode_kwargs: dict[str, Any]) -> list[list[float]]:
+        if self.multi_process or len(texts) <= 1:
+            return super()._embed(texts, encode_kwargs)
+
+        texts = [x.replace("\n", " ") for x in texts]
+        encode_kwargs = {k: v for k, v in encode_kwargs.items() if k != "batch_size"}
+        lengths = self._token_lengths(texts)
+        order = sorted(range(len(texts)), key=lengths.__getitem__)
+        results: list[list[float] | None] = [None] * len(texts)
+
+        start = 0
+        while start < len(order):
+            # Ascending order: the text just added is the batch's longest, i.e. its padded length
+            end = start + 1
+            while end < len(order) and (end - start + 1) * lengths[order[end]] <= self.batch_tokens:
+                end += 1
+            batch = order[start:end]
+            padded_length = lengths[batch[-1]]
+
+            batch_start = time.perf_counter()
+            vectors = self._client.encode(
+                [texts[i] for i in batch],
+                batch_size=len(batch),
+                show_progress_bar=False,
+                **encode_kwargs,
+            )
+            elapsed = time.perf_counter() - batch_start
+            for i, vector in zip(batch, vectors.tolist()):
+                results[i] = vector
+
+            bucket = 1 << (padded_length - 1).bit_length()
+            with self._stats_lock:
+                stats = self._bucket_stats.setdefault(bucket, _BucketStats())
+                stats.batches += 1
+                stats.texts += len(batch)
+                stats.tokens += sum(lengths[i] for i in batch)
+                stats.padded_tokens += len(batch) * padded_length
+                stats.seconds += elapsed
+            start = end
+
+        return results
+
+    def bucket_stats(self) -> list[str]:
+        """Per-bucket throughput and padding summaries, shortest bucket first."""
+        lines = []
+        with self._stats_lock:
+            for bucket, stats in sorted(self._bucket_stats.items()):
+                texts_per_second = stats.texts / stats.seconds if stats.seconds else 0.0
+                lines.append(
+                    f"Embedding bucket <={bucket} tokens: {stats.texts} texts "
+                    f"in {stats.batches} batches, {stats.seconds:.1f}s "
+                    f"({texts_per_second:.1f} texts/s), "
+                    f"{1 - stats.tokens / stats.padded_tokens:.1%} padding"
+                )
+        return lines
+
+
+def _export_dir(model_name: str) -> Path:
+    slug = hashlib.sha256(model_name.encode("utf-8")).hexdigest()[:16]
+    return settings.embedding_export_path_resolved / slug
+
+
+def _onnx_session_kwargs(threads: int) -> dict[str, Any]:
+    import onnxruntime
+
+    session_options = onnxruntime.SessionOptions()
+    if threads > 0:
+        session_options.intra_op_num_threads = threads
+    return {"provider": "CPUExecutionProvider", "session_options": session_options}
+
+
+def _export_onnx(model_name: str, quantized: bool) -> tuple[str, str]:
+    """Export the model to ONNX (and quantize it) unless already done; return (directory, file)."""
+    from sentence_transformers import SentenceTransformer
+
+    export_dir = _export_dir(model_name)
+    file_name = "onnx/model.onnx"
+    if not (export_dir / file_name).exists():
+        log_pipeline(f"Exporting {model_name} to ONNX at {export_dir}")
+        SentenceTransformer(model_name, device="cpu", backend="onnx").save(str(export_dir))
+    if not quantized:
+        return str(export_dir), file_name
+
+    from sentence_transformers.backend import export_dynamic_quantized_onnx_model
+
+    config = settings.embedding_onnx_quantization
+    file_name = f"onnx/model_qint8_{config}.onnx"
+    if not (export_dir / file_name).exists():
+        log_pipeline(f"Quantizing ONNX export of {model_name} to int8 ({config})")
+        onnx_model = SentenceTransformer(str(export_dir), device="cpu", backend="onnx")
+        export_dynamic_quantized_onnx_model(onnx_model, config, str(export_dir))
+    return str(export_dir), file_name
+
+
+def load_local_embeddings(
+    model_name: str,
+    backend: str = "torch",
+    threads: int = 0,
+    batch_tokens: int = 8192,
+) -> BucketedHuggingFaceEmbeddings:
+    """Load a sentence-transformer bi-encoder with the given runtime.
+
+    Args:
+        model_name: Local path or HF id of the sentence-transformer
+        backend: One of BACKENDS
+        threads: CPU threads for inference (0 keeps the library default)
+        batch_tokens: Padded-token budget per length-bucketed batch
+
+    Returns:
+        LangChain embeddings producing normalized vectors
+    """
+    if backend not in BACKENDS:
+        raise ValueError(
+            f"Unknown LOCAL_EMBEDDING_BACKEND '{backend}', expected one of {', '.join(BACKENDS)}"
+        )
+    if threads > 0:
+        torch.set_num_threads(threads)
+    encode_kwargs = {"normalize_embeddings": True}
+
+    if backend.startswith("onnx"):
+        # sentence-transformers only reports missing packages mid-export, with a bare Exception
+        if not all(importlib.util.find_spec(name) for name in ("onnxruntime", "optimum")):
+            raise RuntimeError(
+                f"LOCAL_EMBEDDING_BACKEND={backend} requires ONNX Runtime: {_ONNX_INSTALL_HINT}"
+            )
+        model_path, file_name = _export_onnx(model_name, quantized=backend == "onnx-int8")
+        session_kwargs = _onnx_session_kwargs(threads)
+        return BucketedHuggingFaceEmbeddings(
+            model_name=model_path,
+            model_kwargs={
+                "device": "cpu",
+                "backend": "onnx",
+                "model_kwargs": {"file_name": file_name, **session_kwargs},
+            },
+            encode_kwargs=encode_kwargs,
+            batch_tokens=batch_tokens,
+        )
+
+    device = "cpu" if backend == "torch-int8" else get_device()
+    embeddings = BucketedHuggingFaceEmbeddings(
+        model_name=model_name,
+        model_kwargs={"device": device},
+        encode_kwargs=encode_kwargs,
+        batch_tokens=batch_tokens,
+    )
+    if backend == "torch-int8":
+        # Swaps every nn.Linear (attention and feed-forward projections) for an int8 kernel
+        torch.ao.quantization.quantize_dynamic(
+            embeddings._client, {torch.nn.Linear}, dtype=torch.qint8, inplace=True
+        )
+    return embeddings
+
+
+def cosine_agreement(
+    reference: Embeddings,
+    candidate: Embeddings,
+    texts: list[str],
+) -> dict[str, float]:
+    """Compare a candidate backend against a reference (float) model on the same texts.
+
+    Returns:
+        Mean, minimum and 1st-percentile cosine similarity between the two vectors of
+        each text, the share of texts whose nearest other text is the same under both
+        models (retrieval agreement), and both backends' throughput in texts/s
+    """
+    start = time.perf_counter()
+    ref = np.asarray(reference.embed_documents(texts), dtype=np.float32)
+    reference_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    cand = np.asarray(candidate.embed_documents(texts), dtype=np.float32)
+    candidate_seconds = time.perf_counter() - start
+
+    ref /= np.linalg.norm(ref, axis=1, keepdims=True)
+    cand /= np.linalg.norm(cand, axis=1, keepdims=True)
+    cosines = np.sum(ref * cand, axis=1)
+
+    neighbours_agree = 1.0
+    if len(texts) > 1:
+        ref_sim = ref @ ref.T
+        cand_sim = cand @ cand.T
+        np.fill_diagonal(ref_sim, -np.inf)
+        np.fill_diagonal(cand_sim, -np.inf)
+        neighbours_agree = float(np.mean(ref_sim.argmax(axis=1) == cand_sim.argmax(axis=1)))
+
+    return {
+        "mean_cosine": float(cosines.mean()),
+        "min_cosine": float(cosines.min()),
+        "p01_cosine": float(np.percentile(cosines, 1)),
+        "neighbour_agreement": neighbours_agree,
+        "reference_texts_per_s": len(texts) / reference_seconds,
+        "candidate_texts_per_s": len(texts) / candidate_seconds,
+    }
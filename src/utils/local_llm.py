@@ -0,0 +1,209 @@
+"""Local HuggingFace chat models served through the dynamic batching engine.
+
+Kept apart from `src.utils.llm` because it pulls in torch, transformers and
+langchain_huggingface; it is only imported once a local model is requested.
+"""
+
+import asyncio
+import threading
+from collections.abc import AsyncIterator, Iterator
+from typing import Any
+
+import torch
+from langchain_core.language_models import LangSmithParams
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, SystemMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_huggingface import ChatHuggingFace, HuggingFacePipeline
+from pydantic import PrivateAttr
+
+from src.config import settings
+from src.utils.local_batching import LocalBatchingEngine, LocalRequest
+from src.utils.prefix_cache import PrefixKVCache
+from src.utils.streaming import stop_requested
+from src.utils.token_usage import usage_metadata
+
+
+class LocalChatHuggingFace(ChatHuggingFace):
+    """ChatHuggingFace for local pipelines, served through a dynamic batching engine.
+
+    All calls (sync, async and streaming) are queued on one `LocalBatchingEngine` per
+    model, so concurrent questions share forward passes, and the rendered system block
+    is passed along for KV reuse. Closing a stream (or `stop_requested()`) cancels that
+    request's generation without affecting the rest of its batch.
+    """
+
+    _engine: LocalBatchingEngine | None = PrivateAttr(default=None)
+    _engine_lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    def _get_ls_params(self, stop: list[str] | None = None, **kwargs: Any) -> LangSmithParams:
+        params = super()._get_ls_params(stop=stop, **kwargs)
+        params["ls_model_name"] = self.model_id or "local"
+        return params
+
+    def _get_engine(self) -> LocalBatchingEngine:
+        with self._engine_lock:
+            if self._engine is None:
+                self._engine = self._create_engine()
+        return self._engine
+
+    def _create_engine(self) -> LocalBatchingEngine:
+        pipeline = self.llm.pipeline
+        generation_kwargs = dict(self.llm.pipeline_kwargs or {})
+        generation_kwargs.pop("return_full_text", None)
+        max_new_tokens = generation_kwargs.pop("max_new_tokens", 1024)
+
+        prefix_cache = None
+        if settings.local_prefix_cache_size > 0:
+            prefix_cache = PrefixKVCache(
+                pipeline.model,
+                max_entries=settings.local_prefix_cache_size,
+                min_tokens=settings.local_prefix_min_tokens,
+            )
+        return LocalBatchingEngine(
+            model=pipeline.model,
+            tokenizer=pipeline.tokenizer,
+            generation_kwargs=generation_kwargs,
+            max_new_tokens=max_new_tokens,
+            max_batch_size=settings.local_batch_max_size,
+            window_seconds=settings.local_batch_window_ms / 1000,
+            prefix_cache=prefix_cache,
+            name=self.model_id or "local",
+        )
+
+    def _system_prefix(self, messages: list[BaseMessage], prompt: str) -> str | None:
+        """Rendered leading system block, if the chat template emits it verbatim first."""
+        system = []
+        for message in messages:
+            if not isinstance(message, SystemMessage):
+                break
+            system.append(self._to_chatml_format(message))
+        if not system:
+            return None
+        prefix = self.tokenizer.apply_chat_template(
+            system, tokenize=False, add_generation_prompt=False
+        )
+        return prefix if prompt.startswith(prefix) else None
+
+    def _submit(
+        self, messages: list[BaseMessage], stream: bool = False, **kwargs: Any
+    ) -> LocalRequest:
+        prompt = self._to_chat_prompt(messages)
+        return self._get_engine().submit(
+            prompt,
+            kwargs.get("max_new_tokens"),
+            stream=stream,
+            prefix=self._system_prefix(messages, prompt),
+        )
+
+    @staticmethod
+    def _build_result(text: str, request: LocalRequest) -> ChatResult:
+        usage = usage_metadata(request.prompt_tokens, len(request.token_ids))
+        return ChatResult(
+            generations=[ChatGeneration(message=AIMessage(content=text, usage_metadata=usage))]
+        )
+
+    @staticmethod
+    def _stream_chunk(text: str, request: LocalRequest, reported: list[int]) -> ChatGenerationChunk:
+        """Text delta carrying the tokens counted since the previous chunk.
+
+        Usage metadata is summed when chunks are merged, so a stream closed early still
+        reports what was actually prefilled and generated.
+        """
+        input_tokens = request.prompt_tokens - reported[0]
+        output_tokens = len(request.token_ids) - reported[1]
+        reported[:] = [request.prompt_tokens, len(request.token_ids)]
+        usage = usage_metadata(input_tokens, output_tokens)
+        return ChatGenerationChunk(message=AIMessageChunk(content=text, usage_metadata=usage))
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        request = self._submit(messages, **kwargs)
+        try:
+            return self._build_result(request.future.result(), request)
+        except BaseException:
+            request.cancel()
+            raise
+
+    async def _agenerate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        request = self._submit(messages, **kwargs)
+        try:
+            return self._build_result(await asyncio.wrap_future(request.future), request)
+        except BaseException:
+            request.cancel()
+            raise
+
+    def _stream(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        request = self._submit(messages, stream=True, **kwargs)
+        reported = [0, 0]
+        try:
+            while (text := request.chunks.get()) is not None:
+                chunk = self._stream_chunk(text, request, reported)
+                if run_manager:
+                    run_manager.on_llm_new_token(text, chunk=chunk)
+                yield chunk
+                if stop_requested():
+                    break
+        finally:
+            request.cancel()
+        request.future.result()
+        if len(request.token_ids) > reported[1]:
+            yield self._stream_chunk("", request, reported)
+
+    async def _astream(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        request = self._submit(messages, stream=True, **kwargs)
+        reported = [0, 0]
+        try:
+            while (text := await asyncio.to_thread(request.chunks.get)) is not None:
+                chunk = self._stream_chunk(text, request, reported)
+                if run_manager:
+                    await run_manager.on_llm_new_token(text, chunk=chunk)
+                yield chunk
+                if stop_requested():
+                    break
+        finally:
+            request.cancel()
+        await asyncio.wrap_future(request.future)
+        if len(request.token_ids) > reported[1]:
+            yield self._stream_chunk("", request, reported)
+
+
+def load_local_chat_model(model_path: str) -> LocalChatHuggingFace:
+    """Load a local HuggingFace text-generation pipeline wrapped for batched serving."""
+    llm_pipeline = HuggingFacePipeline.from_model_id(
+        model_id=model_path,
+        task="text-generation",
+        pipeline_kwargs={
+            "max_new_tokens": 1024,
+            "do_sample": False,
+            "return_full_text": False,
+        },
+        model_kwargs={
+            "trust_remote_code": True,
+            "device_map": "auto",
+            "torch_dtype": torch.float32,
+        },
+    )
+    return LocalChatHuggingFace(llm=llm_pipeline)
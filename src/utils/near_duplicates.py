@@ -0,0 +1,99 @@
+"""Near-duplicate detection of chunks with 64-bit SimHash fingerprints.
+
+Pages crawled from one site repeat the same navigation, disclaimers and boilerplate
+paragraphs, which split into near-identical chunks. A chunk's fingerprint is the
+SimHash of its word 3-gram shingles: similar texts get fingerprints differing in few
+bits. `NearDuplicateIndex` finds an earlier fingerprint within a Hamming distance
+without comparing against all of them: fingerprints are split into distance + 1 bit
+blocks, and two fingerprints within the distance agree exactly on at least one block,
+so only fingerprints sharing a block are compared.
+
+Fingerprints are plain ints, so they can be stored in the ingestion manifest and
+re-used by later incremental runs.
+"""
+
+import hashlib
+
+import numpy as np
+
+FINGERPRINT_BITS = 64
+
+_SHINGLE_WORDS = 3
+_BIT_SHIFTS = np.arange(FINGERPRINT_BITS, dtype=np.uint64)
+
+
+def _mix(x: np.ndarray) -> np.ndarray:
+    """splitmix64 finalizer: spreads every input bit over all 64 output bits."""
+    x = x ^ (x >> np.uint64(30))
+    x = x * np.uint64(0xBF58476D1CE4E5B9)
+    x = x ^ (x >> np.uint64(27))
+    x = x * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def _rotate(x: np.ndarray, bits: int) -> np.ndarray:
+    return (x << np.uint64(bits)) | (x >> np.uint64(FINGERPRINT_BITS - bits))
+
+
+def simhashes(texts: list[str]) -> list[int]:
+    """SimHash fingerprints of texts (case-insensitive, over word 3-grams)."""
+    token_ids: dict[str, int] = {}
+    fingerprints = []
+    for text in texts:
+        tokens = text.lower().split()
+        if not tokens:
+            fingerprints.append(0)
+            continue
+        for token in tokens:
+            if token not in token_ids:
+                token_ids[token] = int.from_bytes(
+                    hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little"
+                )
+        ids = np.fromiter(
+            (token_ids[token] for token in tokens), dtype=np.uint64, count=len(tokens)
+        )
+
+        # Order-sensitive combination of consecutive token hashes, one feature per shingle
+        if len(ids) >= _SHINGLE_WORDS:
+            features = ids[:-2] ^ _rotate(ids[1:-1], 21) ^ _rotate(ids[2:], 42)
+        else:
+            features = ids
+        features = _mix(features)
+
+        ones = ((features[:, None] >> _BIT_SHIFTS) & np.uint64(1)).sum(axis=0)
+        majority = np.packbits(ones * 2 > len(features), bitorder="little")
+        fingerprints.append(int.from_bytes(majority.tobytes(), "little"))
+    return fingerprints
+
+
+class NearDuplicateIndex:
+    """Fingerprints seen so far, searchable by Hamming distance."""
+
+    def __init__(self, max_distance: int = 3):
+        if not 0 <= max_distance < FINGERPRINT_BITS // 2:
+            raise ValueError(
+                f"max_distance must be between 0 and {FINGERPRINT_BITS // 2 - 1}, "
+                f"got {max_distance}"
+            )
+        self.max_distance = max_distance
+        blocks = max_distance + 1
+        edges = [FINGERPRINT_BITS * i // blocks for i in range(blocks + 1)]
+        self._blocks = [(start, (1 << (end - start)) - 1) for start, end in zip(edges, edges[1:])]
+        self._tables: list[dict[int, list[int]]] = [{} for _ in self._blocks]
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def find(self, fingerprint: int) -> int | None:
+        """An indexed fingerprint within max_distance bits of `fingerprint`, if any."""
+        for (shift, mask), table in zip(self._blocks, self._tables):
+            for other in table.get((fingerprint >> shift) & mask, ()):
+                if (fingerprint ^ other).bit_count() <= self.max_distance:
+                    return other
+        return None
+
+    def add(self, fingerprint: int) -> None:
+        for (shift, mask), table in zip(self._blocks, self._tables):
+            table.setdefault((fingerprint >> shift) & mask, []).append(fingerprint)
+        self._count += 1
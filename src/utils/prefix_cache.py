@@ -0,0 +1,97 @@
+"""Shared-prefix KV cache for local HuggingFace models.
+
+Router, RAG, direct and logic prompts all start with a system block rendered from the
+same template. The attention keys/values for such a prefix are computed once and
+reused by later requests, which then only prefill their own suffix.
+
+A prefix is cached the second time it is seen, so one-off prefixes (e.g. RAG system
+prompts that embed retrieved context) do not evict the static ones.
+"""
+
+from collections import OrderedDict
+from typing import Any
+
+import torch
+from transformers import DynamicCache
+
+_MAX_TRACKED_PREFIXES = 1024
+
+
+def _cache_layers(cache: Any) -> list[tuple[torch.Tensor, torch.Tensor]]:
+    """Extract per-layer (keys, values) from a transformers cache object."""
+    if hasattr(cache, "layers"):
+        return [(layer.keys, layer.values) for layer in cache.layers]
+    if hasattr(cache, "key_cache"):
+        return list(zip(cache.key_cache, cache.value_cache))
+    return [(keys, values) for keys, values in cache]
+
+
+class PrefixKVCache:
+    """LRU store of past key/values keyed by prefix token ids."""
+
+    def __init__(self, model: Any, max_entries: int, min_tokens: int):
+        self.model = model
+        self.max_entries = max_entries
+        self.min_tokens = min_tokens
+        self.hits = 0
+        self.misses = 0
+        self.reused_tokens = 0
+        self._entries: OrderedDict[tuple[int, ...], list[tuple[torch.Tensor, torch.Tensor]]] = (
+            OrderedDict()
+        )
+        self._seen: OrderedDict[tuple[int, ...], int] = OrderedDict()
+
+    def lookup(self, prefix_ids: tuple[int, ...]) -> list[tuple[torch.Tensor, torch.Tensor]] | None:
+        """Return cached layers for the prefix, computing them on its second sighting.
+
+        Must be called from the thread that owns the model.
+        """
+        if self.max_entries <= 0 or len(prefix_ids) < self.min_tokens:
+            return None
+
+        layers = self._entries.get(prefix_ids)
+        if layers is not None:
+            self._entries.move_to_end(prefix_ids)
+            self.hits += 1
+            self.reused_tokens += len(prefix_ids)
+            return layers
+
+        self.misses += 1
+        seen = self._seen.pop(prefix_ids, 0) + 1
+        self._seen[prefix_ids] = seen
+        if len(self._seen) > _MAX_TRACKED_PREFIXES:
+            self._seen.popitem(last=False)
+        if seen < 2:
+            return None
+
+        with torch.inference_mode():
+            input_ids = torch.tensor([prefix_ids], device=self.model.device)
+            output = self.model(input_ids=input_ids, use_cache=True)
+        layers = [
+            (keys.detach(), values.detach())
+            for keys, values in _cache_layers(output.past_key_values)
+        ]
+        self._entries[prefix_ids] = layers
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return layers
+
+    @staticmethod
+    def build_cache(
+        layers: list[tuple[torch.Tensor, torch.Tensor]], batch_size: int
+    ) -> DynamicCache:
+        """Fresh cache for a batch sharing the prefix (generate() appends to it in place)."""
+        cache = DynamicCache()
+        for layer_idx, (keys, values) in enumerate(layers):
+            cache.update(
+                keys.expand(batch_size, -1, -1, -1),
+                values.expand(batch_size, -1, -1, -1),
+                layer_idx,
+            )
+        return cache
+
+    def stats_summary(self) -> str:
+        return (
+            f"{len(self._entries)} prefixes cached, {self.hits} hits / {self.misses} misses, "
+            f"{self.reused_tokens} prefill tokens reused"
+        )
@@ -0,0 +1,333 @@
+"""Latency-aware routing of chat calls across several LLM providers.
+
+`ProviderRouterChatModel` holds one backend per provider (VNPT, OpenRouter, local
+HuggingFace) for a model size. Each call goes to the best available backend:
+
+- backends in the lowest PROVIDER_PRIORITIES tier are preferred;
+- within a tier, the lowest `p50 latency x (1 + 4 x error rate) / weight` wins, with
+  backends that have few latency samples tried first;
+- throttled backends (HTTP 429, paused limiter, open circuit) and backends over their
+  PROVIDER_QUOTAS request count (per pipeline run) are skipped until they recover.
+
+If a call fails, it fails over to the next backend. Every backend except the last one
+is called under `rate_limit_fail_fast`, so a throttled provider hands the call on
+instead of waiting for its quota to reset.
+"""
+
+import threading
+import time
+from collections import deque
+from collections.abc import AsyncIterator, Iterator
+from typing import Any
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from pydantic import ConfigDict
+
+from src.config import settings
+from src.utils.logging import print_log
+from src.utils.rate_limit import LatencyTracker, RateLimitError, rate_limit_fail_fast
+from src.utils.resilience import CircuitOpenError
+
+_MIN_LATENCY_SAMPLES = 3
+_ERROR_PENALTY = 4.0
+
+_health: dict[str, "ProviderHealth"] = {}
+_health_lock = threading.Lock()
+
+
+def _lookup(mapping: dict[str, Any], provider: str, model_type: str, default: Any) -> Any:
+    """Look up a per-backend setting by "provider_size", then "provider"."""
+    return mapping.get(f"{provider}_{model_type}", mapping.get(provider, default))
+
+
+class ProviderHealth:
+    """Rolling latency, error rate, cool-down and quota usage of one backend."""
+
+    def __init__(self, name: str, priority: int, weight: float, quota: int | None):
+        self.name = name
+        self.priority = priority
+        self.weight = max(weight, 1e-6)
+        self.quota = quota
+        self.latency = LatencyTracker(window=100)
+        self.requests = 0
+        self.failures = 0
+        self.failovers = 0
+        self.unavailable_until = 0.0
+        self._outcomes: deque[bool] = deque(maxlen=50)
+        self._lock = threading.Lock()
+
+    def available(self) -> bool:
+        with self._lock:
+            if self.quota is not None and self.requests >= self.quota:
+                return False
+            return time.monotonic() >= self.unavailable_until
+
+    def error_rate(self) -> float:
+        with self._lock:
+            if not self._outcomes:
+                return 0.0
+            return self._outcomes.count(False) / len(self._outcomes)
+
+    def score(self) -> float:
+        """Lower is better; backends without enough samples score 0 so they get measured."""
+        if len(self.latency) < _MIN_LATENCY_SAMPLES:
+            return 0.0
+        return self.latency.percentile(50) * (1 + _ERROR_PENALTY * self.error_rate()) / self.weight
+
+    def reset_usage(self) -> None:
+        """Start a new run: zero the call counts the quota applies to, keep latency and errors."""
+        with self._lock:
+            self.requests = 0
+            self.failures = 0
+            self.failovers = 0
+
+    def record_dispatch(self) -> None:
+        with self._lock:
+            self.requests += 1
+
+    def record_success(self, latency: float) -> None:
+        with self._lock:
+            self._outcomes.append(True)
+            self.latency.record(latency)
+
+    def record_failure(self, error: Exception) -> None:
+        """Count a failed call; throttling errors also take the backend out of rotation."""
+        cooldown = None
+        if isinstance(error, RateLimitError):
+            cooldown = error.retry_after or settings.provider_cooldown
+        elif isinstance(error, CircuitOpenError):
+            cooldown = settings.circuit_reset_timeout
+        with self._lock:
+            self.failures += 1
+            self._outcomes.append(False)
+            if cooldown:
+                self.unavailable_until = max(self.unavailable_until, time.monotonic() + cooldown)
+        if cooldown:
+            print_log(
+                f"        [Warning] {self.name}: throttled, routing elsewhere for {cooldown:.0f}s"
+            )
+
+    def stats_summary(self) -> str:
+        p50 = self.latency.percentile(50)
+        p50_text = f"{p50:.2f}s" if p50 is not None else "n/a"
+        quota_text = f"/{self.quota}" if self.quota is not None else ""
+        return (
+            f"{self.name}: {self.requests}{quota_text} calls, p50 {p50_text}, "
+            f"{self.error_rate() * 100:.1f}% errors, {self.failovers} failovers"
+        )
+
+
+def get_provider_health(provider: str, model_type: str) -> ProviderHealth:
+    """Get or create the health tracker for a provider/model-size backend."""
+    name = f"{provider}_{model_type}"
+    with _health_lock:
+        health = _health.get(name)
+        if health is None:
+            quota = _lookup(settings.provider_quotas, provider, model_type, None)
+            health = ProviderHealth(
+                name=name,
+                priority=_lookup(settings.provider_priorities, provider, model_type, 0),
+                weight=_lookup(settings.provider_weights, provider, model_type, 1.0),
+                quota=quota,
+            )
+            _health[name] = health
+    return health
+
+
+def reset_provider_usage() -> None:
+    """Restore every backend's quota (called at the start of each pipeline run)."""
+    with _health_lock:
+        for health in _health.values():
+            health.reset_usage()
+
+
+def get_provider_stats() -> list[str]:
+    """Summaries for every backend that has received calls."""
+    with _health_lock:
+        return [health.stats_summary() for health in _health.values() if health.requests]
+
+
+class ProviderRouterChatModel(BaseChatModel):
+    """Chat model that dispatches each call to the best available provider backend."""
+
+    backends: dict[str, BaseChatModel]
+    model_type: str
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    @property
+    def _llm_type(self) -> str:
+        return "provider-router"
+
+    @property
+    def _identifying_params(self) -> dict[str, Any]:
+        return {"providers": list(self.backends), "model_type": self.model_type}
+
+    @property
+    def model_name(self) -> str:
+        return f"router-{self.model_type}:" + ",".join(self.backends)
+
+    @property
+    def endpoints(self) -> list[str]:
+        """Endpoints of the API backends (for connection warmup)."""
+        return [getattr(model, "endpoint", "") for model in self.backends.values()]
+
+    def _plan(self) -> list[tuple[str, BaseChatModel, ProviderHealth]]:
+        """Backends in the order they should be tried for the next call."""
+        candidates = [
+            (provider, model, get_provider_health(provider, self.model_type))
+            for provider, model in self.backends.items()
+        ]
+        available = [c for c in candidates if c[2].available()]
+        if not available:
+            # Everything is throttled: try the backend that recovers first and let it wait
+            return sorted(candidates, key=lambda c: c[2].unavailable_until)[:1]
+        return sorted(available, key=lambda c: (c[2].priority, c[2].score()))
+
+    @staticmethod
+    def _tag(result: ChatResult, provider: str) -> ChatResult:
+        result.llm_output = {**(result.llm_output or {}), "provider": provider}
+        return result
+
+    @staticmethod
+    def _tag_chunk(chunk: ChatGenerationChunk, model: BaseChatModel) -> ChatGenerationChunk:
+        """Record which backend model served a stream (for usage and cost accounting)."""
+        model_name = getattr(model, "model_name", None) or getattr(model, "model_id", None)
+        if model_name:
+            chunk.generation_info = {**(chunk.generation_info or {}), "model_name": model_name}
+        return chunk
+
+    def _on_failure(self, health: ProviderHealth, error: Exception, is_last: bool) -> None:
+        health.record_failure(error)
+        if not is_last:
+            health.failovers += 1
+            print_log(f"        [Warning] {health.name} failed ({error}), failing over")
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        plan = self._plan()
+        for index, (provider, model, health) in enumerate(plan):
+            is_last = index == len(plan) - 1
+            health.record_dispatch()
+            start = time.perf_counter()
+            try:
+                with rate_limit_fail_fast(not is_last):
+                    result = model._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+            except Exception as e:
+                self._on_failure(health, e, is_last)
+                if is_last:
+                    raise
+                continue
+            health.record_success(time.perf_counter() - start)
+            return self._tag(result, provider)
+
+    async def _agenerate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        plan = self._plan()
+        for index, (provider, model, health) in enumerate(plan):
+            is_last = index == len(plan) - 1
+            health.record_dispatch()
+            start = time.perf_counter()
+            try:
+                with rate_limit_fail_fast(not is_last):
+                    result = await model._agenerate(
+                        messages, stop=stop, run_manager=run_manager, **kwargs
+                    )
+            except Exception as e:
+                self._on_failure(health, e, is_last)
+                if is_last:
+                    raise
+                continue
+            health.record_success(time.perf_counter() - start)
+            return self._tag(result, provider)
+
+    def _stream(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        """Stream from the best backend; failover is possible until the first chunk arrives."""
+        plan = self._plan()
+        for index, (provider, model, health) in enumerate(plan):
+            is_last = index == len(plan) - 1
+            health.record_dispatch()
+            start = time.perf_counter()
+            stream = model._stream(messages, stop=stop, run_manager=run_manager, **kwargs)
+            try:
+                with rate_limit_fail_fast(not is_last):
+                    first = next(stream, None)
+            except Exception as e:
+                stream.close()
+                self._on_failure(health, e, is_last)
+                if is_last:
+                    raise
+                continue
+
+            failed = False
+            try:
+                if first is not None:
+                    yield self._tag_chunk(first, model)
+                yield from stream
+            except Exception as e:
+                failed = True
+                health.record_failure(e)
+                raise
+            finally:
+                # Streams closed early by the caller (early stop) still count as successes
+                stream.close()
+                if not failed:
+                    health.record_success(time.perf_counter() - start)
+            return
+
+    async def _astream(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        plan = self._plan()
+        for index, (provider, model, health) in enumerate(plan):
+            is_last = index == len(plan) - 1
+            health.record_dispatch()
+            start = time.perf_counter()
+            stream = model._astream(messages, stop=stop, run_manager=run_manager, **kwargs)
+            try:
+                with rate_limit_fail_fast(not is_last):
+                    first = await anext(stream, None)
+            except Exception as e:
+                await stream.aclose()
+                self._on_failure(health, e, is_last)
+                if is_last:
+                    raise
+                continue
+
+            failed = False
+            try:
+                if first is not None:
+                    yield self._tag_chunk(first, model)
+                async for chunk in stream:
+                    yield chunk
+            except Exception as e:
+                failed = True
+                health.record_failure(e)
+                raise
+            finally:
+                await stream.aclose()
+                if not failed:
+                    health.record_success(time.perf_counter() - start)
+            return
@@ -0,0 +1,112 @@
+"""Micro-batching of concurrent query embeddings.
+
+Each RAG question embeds one query. Without batching that is one HTTP request per
+question against the VNPT API, or one batch-size-1 forward pass with a local
+bi-encoder. `QueryBatchingEmbeddings` queues concurrent `aembed_query` calls for up to
+QUERY_EMBED_BATCH_WINDOW_MS (or until QUERY_EMBED_BATCH_MAX_SIZE queries are waiting)
+and embeds them in a single `aembed_documents` call, then fans the vectors back out.
+Both backends embed queries and documents identically, so the vectors are the same as
+with per-query calls.
+
+Each backend call holds an EMBEDDINGS resource slot, so LIMIT_EMBEDDINGS bounds backend
+requests rather than waiting queries. Pending queries are kept per event loop.
+"""
+
+import asyncio
+import threading
+import weakref
+
+from langchain_core.embeddings import Embeddings
+
+from src.utils.resource_limits import EMBEDDINGS, get_resource_limiter
+
+_PendingQuery = tuple[str, asyncio.Future]
+
+
+class QueryBatchingEmbeddings(Embeddings):
+    """Embeddings wrapper that coalesces concurrent `aembed_query` calls into one backend call."""
+
+    def __init__(self, embeddings: Embeddings, max_batch_size: int, window_seconds: float):
+        self.embeddings = embeddings
+        self.max_batch_size = max(max_batch_size, 1)
+        self.window_seconds = window_seconds
+
+        self.queries = 0
+        self.batches = 0
+        self.largest_batch = 0
+
+        self._pending: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, list[_PendingQuery]] = (
+            weakref.WeakKeyDictionary()
+        )
+        self._tasks: set[asyncio.Task] = set()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_batch_size > 1 and self.window_seconds > 0
+
+    def _flush(self, loop: asyncio.AbstractEventLoop, batch: list[_PendingQuery]) -> None:
+        """Start embedding `batch` unless the window timer or the size limit already did."""
+        if self._pending.get(loop) is not batch:
+            return
+        del self._pending[loop]
+        task = loop.create_task(self._run_batch(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, batch: list[_PendingQuery]) -> None:
+        texts = list(dict.fromkeys(text for text, _ in batch))
+        with self._lock:
+            self.queries += len(batch)
+            self.batches += 1
+            self.largest_batch = max(self.largest_batch, len(batch))
+        try:
+            async with get_resource_limiter(EMBEDDINGS):
+                vectors = await self.embeddings.aembed_documents(texts)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        by_text = dict(zip(texts, vectors))
+        for text, future in batch:
+            # A waiting question may have been cancelled in the meantime
+            if not future.done():
+                future.set_result(by_text[text])
+
+    async def aembed_query(self, text: str) -> list[float]:
+        """Embed a query together with the other queries arriving within the batch window."""
+        if not self.enabled:
+            with self._lock:
+                self.queries += 1
+                self.batches += 1
+                self.largest_batch = max(self.largest_batch, 1)
+            async with get_resource_limiter(EMBEDDINGS):
+                return await self.embeddings.aembed_query(text)
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        batch = self._pending.get(loop)
+        if batch is None:
+            batch = self._pending[loop] = []
+            loop.call_later(self.window_seconds, self._flush, loop, batch)
+        batch.append((text, future))
+        if len(batch) >= self.max_batch_size:
+            self._flush(loop, batch)
+        return await future
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embeddings.embed_query(text)
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        return await self.embeddings.aembed_documents(texts)
+
+    def stats_summary(self) -> str:
+        average = self.queries / self.batches if self.batches else 0.0
+        return (
+            f"Query embedding batching: {self.queries} queries in {self.batches} backend calls "
+            f"(avg {average:.1f}, max {self.largest_batch} per call)"
+        )
@@ -0,0 +1,385 @@
+"""Adaptive per-endpoint rate limiting for API-backed models.
+
+Each endpoint gets an `EndpointLimiter` that combines:
+- a token bucket enforcing a request rate (RATE_LIMIT_RPM),
+- an AIMD concurrency controller that adds one in-flight slot per window of healthy
+  calls and halves the limit on HTTP 429,
+- a pause gate honoring `Retry-After` / `X-RateLimit-*` headers, so callers wait for
+  the quota to reset instead of failing.
+
+All state is guarded by a threading lock, so the same limiter serves sync calls made
+from executor threads and async calls made on the event loop.
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from collections.abc import Iterator, Mapping
+from contextlib import contextmanager
+from contextvars import ContextVar
+from email.utils import parsedate_to_datetime
+
+import httpx
+
+from src.config import settings
+from src.utils.logging import print_log
+
+_POLL_INTERVAL = 0.05
+_RATE_LIMIT_MARKERS = ("too many requests", "rate limit", "quota exceeded")
+
+_limiters: dict[str, "EndpointLimiter"] = {}
+_limiters_lock = threading.Lock()
+_fail_fast: ContextVar[bool] = ContextVar("rate_limit_fail_fast", default=False)
+
+
+class RateLimitError(RuntimeError):
+    """Raised when an endpoint keeps returning HTTP 429 after all pauses are exhausted."""
+
+    def __init__(self, message: str, retry_after: float | None = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+@contextmanager
+def rate_limit_fail_fast(enabled: bool = True) -> Iterator[None]:
+    """Within this block, raise RateLimitError on 429/pause instead of waiting it out.
+
+    Used when another provider can take the call, so a throttled endpoint is skipped
+    rather than stalling the request until its quota resets.
+    """
+    token = _fail_fast.set(enabled)
+    try:
+        yield
+    finally:
+        _fail_fast.reset(token)
+
+
+def is_fail_fast() -> bool:
+    return _fail_fast.get()
+
+
+def is_rate_limit_response(response: httpx.Response) -> bool:
+    """Detect quota/rate-limit responses (429, or VNPT's 401 'rate limit' variant)."""
+    if response.status_code == 429:
+        return True
+    if response.status_code < 400:
+        return False
+    text = response.text.lower()
+    return any(marker in text for marker in _RATE_LIMIT_MARKERS)
+
+
+def _parse_seconds_or_timestamp(value: str, now: float) -> float | None:
+    """Interpret a reset header as relative seconds or an absolute epoch (s or ms)."""
+    try:
+        number = float(value)
+    except ValueError:
+        return None
+    if number > 1e12:  # epoch milliseconds
+        return max(number / 1000 - now, 0.0)
+    if number > 1e9:  # epoch seconds
+        return max(number - now, 0.0)
+    return max(number, 0.0)
+
+
+def parse_retry_after(headers: Mapping[str, str]) -> float | None:
+    """Extract how long to wait from Retry-After or X-RateLimit-Reset headers.
+
+    Args:
+        headers: Response headers (case-insensitive mapping)
+
+    Returns:
+        Seconds to wait, or None if the headers carry no hint
+    """
+    now = time.time()
+    retry_after = headers.get("retry-after")
+    if retry_after:
+        seconds = _parse_seconds_or_timestamp(retry_after, now)
+        if seconds is not None:
+            return seconds
+        try:
+            return max(parsedate_to_datetime(retry_after).timestamp() - now, 0.0)
+        except (TypeError, ValueError):
+            pass
+
+    for name in ("x-ratelimit-reset", "x-ratelimit-reset-requests", "ratelimit-reset"):
+        value = headers.get(name)
+        if value:
+            seconds = _parse_seconds_or_timestamp(value.rstrip("s"), now)
+            if seconds is not None:
+                return seconds
+    return None
+
+
+def _quota_exhausted(headers: Mapping[str, str]) -> bool:
+    for name in ("x-ratelimit-remaining", "x-ratelimit-remaining-requests", "ratelimit-remaining"):
+        value = headers.get(name)
+        if value is not None:
+            try:
+                return float(value) <= 0
+            except ValueError:
+                return False
+    return False
+
+
+class TokenBucket:
+    """Classic token bucket; `reserve()` returns how long the caller must wait."""
+
+    def __init__(self, rate_per_second: float, capacity: float):
+        self.rate = rate_per_second
+        self.capacity = max(capacity, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def reserve(self) -> float:
+        """Take one token (possibly going into debt) and return the wait in seconds."""
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        self._tokens -= 1
+        if self._tokens >= 0:
+            return 0.0
+        return -self._tokens / self.rate
+
+
+class LatencyTracker:
+    """Rolling window of observed call latencies."""
+
+    def __init__(self, window: int = 200):
+        self._samples: deque[float] = deque(maxlen=window)
+
+    def record(self, latency: float) -> None:
+        self._samples.append(latency)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, pct: float) -> float | None:
+        """Return the pct-th percentile (0-100) of the window, or None if empty."""
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        index = min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)
+        return ordered[index]
+
+
+class AdaptiveConcurrencyLimiter:
+    """AIMD controller for the number of in-flight requests.
+
+    Additive increase: after `limit` consecutive healthy completions (latency within
+    `latency_tolerance` x rolling p50 and no error) the limit grows by one.
+    Multiplicative decrease: a rate-limited response multiplies it by `backoff_ratio`;
+    an error rate above `max_error_rate` over the recent window does the same.
+    Requests aborted by the caller (cancelled, or a hedge that lost) only return their
+    slot: they say nothing about the endpoint's health.
+    """
+
+    def __init__(
+        self,
+        initial: int,
+        min_limit: int,
+        max_limit: int,
+        backoff_ratio: float = 0.5,
+        latency_tolerance: float = 2.0,
+        max_error_rate: float = 0.2,
+    ):
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff_ratio = backoff_ratio
+        self.latency_tolerance = latency_tolerance
+        self.max_error_rate = max_error_rate
+        self.in_flight = 0
+        self.latency = LatencyTracker()
+        self._healthy_streak = 0
+        self._outcomes: deque[bool] = deque(maxlen=50)
+
+    def try_acquire(self) -> bool:
+        if self.in_flight < int(self.limit):
+            self.in_flight += 1
+            return True
+        return False
+
+    def abort(self) -> None:
+        """Return the slot of an aborted request without recording an outcome."""
+        self.in_flight = max(self.in_flight - 1, 0)
+
+    def release(self, latency: float, ok: bool, rate_limited: bool) -> None:
+        self.in_flight = max(self.in_flight - 1, 0)
+        self._outcomes.append(ok and not rate_limited)
+
+        if rate_limited:
+            self._decrease()
+            return
+
+        if not ok:
+            self._healthy_streak = 0
+            errors = self._outcomes.count(False)
+            if len(self._outcomes) >= 10 and errors / len(self._outcomes) > self.max_error_rate:
+                self._decrease()
+                self._outcomes.clear()
+            return
+
+        baseline = self.latency.percentile(50)
+        self.latency.record(latency)
+        if baseline is not None and latency > self.latency_tolerance * baseline:
+            self._healthy_streak = 0
+            return
+
+        self._healthy_streak += 1
+        if self._healthy_streak >= int(self.limit):
+            self.limit = min(self.limit + 1, self.max_limit)
+            self._healthy_streak = 0
+
+    def _decrease(self) -> None:
+        self.limit = max(self.limit * self.backoff_ratio, self.min_limit)
+        self._healthy_streak = 0
+
+
+class EndpointLimiter:
+    """Rate, concurrency and pause control for a single API endpoint."""
+
+    def __init__(
+        self,
+        name: str,
+        requests_per_minute: float,
+        burst: int,
+        concurrency: AdaptiveConcurrencyLimiter,
+    ):
+        self.name = name
+        self.bucket = (
+            TokenBucket(requests_per_minute / 60, burst) if requests_per_minute > 0 else None
+        )
+        self.concurrency = concurrency
+        self.paused_until = 0.0
+        self.rate_limited_count = 0
+        self._lock = threading.Lock()
+
+    def _try_acquire(self) -> float | None:
+        """Attempt to take a slot. Returns None on success, else seconds to wait."""
+        with self._lock:
+            pause = self.paused_until - time.monotonic()
+            if pause > 0:
+                return pause
+            if not self.concurrency.try_acquire():
+                return _POLL_INTERVAL
+            wait = self.bucket.reserve() if self.bucket else 0.0
+        if wait > 0:
+            # Hold the slot while waiting for a token so the rate stays smooth
+            time.sleep(wait)
+        return None
+
+    async def _atry_acquire(self) -> float | None:
+        with self._lock:
+            pause = self.paused_until - time.monotonic()
+            if pause > 0:
+                return pause
+            if not self.concurrency.try_acquire():
+                return _POLL_INTERVAL
+            wait = self.bucket.reserve() if self.bucket else 0.0
+        if wait > 0:
+            try:
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                with self._lock:
+                    self.concurrency.abort()
+                raise
+        return None
+
+    def acquire(self) -> None:
+        """Block until a request may be sent (sync callers)."""
+        while (wait := self._try_acquire()) is not None:
+            time.sleep(min(wait, 1.0))
+
+    async def aacquire(self) -> None:
+        """Wait until a request may be sent (async callers)."""
+        while (wait := await self._atry_acquire()) is not None:
+            await asyncio.sleep(min(wait, 1.0))
+
+    def release(
+        self,
+        latency: float,
+        response: httpx.Response | None,
+        aborted: bool = False,
+    ) -> None:
+        """Return a slot and feed the outcome back into the controller.
+
+        Args:
+            latency: Wall-clock seconds the request took
+            response: The response, or None if the request raised
+            aborted: The caller gave up on the request (e.g. it was cancelled); the slot
+                is returned without counting the request as a success or a failure
+        """
+        if aborted:
+            with self._lock:
+                self.concurrency.abort()
+            return
+        rate_limited = response is not None and is_rate_limit_response(response)
+        ok = response is not None and response.status_code < 500
+        with self._lock:
+            self.concurrency.release(latency, ok=ok, rate_limited=rate_limited)
+        if response is not None and not rate_limited and _quota_exhausted(response.headers):
+            reset = parse_retry_after(response.headers)
+            if reset:
+                self.pause(reset, reason="quota exhausted")
+
+    def pause_remaining(self) -> float:
+        """Seconds left in the current pause (0 if not paused)."""
+        with self._lock:
+            return max(self.paused_until - time.monotonic(), 0.0)
+
+    def on_rate_limited(self, retry_after: float | None, attempt: int) -> float:
+        """Pause the endpoint after a 429 and return the pause length."""
+        if retry_after is None:
+            retry_after = min(
+                settings.rate_limit_default_pause * (2**attempt), settings.rate_limit_max_pause
+            )
+        self.rate_limited_count += 1
+        self.pause(retry_after, reason="HTTP 429")
+        return retry_after
+
+    def pause(self, seconds: float, reason: str) -> None:
+        """Stop handing out slots for `seconds` (extends, never shortens, a pause)."""
+        with self._lock:
+            until = time.monotonic() + seconds
+            if until <= self.paused_until:
+                return
+            self.paused_until = until
+            limit = int(self.concurrency.limit)
+        print_log(
+            f"        [Warning] {self.name}: {reason}, pausing {seconds:.1f}s "
+            f"(concurrency limit {limit})"
+        )
+
+    def stats_summary(self) -> str:
+        p50 = self.concurrency.latency.percentile(50)
+        p50_text = f"{p50:.2f}s" if p50 is not None else "n/a"
+        return (
+            f"{self.name}: concurrency limit {int(self.concurrency.limit)}, "
+            f"p50 latency {p50_text}, {self.rate_limited_count} rate-limit pauses"
+        )
+
+
+def get_endpoint_limiter(endpoint: str) -> EndpointLimiter:
+    """Get or create the limiter for an endpoint URL."""
+    with _limiters_lock:
+        limiter = _limiters.get(endpoint)
+        if limiter is None:
+            limiter = EndpointLimiter(
+                name=endpoint.rstrip("/").rsplit("/", 1)[-1] or endpoint,
+                requests_per_minute=settings.rate_limit_rpm,
+                burst=settings.rate_limit_burst,
+                concurrency=AdaptiveConcurrencyLimiter(
+                    initial=settings.concurrency_initial,
+                    min_limit=settings.concurrency_min,
+                    max_limit=settings.concurrency_max,
+                ),
+            )
+            _limiters[endpoint] = limiter
+    return limiter
+
+
+def get_limiter_stats() -> list[str]:
+    """Summaries for every endpoint limiter created in this process."""
+    with _limiters_lock:
+        return [limiter.stats_summary() for limiter in _limiters.values()]
@@ -0,0 +1,164 @@
+"""Retry, backoff and circuit-breaker primitives for API providers.
+
+- `RetryPolicy`: bounded exponential backoff with full jitter.
+- `RetryBudget`: caps retries per run to a fraction of requests, so a provider outage
+  cannot multiply load indefinitely.
+- `CircuitBreaker`: per-endpoint breaker that fails fast while a provider is down and
+  lets a single probe through after a cool-down.
+"""
+
+import random
+import threading
+import time
+from dataclasses import dataclass
+
+from src.config import settings
+from src.utils.logging import print_log
+
+RETRYABLE_STATUS_CODES = frozenset({408, 500, 502, 503, 504})
+
+_breakers: dict[str, "CircuitBreaker"] = {}
+_breakers_lock = threading.Lock()
+_retry_budget: "RetryBudget | None" = None
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling an endpoint whose circuit breaker is open."""
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """Exponential backoff with full jitter: delay ~ U(0, min(max_delay, base * 2^attempt))."""
+
+    max_attempts: int
+    base_delay: float
+    max_delay: float
+
+    def delay(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2**attempt)))
+
+
+class RetryBudget:
+    """Run-wide retry allowance: `min_retries + ratio * requests` retries in total."""
+
+    def __init__(self, ratio: float, min_retries: int):
+        self.ratio = ratio
+        self.min_retries = min_retries
+        self.requests = 0
+        self.retries = 0
+        self._lock = threading.Lock()
+
+    def record_request(self) -> None:
+        with self._lock:
+            self.requests += 1
+
+    def try_spend(self) -> bool:
+        """Consume one retry if the budget allows it."""
+        with self._lock:
+            if self.retries >= self.min_retries + self.ratio * self.requests:
+                return False
+            self.retries += 1
+            return True
+
+    def reset(self) -> None:
+        with self._lock:
+            self.requests = 0
+            self.retries = 0
+
+
+class CircuitBreaker:
+    """Closed -> open after `failure_threshold` failures in a row; half-open after a cool-down.
+
+    The cool-down is `reset_timeout` seconds, after which one probe call is let through.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.open_count = 0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_call(self) -> None:
+        """Raise CircuitOpenError if calls should currently fail fast."""
+        with self._lock:
+            if self.state == "closed":
+                return
+            if self.state == "open":
+                remaining = self.opened_at + self.reset_timeout - time.monotonic()
+                if remaining > 0:
+                    raise CircuitOpenError(
+                        f"Circuit open for {self.name}, retry in {remaining:.0f}s"
+                    )
+                self.state = "half_open"
+                self._probe_in_flight = False
+            if self._probe_in_flight:
+                raise CircuitOpenError(f"Circuit half-open for {self.name}, probe in flight")
+            self._probe_in_flight = True
+
+    def abort_call(self) -> None:
+        """Forget a call that ended without an outcome (e.g. cancelled), freeing the probe slot."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.state != "closed":
+                print_log(f"        [Info] {self.name}: circuit closed, provider recovered")
+            self.state = "closed"
+            self.failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._probe_in_flight = False
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    self.open_count += 1
+                    print_log(
+                        f"        [Warning] {self.name}: circuit opened "
+                        f"after {self.failures} failures "
+                        f"(cool-down {self.reset_timeout:.0f}s)"
+                    )
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+
+def get_retry_policy() -> RetryPolicy:
+    return RetryPolicy(
+        max_attempts=settings.retry_max_attempts,
+        base_delay=settings.retry_base_delay,
+        max_delay=settings.retry_max_delay,
+    )
+
+
+def get_retry_budget() -> RetryBudget:
+    """Get or create the run-wide retry budget."""
+    global _retry_budget
+    if _retry_budget is None:
+        _retry_budget = RetryBudget(settings.retry_budget_ratio, settings.retry_budget_min)
+    return _retry_budget
+
+
+def reset_retry_budget() -> None:
+    """Start a fresh retry budget (called at the start of each pipeline run)."""
+    get_retry_budget().reset()
+
+
+def get_circuit_breaker(endpoint: str) -> CircuitBreaker:
+    """Get or create the circuit breaker for an endpoint URL."""
+    with _breakers_lock:
+        breaker = _breakers.get(endpoint)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                name=endpoint.rstrip("/").rsplit("/", 1)[-1] or endpoint,
+                failure_threshold=settings.circuit_failure_threshold,
+                reset_timeout=settings.circuit_reset_timeout,
+            )
+            _breakers[endpoint] = breaker
+    return breaker
@@ -0,0 +1,118 @@
+"""Per-resource concurrency limits acquired inside graph nodes.
+
+The pipeline's question-level semaphore only bounds how many questions are in flight.
+Each backend a node touches has its own `ResourceLimiter` (small model, large model,
+embeddings, code execution), held only for the duration of that call. A 5-step logic
+solver run therefore takes a large-model slot per step instead of blocking a question
+slot that cheap router-only answers could use, and the small- and large-model quotas
+are enforced independently.
+
+Slots are asyncio semaphores, created per event loop so the limiters survive across
+`asyncio.run` calls.
+"""
+
+import asyncio
+import threading
+import time
+import weakref
+
+from src.config import settings
+
+SMALL_MODEL = "small_model"
+LARGE_MODEL = "large_model"
+EMBEDDINGS = "embeddings"
+CODE_EXECUTION = "code_execution"
+
+_limiters: dict[str, "ResourceLimiter"] = {}
+_limiters_lock = threading.Lock()
+
+
+class ResourceLimiter:
+    """Async context manager holding one of `limit` slots for a resource."""
+
+    def __init__(self, name: str, limit: int):
+        self.name = name
+        self.limit = max(limit, 1)
+        self.in_flight = 0
+        self.peak = 0
+        self.calls = 0
+        self.waits = 0
+        self.wait_time = 0.0
+        self._semaphores: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, asyncio.Semaphore
+        ] = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            semaphore = self._semaphores.get(loop)
+            if semaphore is None:
+                semaphore = asyncio.Semaphore(self.limit)
+                self._semaphores[loop] = semaphore
+        return semaphore
+
+    async def __aenter__(self) -> "ResourceLimiter":
+        semaphore = self._semaphore()
+        start = time.perf_counter()
+        waited = semaphore.locked()
+        await semaphore.acquire()
+        with self._lock:
+            self.calls += 1
+            if waited:
+                self.waits += 1
+                self.wait_time += time.perf_counter() - start
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        with self._lock:
+            self.in_flight -= 1
+        self._semaphore().release()
+
+    def reset_stats(self) -> None:
+        """Zero the call, peak and wait counters (slots held right now stay held)."""
+        with self._lock:
+            self.peak = self.in_flight
+            self.calls = 0
+            self.waits = 0
+            self.wait_time = 0.0
+
+    def stats_summary(self) -> str:
+        text = f"Resource {self.name}: {self.calls} calls, peak {self.peak}/{self.limit} slots"
+        if self.waits:
+            text += f", {self.waits} waited (avg {self.wait_time / self.waits:.2f}s)"
+        return text
+
+
+def _configured_limit(resource: str) -> int:
+    return {
+        SMALL_MODEL: settings.limit_small_model,
+        LARGE_MODEL: settings.limit_large_model,
+        EMBEDDINGS: settings.limit_embeddings,
+        CODE_EXECUTION: settings.limit_code_execution,
+    }[resource]
+
+
+def get_resource_limiter(resource: str) -> ResourceLimiter:
+    """Get or create the limiter for a resource (SMALL_MODEL, LARGE_MODEL, ...)."""
+    with _limiters_lock:
+        limiter = _limiters.get(resource)
+        if limiter is None:
+            limiter = ResourceLimiter(resource, _configured_limit(resource))
+            _limiters[resource] = limiter
+    return limiter
+
+
+def reset_resource_limit_stats() -> None:
+    """Start fresh resource counters (called at the start of each pipeline run)."""
+    with _limiters_lock:
+        for limiter in _limiters.values():
+            limiter.reset_stats()
+
+
+def get_resource_limit_stats() -> list[str]:
+    """Summaries for every resource used in this run."""
+    with _limiters_lock:
+        return [limiter.stats_summary() for limiter in _limiters.values() if limiter.calls]
@@ -0,0 +1,121 @@
+"""Streaming generation that stops as soon as the caller has what it needs.
+
+Nodes only need the reasoning up to the final answer (or up to the first complete code
+block for the logic solver). Streaming the response and closing the stream at that
+point saves the remaining decode time; for API models the connection is closed so the
+provider stops generating as well.
+
+Closing a LangChain stream only closes its outermost generator: the model's own stream
+(and the connection, limiter slot and cache entry it holds) would be finalized later by
+the garbage collector, and the usage callback would fire after the node had returned.
+So the stop is cooperative: once the caller has what it needs `stop_requested()`
+becomes true, and the chat models in this package end their stream after the chunk
+they just yielded. The stream then finishes normally, releasing everything before
+`generate_until` returns. Models that keep streaming are closed as before.
+"""
+
+import threading
+from collections.abc import Callable
+from contextlib import aclosing, closing
+from contextvars import ContextVar
+from typing import Any
+
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import Runnable
+
+from src.config import settings
+
+_streams = 0
+_early_stops = 0
+_stop_event: ContextVar[threading.Event | None] = ContextVar("stream_stop_event", default=None)
+
+
+def stop_requested() -> bool:
+    """Whether the `generate_until` consuming the current stream already has what it needs.
+
+    Model streams check this after each chunk they yield and return when it is set.
+    """
+    event = _stop_event.get()
+    return event is not None and event.is_set()
+
+
+def reset_streaming_stats() -> None:
+    """Start fresh stream counters (called at the start of each pipeline run)."""
+    global _streams, _early_stops
+    _streams = 0
+    _early_stops = 0
+
+
+def get_streaming_stats() -> str | None:
+    """Summary of early-stopped streams, or None if nothing was streamed."""
+    if not _streams:
+        return None
+    return f"Streaming: {_early_stops} of {_streams} responses stopped early"
+
+
+def generate_until(runnable: Runnable, inputs: Any, stop_when: Callable[[str], bool]) -> AIMessage:
+    """Run a chat model (or chain ending in one), stopping once `stop_when` accepts the text.
+
+    Falls back to a plain `invoke` when STREAM_EARLY_STOP is disabled.
+
+    Args:
+        runnable: Chat model or prompt | model chain
+        inputs: Input passed to `stream`/`invoke`
+        stop_when: Predicate on the text generated so far
+
+    Returns:
+        AIMessage with the (possibly truncated) response text
+    """
+    global _streams, _early_stops
+
+    if not settings.stream_early_stop:
+        return AIMessage(content=runnable.invoke(inputs).content)
+
+    _streams += 1
+    text = ""
+    stop = threading.Event()
+    token = _stop_event.set(stop)
+    try:
+        with closing(runnable.stream(inputs)) as stream:
+            for chunk in stream:
+                if not chunk.content:
+                    continue
+                if stop.is_set():
+                    # The model does not check `stop_requested`, close its stream instead
+                    break
+                text += chunk.content
+                if stop_when(text):
+                    _early_stops += 1
+                    stop.set()
+    finally:
+        _stop_event.reset(token)
+    return AIMessage(content=text)
+
+
+async def agenerate_until(
+    runnable: Runnable, inputs: Any, stop_when: Callable[[str], bool]
+) -> AIMessage:
+    """Async version of `generate_until`."""
+    global _streams, _early_stops
+
+    if not settings.stream_early_stop:
+        return AIMessage(content=(await runnable.ainvoke(inputs)).content)
+
+    _streams += 1
+    text = ""
+    stop = threading.Event()
+    token = _stop_event.set(stop)
+    try:
+        async with aclosing(runnable.astream(inputs)) as stream:
+            async for chunk in stream:
+                if not chunk.content:
+                    continue
+                if stop.is_set():
+                    break
+                text += chunk.content
+                if stop_when(text):
+                    _early_stops += 1
+                    stop.set()
+    finally:
+        _stop_event.reset(token)
+    return AIMessage(content=text)
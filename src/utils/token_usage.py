@@ -0,0 +1,252 @@
+"""Token usage and cost accounting for chat model calls.
+
+A `TokenUsageTracker` callback is attached to each question's graph run. It reads the
+standard `usage_metadata` of every chat response (or the provider's raw `usage` object)
+and attributes it to the LangGraph node that made the call. Calls without reported
+usage (e.g. API streams closed early) are estimated from text length. Per-question
+usage is written to the inference log, and `record_question_usage` aggregates it per
+node, route and model for the end-of-run `log_stats` summary and TOKEN_PRICES costs.
+"""
+
+import math
+import threading
+from dataclasses import dataclass
+from typing import Any
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import BaseMessage
+from langchain_core.messages.ai import UsageMetadata
+from langchain_core.outputs import LLMResult
+
+from src.config import settings
+
+# Rough characters per token for multilingual BPE vocabularies; only used when a
+# provider reports no usage for a call
+_CHARS_PER_TOKEN = 4
+
+_run_usage: "RunTokenUsage | None" = None
+
+
+def estimate_tokens(text_length: int) -> int:
+    return math.ceil(text_length / _CHARS_PER_TOKEN)
+
+
+def usage_metadata(input_tokens: int, output_tokens: int) -> UsageMetadata:
+    """LangChain's standard usage metadata, as models attach it to their responses."""
+    return UsageMetadata(
+        input_tokens=input_tokens,
+        output_tokens=output_tokens,
+        total_tokens=input_tokens + output_tokens,
+    )
+
+
+@dataclass
+class TokenCounts:
+    """Token totals for a group of calls."""
+
+    calls: int = 0
+    cached_calls: int = 0
+    estimated_calls: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+
+    def add(self, other: "TokenCounts") -> None:
+        self.calls += other.calls
+        self.cached_calls += other.cached_calls
+        self.estimated_calls += other.estimated_calls
+        self.input_tokens += other.input_tokens
+        self.output_tokens += other.output_tokens
+
+    def to_dict(self) -> dict[str, int]:
+        return {
+            "calls": self.calls,
+            "cached_calls": self.cached_calls,
+            "estimated_calls": self.estimated_calls,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+        }
+
+    def describe(self) -> str:
+        text = f"{self.input_tokens:,} in / {self.output_tokens:,} out ({self.calls} calls"
+        if self.cached_calls:
+            text += f", {self.cached_calls} cached"
+        if self.estimated_calls:
+            text += f", {self.estimated_calls} estimated"
+        return text + ")"
+
+
+def _generation_usage(generation: Any) -> tuple[int, int] | None:
+    """(input, output) tokens reported for a generation, or None if the provider sent none."""
+    usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+    if usage:
+        return usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+    raw = (generation.generation_info or {}).get("usage") or {}
+    if "prompt_tokens" in raw:
+        return raw.get("prompt_tokens") or 0, raw.get("completion_tokens") or 0
+    return None
+
+
+class TokenUsageTracker(BaseCallbackHandler):
+    """Callback collecting the token usage of one question, per graph node and model."""
+
+    run_inline = True
+
+    def __init__(self):
+        self.by_node: dict[str, TokenCounts] = {}
+        self.by_model: dict[str, TokenCounts] = {}
+        self._runs: dict[UUID, tuple[str, str, int]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def total(self) -> TokenCounts:
+        total = TokenCounts()
+        for counts in self.by_node.values():
+            total.add(counts)
+        return total
+
+    def on_chat_model_start(
+        self,
+        serialized: dict[str, Any],
+        messages: list[list[BaseMessage]],
+        *,
+        run_id: UUID,
+        metadata: dict[str, Any] | None = None,
+        **kwargs: Any,
+    ) -> None:
+        metadata = metadata or {}
+        prompt_length = sum(len(str(message.content)) for batch in messages for message in batch)
+        with self._lock:
+            self._runs[run_id] = (
+                metadata.get("langgraph_node", "other"),
+                metadata.get("ls_model_name") or "unknown",
+                prompt_length,
+            )
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        self._record(run_id, response)
+
+    def on_llm_error(
+        self,
+        error: BaseException,
+        *,
+        run_id: UUID,
+        response: LLMResult | None = None,
+        **kwargs: Any,
+    ) -> None:
+        # Streams closed early (early stop) end here with the partial generation
+        self._record(run_id, response)
+
+    def _record(self, run_id: UUID, response: LLMResult | None) -> None:
+        with self._lock:
+            run = self._runs.pop(run_id, None)
+        if (
+            run is None
+            or response is None
+            or not response.generations
+            or not response.generations[0]
+        ):
+            return
+        node, model_name, prompt_length = run
+        generation = response.generations[0][0]
+        llm_output = response.llm_output or {}
+        generation_info = generation.generation_info or {}
+        model_name = llm_output.get("model_name") or generation_info.get("model_name") or model_name
+
+        counts = TokenCounts(calls=1)
+        if generation_info.get("cached") or llm_output.get("cached"):
+            counts.cached_calls = 1
+        elif (usage := _generation_usage(generation)) is not None:
+            counts.input_tokens, counts.output_tokens = usage
+        elif generation.text:
+            counts.estimated_calls = 1
+            counts.input_tokens = estimate_tokens(prompt_length)
+            counts.output_tokens = estimate_tokens(len(generation.text))
+        else:
+            return
+
+        with self._lock:
+            self.by_node.setdefault(node, TokenCounts()).add(counts)
+            self.by_model.setdefault(model_name, TokenCounts()).add(counts)
+
+    def to_dict(self) -> dict[str, dict[str, int]]:
+        """Per-node usage for the inference log."""
+        return {node: counts.to_dict() for node, counts in self.by_node.items()}
+
+
+def _cost(model_name: str, counts: TokenCounts) -> float | None:
+    prices = settings.token_prices.get(model_name)
+    if not prices:
+        return None
+    input_price, output_price = (list(prices) + [0.0, 0.0])[:2]
+    return (counts.input_tokens * input_price + counts.output_tokens * output_price) / 1_000_000
+
+
+class RunTokenUsage:
+    """Token totals of a pipeline run, per node, route and model."""
+
+    def __init__(self):
+        self.questions_by_route: dict[str, int] = {}
+        self.by_route: dict[str, TokenCounts] = {}
+        self.by_node: dict[str, TokenCounts] = {}
+        self.by_model: dict[str, TokenCounts] = {}
+        self.total = TokenCounts()
+        self._lock = threading.Lock()
+
+    def record(self, route: str, tracker: TokenUsageTracker) -> None:
+        with self._lock:
+            self.questions_by_route[route] = self.questions_by_route.get(route, 0) + 1
+            question_total = tracker.total
+            self.by_route.setdefault(route, TokenCounts()).add(question_total)
+            self.total.add(question_total)
+            for node, counts in tracker.by_node.items():
+                self.by_node.setdefault(node, TokenCounts()).add(counts)
+            for model_name, counts in tracker.by_model.items():
+                self.by_model.setdefault(model_name, TokenCounts()).add(counts)
+
+    def stats_summary(self) -> list[str]:
+        if not self.total.calls:
+            return []
+        lines = [f"Tokens: {self.total.describe()}"]
+        lines += [
+            f"Tokens [{node}]: {counts.describe()}" for node, counts in sorted(self.by_node.items())
+        ]
+        for route, counts in sorted(self.by_route.items()):
+            questions = self.questions_by_route[route]
+            per_question = (counts.input_tokens + counts.output_tokens) / questions
+            lines.append(
+                f"Tokens [route {route}]: {counts.describe()}, {per_question:,.0f} tokens/question"
+            )
+
+        costs = {name: _cost(name, counts) for name, counts in self.by_model.items()}
+        priced = {name: cost for name, cost in costs.items() if cost is not None}
+        if priced:
+            breakdown = ", ".join(f"{name} ${cost:.4f}" for name, cost in sorted(priced.items()))
+            lines.append(f"Estimated cost: ${sum(priced.values()):.4f} ({breakdown})")
+            unpriced = sorted(name for name, cost in costs.items() if cost is None)
+            if unpriced:
+                lines.append(f"No TOKEN_PRICES entry for: {', '.join(unpriced)}")
+        return lines
+
+
+def get_run_token_usage() -> RunTokenUsage:
+    """Get or create the run-wide token usage totals."""
+    global _run_usage
+    if _run_usage is None:
+        _run_usage = RunTokenUsage()
+    return _run_usage
+
+
+def reset_token_usage() -> None:
+    """Start fresh token totals (called at the start of each pipeline run)."""
+    global _run_usage
+    _run_usage = RunTokenUsage()
+
+
+def record_question_usage(route: str, tracker: TokenUsageTracker) -> None:
+    get_run_token_usage().record(route, tracker)
+
+
+def get_token_usage_stats() -> list[str]:
+    """Summary lines of the run's token usage (empty if no model was called)."""
+    return get_run_token_usage().stats_summary()
@@ -20,6 +20,7 @@ from tqdm import tqdm
 
 from src.config import DATA_CRAWLED_DIR
 from src.utils.common import remove_diacritics
+from src.utils.crawled_data import write_crawled_jsonl
 
 load_dotenv()
 
@@ -282,8 +283,18 @@ def crawl_website(
     }
 
 
-def save_crawled_data(data: dict, output_dir: str | Path | None = None, filename: str | None = None) -> Path:
-    """Save crawled data to JSON."""
+def save_crawled_data(
+    data: dict,
+    output_dir: str | Path | None = None,
+    filename: str | None = None,
+    output_format: str = "json",
+) -> Path:
+    """Save crawled data as JSON, or as JSONL (crawl fields, then one document per line).
+
+    The format follows the extension of `filename` when given, else `output_format`.
+    JSONL is written and read back one document at a time, which keeps large crawls out
+    of memory during ingestion.
+    """
     if output_dir is None:
         output_path = DATA_CRAWLED_DIR
     else:
@@ -292,11 +303,15 @@ def save_crawled_data(data: dict, output_dir: str | Path | None = None, filename
     
     if not filename:
         domain = data.get("domain", "unknown").replace(".", "_")
-        filename = f"{domain}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        filename = f"{domain}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{output_format}"
     
     path = output_path / filename
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    if path.suffix.lower() == ".jsonl":
+        fields = {key: value for key, value in data.items() if key != "documents"}
+        write_crawled_jsonl(path, fields, data.get("documents", []))
+    else:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
     
     print(f"[Crawler] Saved: {path}")
     return path
@@ -0,0 +1,31 @@
+import json
+
+import pytest
+
+from src.utils import crawled_data
+from src.utils.crawled_data import iter_crawled_documents
+
+CRAWL = {
+    "source": "example",
+    "score": 1.5,
+    "ratio": -2.25e-3,
+    "total_pages": 3,
+    "documents": [
+        {"url": "a", "weight": 10.75, "size": 12345},
+        {"url": "b", "weight": 3e10, "size": -7},
+        {"url": "c", "weight": 0.5, "tags": [1.0, 2E+5, True]},
+    ],
+}
+
+
+@pytest.mark.parametrize("block", range(1, 17))
+def test_numbers_split_across_read_blocks(tmp_path, monkeypatch, block):
+    path = tmp_path / "crawl.json"
+    path.write_text(json.dumps(CRAWL), encoding="utf-8")
+    monkeypatch.setattr(crawled_data, "_READ_BLOCK", block)
+
+    documents = list(iter_crawled_documents(path))
+
+    assert [document for _, document in documents] == CRAWL["documents"]
+    fields = {key: value for key, value in CRAWL.items() if key != "documents"}
+    assert all(found == fields for found, _ in documents)